@@ -1,14 +1,58 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
+from src.crew.context_compaction import context_stats
 from src.crew.conversation_crew import ConversationCrew
+from src.crew.executor import CREW_DRAIN_TIMEOUT, CrewExecutorBusy, crew_executor
+from src.crew.model_policy import model_policy
+from src.crew.perf.probe import loop_lag_monitor, process_stats
+from src.crew.schemas import StockAnswer, to_answer
+from src.crew.tools.cache import response_cache
+from src.crew.tools.deadline import REQUEST_DEADLINE, Deadline, RunAborted, abandoned_work
+from src.crew.tools.nse_tools import history_store
+from src.crew.tools.portfolio import Holding, analyze_portfolio
+from src.crew.tools.prefetch import prefetch_batch
+from src.crew.tools.timeline import timeline_store
+from src.crew.tools.warmer import cache_warmer, WARMER_ENABLED
+from src.crew.worker_pool import crew_pool
 import sys
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep market-wide data warm so user requests never wait on it. Crews in
+    # worker processes read their own caches, so there the workers warm instead;
+    # either way one process per host holds the warmer lock and refreshes
+    if WARMER_ENABLED and CREW_EXECUTOR == "thread":
+        cache_warmer.start()
+    loop_lag_monitor.start()
+    if CREW_EXECUTOR == "process":
+        # Warm the worker processes before the first question arrives
+        crew_pool.start()
+    yield
+    # Graceful drain: refuse new runs (503) and let accepted ones finish
+    drained = await asyncio.to_thread(
+        crew_pool.drain if CREW_EXECUTOR == "process" else crew_executor.drain, CREW_DRAIN_TIMEOUT)
+    if not drained:
+        print(f"⚠️ Crew runs still in flight after {CREW_DRAIN_TIMEOUT:.0f}s drain; shutting down anyway")
+    loop_lag_monitor.stop()
+    cache_warmer.stop()
+
+
 # Initialize FastAPI
 app = FastAPI(
     title="NSE Stock Market Analysis API",
     description="Ask questions about Indian stocks, IPOs, or market data",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 app.add_middleware(
     CORSMiddleware,
@@ -21,21 +65,90 @@ app.add_middleware(
 # Initialize the crew
 crew = ConversationCrew()
 
+# Where /analyze-stock runs crews: "process" queues jobs for the worker
+# processes in src/crew/worker_pool.py, "thread" runs them on this process's
+# crew executor threads
+CREW_EXECUTOR = os.getenv("CREW_EXECUTOR", "process").lower()
+
+# Crew runs allowed at once across all batch requests; they go through the same
+# worker pool (or executor) as /analyze-stock, so this is the batches' share of it
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "50"))
+# Seconds to wait for the shared data fetch before starting the crews anyway
+BATCH_PREFETCH_TIMEOUT = float(os.getenv("BATCH_PREFETCH_TIMEOUT", "30"))
+batch_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+batch_stats = {"batches": 0, "questions": 0, "crew_runs": 0, "failed": 0, "shared_requests": 0}
+_batch_stats_lock = threading.Lock()
+
+
+def _count(**deltas) -> None:
+    with _batch_stats_lock:
+        for name, delta in deltas.items():
+            batch_stats[name] += delta
+
 # Request model
 class StockQuery(BaseModel):
     question: str
+    # Seconds the client will wait; capped at CREW_REQUEST_DEADLINE
+    deadline_seconds: Optional[float] = Field(default=None, gt=0)
 
 # Response model  
 class StockResponse(BaseModel):
     question: str
-    result: str
+    result: str  # answer.insights, kept for clients that predate the structured answer
+    answer: StockAnswer
     status: str
 
+def _start_crew(question: str, deadline: Deadline) -> asyncio.Future:
+    """
+    Starts a crew run off this process (CREW_EXECUTOR=process) or on the crew executor.
+    
+    Raises:
+        CrewExecutorBusy: Through the future, if the run was not accepted
+    """
+    if CREW_EXECUTOR == "process":
+        return asyncio.ensure_future(crew_pool.run(question, deadline))
+    return asyncio.ensure_future(crew_executor.run(crew.kickoff, question, None, deadline))
+
+
+def _as_answer(result) -> StockAnswer:
+    # Worker processes return the answer as a dict
+    return StockAnswer.model_validate(result) if isinstance(result, dict) else to_answer(result)
+
+
+async def _await_unless_abandoned(request: Optional[Request], work: asyncio.Future, deadline: Deadline):
+    """
+    Awaits work, giving up as soon as the client disconnects (when request is given) or the deadline passes.
+    
+    Giving up cancels the deadline, so the run stops at its next check and
+    releases its worker; the request does not wait for that.
+    
+    Raises:
+        RunAborted: If the run was abandoned before it finished
+    """
+    # The run reports its own failure after an abort; nobody is left to read it
+    work.add_done_callback(lambda future: future.cancelled() or future.exception())
+    while True:
+        done, _ = await asyncio.wait({work}, timeout=0.5)
+        if done:
+            return work.result()
+        if request is not None and await request.is_disconnected():
+            deadline.cancel("client disconnected")
+        elif deadline.expired():
+            deadline.cancel("deadline exceeded")
+        if deadline.cancelled:
+            raise RunAborted(deadline.reason)
+
+
 @app.post("/analyze-stock", response_model=StockResponse)
-async def analyze_stock(query: StockQuery):
+async def analyze_stock(query: StockQuery, request: Request):
     """
     Analyze stock market questions using the conversation crew
     
+    The run gets a deadline (deadline_seconds, at most CREW_REQUEST_DEADLINE)
+    and is cancelled if the client disconnects; an abandoned run stops at its
+    next step instead of finishing every agent.
+    
     Examples:
     - "Tell me about Reliance stock"
     - "LIC IPO performance" 
@@ -46,28 +159,188 @@ async def analyze_stock(query: StockQuery):
     if not query.question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty")
     
+    deadline = Deadline(min(query.deadline_seconds or REQUEST_DEADLINE, REQUEST_DEADLINE))
     try:
-        # Run the crew analysis
-        result = crew.crew().kickoff(inputs={'user_question': query.question})
+        # Run the crew analysis off the event loop so it keeps serving requests
+        work = _start_crew(query.question, deadline)
+        answer = _as_answer(await _await_unless_abandoned(request, work, deadline))
         
         return StockResponse(
             question=query.question,
-            result=str(result),
+            result=answer.insights,
+            answer=answer,
             status="success"
         )
         
+    except CrewExecutorBusy as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server busy ({e.reason}), please retry",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except RunAborted as e:
+        # 499: client closed the request (nobody reads it); 504: out of time
+        raise HTTPException(
+            status_code=499 if e.reason == "client disconnected" else 504,
+            detail=f"Analysis abandoned: {e.reason}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500, 
             detail=f"Analysis failed: {str(e)}"
         )
 
+class BatchQuery(BaseModel):
+    questions: List[str] = Field(min_length=1)
+    max_concurrency: Optional[int] = Field(default=None, gt=0)
+
+
+def _ndjson(event: dict) -> str:
+    return json.dumps(event, default=str) + "\n"
+
+
+@app.post("/analyze-stock/batch")
+async def analyze_stock_batch(query: BatchQuery):
+    """
+    Analyze several questions in one request, streaming NDJSON results as they finish
+    
+    Identical questions are answered by a single crew run. Runs go through
+    the same worker pool (or crew executor) as /analyze-stock, at most
+    BATCH_CONCURRENCY at a time across all batches, each with its own
+    CREW_REQUEST_DEADLINE; a run refused for lack of capacity is reported as
+    an error with retry_after. With CREW_EXECUTOR=thread the data needed
+    across the batch is also fetched once up front into this process's cache.
+    Each line is a JSON event: "batch_start", one "result" per question (with
+    its index in the request) and a final "batch_summary" with throughput.
+    """
+    questions = [question.strip() for question in query.questions]
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch")
+    if not all(questions):
+        raise HTTPException(status_code=400, detail="Questions cannot be empty")
+    
+    # Identical questions (ignoring case and spacing) share one crew run
+    unique = {}
+    for index, question in enumerate(questions):
+        unique.setdefault(" ".join(question.lower().split()), []).append(index)
+    
+    # Deadlines of the runs started so far; closing the stream cancels them
+    deadlines: List[Deadline] = []
+    
+    async def run_batch():
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        plan = []
+        if CREW_EXECUTOR == "thread":
+            # Worker processes have their own caches, so prefetching here only helps thread-mode crews
+            plan = await loop.run_in_executor(None, prefetch_batch, [questions[group[0]] for group in unique.values()],
+                                              BATCH_PREFETCH_TIMEOUT)
+        _count(batches=1, questions=len(questions), crew_runs=len(unique), shared_requests=len(plan))
+        yield _ndjson({"type": "batch_start", "questions": len(questions), "crew_runs": len(unique),
+                       "shared_requests": len(plan), "prefetch_seconds": round(time.monotonic() - started, 2)})
+        
+        limit = asyncio.Semaphore(min(query.max_concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY))
+        
+        async def answer(indexes):
+            async with limit, batch_slots:
+                run_started = time.monotonic()
+                deadline = Deadline(REQUEST_DEADLINE)
+                deadlines.append(deadline)
+                try:
+                    work = _start_crew(questions[indexes[0]], deadline)
+                    answer = _as_answer(await _await_unless_abandoned(None, work, deadline))
+                    outcome = {"status": "success", "result": answer.insights, "answer": answer.model_dump()}
+                except CrewExecutorBusy as e:
+                    outcome = {"status": "error", "error": f"Server busy ({e.reason}), please retry",
+                               "retry_after": e.retry_after}
+                except RunAborted as e:
+                    outcome = {"status": "error", "error": f"Analysis abandoned: {e.reason}"}
+                except Exception as e:
+                    outcome = {"status": "error", "error": f"Analysis failed: {str(e)}"}
+                return indexes, outcome, round(time.monotonic() - run_started, 2)
+        
+        failed = 0
+        for next_done in asyncio.as_completed([answer(indexes) for indexes in unique.values()]):
+            indexes, outcome, seconds = await next_done
+            if outcome["status"] != "success":
+                failed += len(indexes)
+                _count(failed=len(indexes))
+            for index in indexes:
+                yield _ndjson({"type": "result", "index": index, "question": questions[index], "seconds": seconds,
+                               **outcome})
+        
+        elapsed = time.monotonic() - started
+        yield _ndjson({
+            "type": "batch_summary",
+            "questions": len(questions),
+            "succeeded": len(questions) - failed,
+            "failed": failed,
+            "elapsed_seconds": round(elapsed, 2),
+            "questions_per_minute": round(len(questions) / elapsed * 60, 2) if elapsed else None,
+        })
+    
+    async def stream():
+        try:
+            async for line in run_batch():
+                yield line
+        finally:
+            # Normal completion leaves nothing running; a disconnect stops the rest
+            for deadline in deadlines:
+                deadline.cancel("client disconnected")
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+class HoldingInput(BaseModel):
+    symbol: str
+    quantity: float = Field(gt=0)
+    avg_cost: Optional[float] = Field(default=None, gt=0)
+    sector: Optional[str] = None
+
+class PortfolioQuery(BaseModel):
+    holdings: List[HoldingInput] = Field(min_length=1, max_length=100)
+    summarize: bool = True
+
+class PortfolioResponse(BaseModel):
+    report: dict
+    summary: Optional[str] = None
+    status: str
+
+@app.post("/analyze-portfolio", response_model=PortfolioResponse)
+def analyze_portfolio_endpoint(query: PortfolioQuery):
+    """
+    Value a portfolio and measure its exposure, concentration and correlation
+    
+    All symbols are fetched concurrently from the shared cache and the metrics
+    are computed directly; the LLM is called at most once, for the summary.
+    
+    Example body:
+    {"holdings": [{"symbol": "TCS", "quantity": 10}, {"symbol": "INFY", "quantity": 25, "avg_cost": 1400}]}
+    """
+    holdings = [Holding(item.symbol, item.quantity, item.avg_cost, item.sector) for item in query.holdings]
+    report = analyze_portfolio(holdings)
+    
+    if not report["positions"]:
+        raise HTTPException(status_code=502, detail=f"No holdings could be priced: {report['errors']}")
+    
+    summary = None
+    if query.summarize:
+        try:
+            summary = crew.summarize_portfolio(report)
+        except Exception as e:
+            # The numbers stand on their own; report the narrative failure alongside them
+            summary = f"Summary unavailable: {str(e)}"
+    
+    return PortfolioResponse(report=report, summary=summary, status="success")
+
 @app.get("/")
 async def root():
     return {
         "message": "NSE Stock Market Analysis System",
         "description": "Ask questions about Indian stocks, IPOs, or market data",
         "endpoint": "/analyze-stock",
+        "batch_endpoint": "/analyze-stock/batch",
+        "portfolio_endpoint": "/analyze-portfolio",
         "examples": [
             "Tell me about Reliance stock",
             "LIC IPO performance",
@@ -78,4 +351,24 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    # A draining worker reports unhealthy so load balancers stop routing to it
+    if crew_executor.draining or crew_pool.draining:
+        return JSONResponse(status_code=503, content={"status": "draining", "service": "NSE Stock Analysis API"})
     return {"status": "healthy", "service": "NSE Stock Analysis API"}
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Cache, prefetch, warmer, historical series, timeline, batch, crew executor, worker pool, abandoned work, context, model tier and worker process statistics for tuning
+    
+    The top-level cache, warmer, history, context and models sections cover
+    this web process (thread-mode crews, batches, portfolios). With
+    CREW_EXECUTOR=process, workers.crew_processes holds the same sections per
+    crew worker process, as of its last reply.
+    """
+    with _batch_stats_lock:
+        batches = dict(batch_stats)
+    return {"cache": response_cache.stats(), "warmer": cache_warmer.stats(), "history": history_store.stats(),
+            "timeline": timeline_store.stats(), "batch": batches, "executor": crew_executor.stats(),
+            "workers": crew_pool.stats(), "abandoned": abandoned_work.stats(), "context": context_stats.stats(),
+            "models": model_policy.stats(), "process": process_stats()}
@@ -0,0 +1,31 @@
+"""
+Gunicorn settings for the API (gunicorn -c gunicorn.conf.py api:app).
+
+A few async workers accept requests and never run a crew themselves. With
+CREW_EXECUTOR=process (default) each starts CREW_WORKER_PROCESSES crew
+worker processes (src/crew/worker_pool.py), so analysis capacity is
+WEB_CONCURRENCY x CREW_WORKER_PROCESSES concurrent runs and the API answers
+503 once CREW_JOB_QUEUE_LIMIT jobs are waiting. With CREW_EXECUTOR=thread
+runs use CREW_EXECUTOR_THREADS threads per worker (src/crew/executor.py).
+Whichever process runs crews may warm the cache, but a file lock lets only
+one warmer per host refresh (src/crew/tools/warmer.py).
+"""
+
+import os
+
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# The event loop never blocks on a crew run, so a silent worker really is stuck
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+keepalive = 5
+
+# On SIGTERM a worker stops accepting connections, finishes open requests and
+# drains its crew executor; give that the executor's drain budget plus slack
+graceful_timeout = int(float(os.getenv("CREW_DRAIN_TIMEOUT", "120"))) + 10
+
+# Recycle workers now and then to bound memory growth from long-lived caches
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
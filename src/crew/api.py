@@ -40,7 +40,7 @@ async def analyze_stock(query: StockQuery):
     
     try:
         # Run the crew analysis
-        result = crew.crew().kickoff(inputs={'user_question': query.question})
+        result = crew.kickoff(query.question)
         
         return StockResponse(
             question=query.question,
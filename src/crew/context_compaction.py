@@ -0,0 +1,237 @@
+"""
+Context compaction between crew tasks.
+
+The coordinator used to receive the full raw outputs of the researcher and the
+data analyst, tool dumps included. CompactContextTask replaces that context
+with a small fact sheet (question, symbols, intents, key metrics, findings)
+trimmed to CREW_CONTEXT_TOKEN_CAP estimated tokens, and context_stats keeps
+the token accounting and the coordinator's time to first token for /metrics.
+"""
+
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from crewai import Task
+
+from src.crew.tools.deadline import check_deadline
+from src.crew.tools.prefetch import detect_intents
+from src.crew.tools.symbols import find_known_symbols
+
+
+COMPACTION_ENABLED = os.getenv("CREW_CONTEXT_COMPACTION", "true").lower() not in ("0", "false", "no")
+CONTEXT_TOKEN_CAP = int(os.getenv("CREW_CONTEXT_TOKEN_CAP", "600"))
+
+MAX_METRICS = 30
+MAX_FINDINGS = 8
+
+# crewAI's separator between context task outputs
+_DIVIDER = "\n\n----------\n\n"
+
+# "Label: value" with a number in the value, optionally bulleted or bold
+_METRIC_LINE = re.compile(r"^[\s\-•*#]*(?:\d+[.)]\s+)?\**([A-Za-z0-9][\w %/&().,'-]{1,40}?)\**\s*:\s*\**(.+?)\**\s*$")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_BOILERPLATE = re.compile(r"^(thought|action|action input|observation|final answer)\s*:", re.IGNORECASE)
+
+# Question of the running kickoff, set by ConversationCrew.kickoff
+current_question: ContextVar[str] = ContextVar("crew_question", default="")
+# perf_counter() when the coordinator's task started, until its first streamed token
+_coordinator_started: ContextVar[Optional[List[float]]] = ContextVar("coordinator_started", default=None)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English and numbers)"""
+    return (len(text) + 3) // 4
+
+
+def _is_heading(line: str) -> bool:
+    """All-caps section title, ignoring parenthesised notes as in "🟢 TOP GAINERS (by percent_change)" """
+    return not any(ch.islower() for ch in re.sub(r"\(.*?\)", "", line))
+
+
+def extract_facts(text: str) -> Tuple[Dict[str, Dict[str, str]], List[str]]:
+    """
+    Split task output into numeric "Label: value" metrics and prose findings.
+
+    Metrics are grouped under the section heading and item line they follow,
+    e.g. "TOP GAINERS (by percent_change) / Wipro (WIPR.NS, NSE)", so lists keep
+    one group per item; metrics before any heading fall in group "".
+
+    Returns:
+        (group -> {label: value} in order of first appearance, deduplicated findings)
+    """
+    metrics: Dict[str, Dict[str, str]] = {}
+    findings: List[str] = []
+    section, subject = "", ""
+    for raw_line in text.splitlines():
+        line = raw_line.strip().lstrip("-•*# ").strip()
+        if not line or _BOILERPLATE.match(line) or set(line) <= set("=-_ "):
+            continue
+        # Tool output packs several facts per line: "Price: ₹266.85 | Change: 6.2"
+        parts = [_METRIC_LINE.match(part) for part in raw_line.split(" | ")]
+        if all(parts):
+            group = metrics.setdefault(" / ".join(name for name in (section, subject) if name), {})
+            for match in parts:
+                label, value = match.group(1).strip(), match.group(2).strip()
+                if any(ch.isdigit() for ch in value) and label not in group:
+                    group[label] = value[:60]
+            continue
+        if _is_heading(line):
+            section, subject = re.sub(r"^[^\w(]+", "", line), ""
+            continue
+        item = re.sub(r"^\d+[.)]\s+", "", line)
+        if len(item) <= 60 and not _SENTENCE_END.search(item):
+            # A short item line: the metrics that follow describe it
+            subject = item.rstrip(":")
+            continue
+        for sentence in _SENTENCE_END.split(line):
+            sentence = sentence.strip()
+            if 20 <= len(sentence) <= 300 and sentence not in findings:
+                findings.append(sentence)
+    return {group: values for group, values in metrics.items() if values}, findings
+
+
+@dataclass
+class CompactContext:
+    """Fact sheet handed to the coordinator instead of the raw task outputs"""
+
+    question: str
+    symbols: List[str] = field(default_factory=list)
+    intents: List[str] = field(default_factory=list)
+    metrics: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    findings: List[str] = field(default_factory=list)
+
+    def render(self) -> str:
+        lines = [f"Question: {self.question}"] if self.question else []
+        if self.symbols:
+            lines.append(f"Symbols: {', '.join(self.symbols)}")
+        if self.intents:
+            lines.append(f"Intent: {', '.join(self.intents)}")
+        if self.metrics:
+            lines.append("Key metrics:")
+            for group, values in self.metrics.items():
+                facts = "; ".join(f"{label} {value}" for label, value in values.items())
+                lines.append(f"- {group}: {facts}" if group else f"- {facts}")
+        if self.findings:
+            lines.append("Findings:")
+            lines.extend(f"- {finding}" for finding in self.findings)
+        return "\n".join(lines)
+
+
+def compact_context(question: str, outputs: List[Tuple[str, str]],
+                    token_cap: int = CONTEXT_TOKEN_CAP) -> CompactContext:
+    """
+    Reduce earlier task outputs to a fact sheet of at most token_cap estimated tokens.
+
+    Args:
+        question: The user's question
+        outputs: (task name, raw output) of the context tasks, research first
+        token_cap: Budget for the rendered fact sheet; findings are dropped
+            before metrics when trimming
+
+    Returns:
+        The fact sheet.
+    """
+    text = "\n".join(raw for _, raw in outputs)
+    symbols = find_known_symbols(question) or find_known_symbols(text)[:3]
+    metrics, findings = extract_facts(text)
+    budget = MAX_METRICS
+    for group in list(metrics):
+        metrics[group] = dict(list(metrics[group].items())[:budget])
+        budget -= len(metrics[group])
+        if not metrics[group]:
+            del metrics[group]
+    findings = findings[:MAX_FINDINGS]
+    compact = CompactContext(question=question, symbols=symbols, intents=sorted(detect_intents(question)),
+                             metrics=metrics, findings=findings)
+    while estimate_tokens(compact.render()) > token_cap and (compact.findings or compact.metrics):
+        if compact.findings:
+            compact.findings.pop()
+        else:
+            group = next(reversed(compact.metrics))
+            compact.metrics[group].pop(next(reversed(compact.metrics[group])))
+            if not compact.metrics[group]:
+                del compact.metrics[group]
+    return compact
+
+
+class ContextStats:
+    """Token accounting for compacted contexts and the coordinator's time to first token"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.raw_tokens = 0
+        self.compact_tokens = 0
+        self.ttft: List[float] = []
+        self.last: Optional[Dict[str, Any]] = None
+
+    def record(self, raw_tokens: int, compact_tokens: int) -> None:
+        with self._lock:
+            self.runs += 1
+            self.raw_tokens += raw_tokens
+            self.compact_tokens += compact_tokens
+            self.last = {"raw_tokens": raw_tokens, "compact_tokens": compact_tokens}
+
+    def record_ttft(self, seconds: float) -> None:
+        with self._lock:
+            self.ttft = (self.ttft + [seconds])[-500:]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ttft = sorted(self.ttft)
+            return {
+                "enabled": COMPACTION_ENABLED,
+                "token_cap": CONTEXT_TOKEN_CAP,
+                "runs": self.runs,
+                "raw_tokens": self.raw_tokens,
+                "compact_tokens": self.compact_tokens,
+                "saved_tokens": self.raw_tokens - self.compact_tokens,
+                "reduction_pct": round(100 * (1 - self.compact_tokens / self.raw_tokens), 1)
+                if self.raw_tokens else None,
+                "last": self.last,
+                "coordinator_ttft_ms": {
+                    "samples": len(ttft),
+                    "p50": round(ttft[len(ttft) // 2] * 1000, 1) if ttft else None,
+                    "p90": round(ttft[int(len(ttft) * 0.9)] * 1000, 1) if ttft else None,
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.runs = self.raw_tokens = self.compact_tokens = 0
+            self.ttft = []
+            self.last = None
+
+
+context_stats = ContextStats()
+
+
+def note_first_token() -> None:
+    """Called for each streamed token; records time to first token once per coordinator run"""
+    started = _coordinator_started.get()
+    if started:
+        context_stats.record_ttft(time.perf_counter() - started.pop())
+
+
+class CompactContextTask(Task):
+    """Task whose context is the compacted fact sheet of its context tasks"""
+
+    def execute_sync(self, agent=None, context: Optional[str] = None, tools=None):
+        # Don't start the final answer for a run that has already been abandoned
+        check_deadline()
+        _coordinator_started.set([time.perf_counter()])
+        if isinstance(self.context, list) and self.context:
+            outputs = [(task.name or "", task.output.raw) for task in self.context if task.output is not None]
+            raw_tokens = estimate_tokens(_DIVIDER.join(raw for _, raw in outputs))
+            if COMPACTION_ENABLED and outputs:
+                compacted = compact_context(current_question.get(), outputs).render()
+                # Short outputs can be smaller than their fact sheet; keep them as they are
+                if estimate_tokens(compacted) < raw_tokens:
+                    context = compacted
+            context_stats.record(raw_tokens, estimate_tokens(context or ""))
+        return super().execute_sync(agent=agent, context=context, tools=tools)
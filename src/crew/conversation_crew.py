@@ -1,37 +1,132 @@
+import json
 import os
-import os
-from crewai import Agent, Task, Crew, LLM, Process
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+from crewai import Agent, Task, Crew, Process
 from crewai.project import agent, task, crew, CrewBase
 from crewai_tools import SerperDevTool
+from src.crew.context_compaction import CompactContextTask, current_question, note_first_token
+from src.crew.llm_providers import LLM_PROVIDER, build_llm
+from src.crew.model_policy import TIERING_ENABLED, TieredLLM
+from src.crew.schemas import StockAnswer
+from src.crew.tools.deadline import Deadline, RunAborted, abandoned_work, check_deadline, current_deadline
 from src.crew.tools.nse_tools import get_all_nse_tools
+from src.crew.tools.prefetch import prefetch_for_question
+from src.crew.tools.symbols import find_known_symbol
+from src.crew.tools.tool_memo import run_memo
 from dotenv import load_dotenv
 
+try:
+    from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+except ImportError:
+    # Older crewAI releases keep the event bus under utilities
+    from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+
 load_dotenv()
 
 # Initialize tools once
 nse_tools = get_all_nse_tools()
 serper_tool = SerperDevTool(api_key=os.getenv("SERPER_API_KEY", "demo"))
 
+# Model for untiered use (CREW_MODEL_TIERING=false) and one-off calls; agents
+# otherwise run on the tiers in config/models.yaml, chosen per agent in agents.yaml
+MODEL = "gemini/gemini-2.0-flash"
+
+
+def make_llm(stream: bool = False, api_key: Optional[str] = None):
+    """Builds an LLM client for the configured provider
+
+    Args:
+        stream: Stream the response as LLMStreamChunkEvents
+        api_key: Provider API key (defaults to the environment)
+    """
+    return build_llm(LLM_PROVIDER, MODEL, stream=stream, api_key=api_key)
+
+
 os.getenv("GEMINI_API_KEY")
-llm = LLM(model="gemini/gemini-2.0-flash")
+llm = make_llm()
+# The coordinator streams so its final answer can be rendered token by token
+coordinator_llm = make_llm(stream=True)
+
+# "auto" runs research and data fetch in parallel when the question names a
+# known symbol; "sequential" always runs the original three-step pipeline
+EXECUTION_MODE = os.getenv("CREW_EXECUTION_MODE", "auto").lower()
+
+# Progress listener for the current kickoff. A context variable keeps
+# concurrent runs apart; crewAI copies the context into async task threads.
+_event_sink: ContextVar[Optional[Callable[[dict], None]]] = ContextVar("crew_event_sink", default=None)
+
+
+def _emit(event: dict) -> None:
+    sink = _event_sink.get()
+    if sink is not None:
+        sink(event)
+
+
+def _on_step(step) -> None:
+    """Crew step callback: report tool calls and their results, then stop if the run was abandoned"""
+    tool = getattr(step, 'tool', None)
+    if tool:
+        _emit({
+            "type": "tool",
+            "tool": tool,
+            "tool_input": getattr(step, 'tool_input', ''),
+            "result": str(getattr(step, 'result', '') or ''),
+        })
+    else:
+        _emit({"type": "step", "thought": getattr(step, 'thought', '') or ''})
+    check_deadline()
+
+
+def _on_task(output) -> None:
+    """Crew task callback: report each finished task, then stop if the run was abandoned"""
+    _emit({"type": "task", "task": output.name, "agent": output.agent, "output": output.raw})
+    check_deadline()
+
+
+@crewai_event_bus.on(LLMStreamChunkEvent)
+def _on_stream_chunk(source, event) -> None:
+    # Only the coordinator's LLM streams, so its chunks are the final answer
+    if getattr(source, 'stream', False):
+        note_first_token()
+        _emit({"type": "token", "text": event.chunk})
+
+
 @CrewBase
 class ConversationCrew:
     agents_config = "config/agents.yaml"
     tasks_config = "config/tasks.yaml"
 
+    def __init__(self, gemini_api_key: Optional[str] = None, serper_api_key: Optional[str] = None):
+        # Dedicated clients when keys are given, otherwise the shared module defaults
+        self.gemini_api_key = gemini_api_key
+        self.llm = make_llm(api_key=gemini_api_key) if gemini_api_key else llm
+        self.coordinator_llm = make_llm(stream=True, api_key=gemini_api_key) if gemini_api_key else coordinator_llm
+        self.serper_tool = SerperDevTool(api_key=serper_api_key) if serper_api_key else serper_tool
+
+    def agent_llm(self, name: str, stream: bool = False):
+        """The LLM for an agent: its model tier range from agents.yaml, or the shared client when tiering is off"""
+        if not TIERING_ENABLED:
+            return self.coordinator_llm if stream else self.llm
+        config = self.agents_config[name]
+        tier = config.get('model_tier', 'standard')
+        return TieredLLM(model=f"tiered:{name}", tier=tier, max_tier=config.get('max_model_tier', tier),
+                         stream=stream, api_key=self.gemini_api_key)
+
     @agent
     def indian_stock_researcher(self) -> Agent:
         return Agent(
             config=self.agents_config['indian_stock_researcher'],
-            llm=llm,
-            tools=[serper_tool]
+            llm=self.agent_llm('indian_stock_researcher'),
+            tools=[self.serper_tool]
         )
     
     @agent
     def nse_data_analyst(self) -> Agent:
         return Agent(
             config=self.agents_config['nse_data_analyst'],
-            llm=llm,
+            llm=self.agent_llm('nse_data_analyst'),
             tools=nse_tools
         )
     
@@ -39,7 +134,7 @@ class ConversationCrew:
     def response_coordinator(self) -> Agent:
         return Agent(
             config=self.agents_config['response_coordinator'],
-            llm=llm,
+            llm=self.agent_llm('response_coordinator', stream=True),
             tools=[]
         )
 
@@ -59,9 +154,11 @@ class ConversationCrew:
     
     @task
     def coordinate_response_task(self) -> Task:
-        return Task(
+        # Gets a compacted fact sheet of the earlier outputs, not their full text
+        return CompactContextTask(
             config=self.tasks_config['coordinate_response_task'],
-            agent=self.response_coordinator()
+            agent=self.response_coordinator(),
+            output_pydantic=StockAnswer
         )
     
     @crew
@@ -72,5 +169,117 @@ class ConversationCrew:
             tasks=self.tasks,
             process=Process.sequential,
             verbose=True,
+            step_callback=_on_step,
+            task_callback=_on_task,
         )
-    
+
+    def parallel_crew(self) -> Crew:
+        """Creates a crew that researches and fetches NSE data concurrently.
+
+        The analyst works from a symbol resolved up front instead of the
+        researcher's output, and the coordinator merges both results.
+        """
+        research_task = Task(
+            name='research_indian_stock_task',
+            config=self.tasks_config['research_indian_stock_task'],
+            agent=self.indian_stock_researcher(),
+            async_execution=True
+        )
+        speculative_task = Task(
+            name='analyze_nse_data_speculative_task',
+            config=self.tasks_config['analyze_nse_data_speculative_task'],
+            agent=self.nse_data_analyst(),
+            async_execution=True
+        )
+        coordinate_task = CompactContextTask(
+            name='coordinate_response_task',
+            config={
+                key: value
+                for key, value in self.tasks_config['coordinate_response_task'].items()
+                if key != 'context'
+            },
+            agent=self.response_coordinator(),
+            context=[research_task, speculative_task],
+            output_pydantic=StockAnswer
+        )
+        return Crew(
+            agents=[
+                self.indian_stock_researcher(),
+                self.nse_data_analyst(),
+                self.response_coordinator()
+            ],
+            tasks=[research_task, speculative_task, coordinate_task],
+            process=Process.sequential,
+            verbose=True,
+            step_callback=_on_step,
+            task_callback=_on_task,
+        )
+
+    def kickoff(self, user_question: str, on_event: Optional[Callable[[dict], None]] = None,
+                deadline: Optional[Deadline] = None):
+        """Answers a user question, picking the fastest safe execution mode
+
+        Args:
+            user_question: Free-text question
+            on_event: Optional callable receiving progress events as dicts with a
+                "type" of "step", "tool", "task", "token" (final answer text) or,
+                once the run ends, "memo" (tool calls and duplicates avoided)
+            deadline: Optional Deadline; once it passes or is cancelled the run
+                stops at its next step, task or upstream call
+
+        Raises:
+            RunAborted: If the run was stopped by its deadline
+        """
+        token = _event_sink.set(on_event)
+        question_token = current_question.set(user_question)
+        deadline_token = current_deadline.set(deadline)
+        started = time.perf_counter()
+        # Repeated tool calls within this run reuse the first output
+        with run_memo() as memo:
+            try:
+                prefetch_for_question(user_question)
+                check_deadline()
+                symbol = find_known_symbol(user_question)
+                if EXECUTION_MODE == "auto" and symbol:
+                    # Agents are memoized per instance; a copy gives this run its own executors
+                    return self.parallel_crew().copy().kickoff(
+                        inputs={'user_question': user_question, 'symbol': symbol}
+                    )
+                # Run a copy so one instance can serve concurrent questions
+                return self.crew().copy().kickoff(inputs={'user_question': user_question})
+            except Exception as e:
+                # crewAI may wrap the check's exception; the deadline knows whether it fired
+                reason = deadline.aborted() if deadline is not None else None
+                if reason is None:
+                    raise
+                abandoned_work.record("run", reason, time.perf_counter() - started)
+                if isinstance(e, RunAborted):
+                    raise
+                raise RunAborted(reason) from e
+            finally:
+                _emit({"type": "memo", **memo.stats()})
+                current_deadline.reset(deadline_token)
+                current_question.reset(question_token)
+                _event_sink.reset(token)
+
+    def summarize_portfolio(self, report: dict) -> str:
+        """Writes a short narrative for a computed portfolio report in a single LLM call
+
+        Args:
+            report: Output of src.crew.tools.portfolio.analyze_portfolio
+
+        Returns:
+            Plain-text summary of value, P&L, concentration and diversification.
+        """
+        # The correlation matrix is too large to be worth its tokens; the top pairs carry the story
+        risk = {key: value for key, value in report.get("risk", {}).items() if key != "correlation_matrix"}
+        facts = dict(report, risk=risk)
+        prompt = (
+            "You are an Indian equity portfolio analyst. Using only the metrics below "
+            "(values in INR, weights and volatilities in percent), write a concise summary "
+            "for the investor: total value and today's P&L, the biggest positions, sector "
+            "concentration, diversification (HHI, correlation, volatility) and one or two "
+            "concrete observations. Do not invent numbers.\n\n"
+            + json.dumps(facts, default=str)
+        )
+        return str(self.llm.call([{"role": "user", "content": prompt}]))
@@ -0,0 +1,131 @@
+"""
+Bounded executor for crew runs, separate from the async front end.
+
+A crew run blocks a thread for its whole duration but spends nearly all of it
+waiting on the LLM and the stock API, so the web workers stay few and async
+while runs go to a dedicated pool of CREW_EXECUTOR_THREADS threads. At most
+CREW_EXECUTOR_QUEUE more runs wait for a thread; beyond that, and while the
+process drains for shutdown, run() raises CrewExecutorBusy so the API can
+answer 503 with Retry-After instead of piling up requests it cannot serve.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+CREW_EXECUTOR_THREADS = int(os.getenv("CREW_EXECUTOR_THREADS", "8"))
+CREW_EXECUTOR_QUEUE = int(os.getenv("CREW_EXECUTOR_QUEUE", "16"))
+# Seconds shutdown waits for accepted runs to finish
+CREW_DRAIN_TIMEOUT = float(os.getenv("CREW_DRAIN_TIMEOUT", "120"))
+
+
+class CrewExecutorBusy(Exception):
+    """Raised when a run cannot be accepted: the queue is full or the executor is draining"""
+
+    def __init__(self, reason: str, retry_after: int = 5):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CrewExecutor:
+    """
+    Thread pool with admission control, queue-wait accounting and graceful drain.
+
+    A run holds its admission slot until its thread finishes, even if the
+    awaiting request has gone away, so the limits reflect real work in flight.
+    """
+
+    def __init__(self, threads: int = CREW_EXECUTOR_THREADS, queue_size: int = CREW_EXECUTOR_QUEUE):
+        self.threads = threads
+        self.queue_size = queue_size
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="crew")
+        self._idle = threading.Condition()
+        self._in_flight = 0
+        self._running = 0
+        self.draining = False
+        self._stats = {"accepted": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self._waits: deque = deque(maxlen=500)
+        self._durations: deque = deque(maxlen=500)
+
+    def _admit(self) -> None:
+        with self._idle:
+            if self.draining:
+                self._stats["rejected"] += 1
+                raise CrewExecutorBusy("draining", retry_after=1)
+            if self._in_flight >= self.threads + self.queue_size:
+                self._stats["rejected"] += 1
+                raise CrewExecutorBusy("queue full")
+            self._in_flight += 1
+            self._stats["accepted"] += 1
+
+    def _job(self, submitted: float, fn: Callable[..., Any], args: tuple) -> Any:
+        started = time.perf_counter()
+        with self._idle:
+            self._running += 1
+            self._waits.append(started - submitted)
+        failed = True
+        try:
+            result = fn(*args)
+            failed = False
+            return result
+        finally:
+            with self._idle:
+                self._running -= 1
+                self._in_flight -= 1
+                self._stats["failed" if failed else "completed"] += 1
+                self._durations.append(time.perf_counter() - started)
+                self._idle.notify_all()
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs fn(*args) on the pool and awaits its result.
+
+        Raises:
+            CrewExecutorBusy: If the run was not accepted
+        """
+        self._admit()
+        try:
+            future = self._pool.submit(self._job, time.perf_counter(), fn, args)
+        except RuntimeError:
+            # The pool was shut down between admission and submit
+            with self._idle:
+                self._in_flight -= 1
+                self._idle.notify_all()
+            raise CrewExecutorBusy("draining", retry_after=1)
+        return await asyncio.wrap_future(future)
+
+    def drain(self, timeout: float = CREW_DRAIN_TIMEOUT) -> bool:
+        """
+        Stops accepting runs and waits up to timeout seconds for accepted ones to finish.
+
+        Returns:
+            True if every accepted run finished in time.
+        """
+        with self._idle:
+            self.draining = True
+            finished = self._idle.wait_for(lambda: self._in_flight == 0, timeout=timeout)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        return finished
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, current load, admission counters and queue-wait/run-time percentiles"""
+        with self._idle:
+            waits, durations = sorted(self._waits), sorted(self._durations)
+            stats = dict(self._stats, threads=self.threads, queue_size=self.queue_size, running=self._running,
+                         queued=self._in_flight - self._running, draining=self.draining)
+        for name, samples in (("queue_wait_ms", waits), ("run_ms", durations)):
+            stats[name] = {
+                "p50": round(samples[len(samples) // 2] * 1000, 1) if samples else None,
+                "p90": round(samples[int(len(samples) * 0.9)] * 1000, 1) if samples else None,
+            }
+        return stats
+
+
+# Serves /analyze-stock when CREW_EXECUTOR=thread
+crew_executor = CrewExecutor()
@@ -0,0 +1,368 @@
+"""
+Local job queue for crew runs executed by the worker pool (worker_pool.py).
+
+Two interchangeable backends, picked with CREW_JOB_QUEUE:
+    memory  jobs live in this process (default)
+    sqlite  jobs live in CREW_JOB_DB, so every API worker on the host shares
+            one queue and a job survives the process that accepted it
+
+A claimed job carries a lease; if its worker dies without reporting back, the
+job becomes claimable again once the lease expires. A job whose submitter
+cancels it or whose deadline passes while it waits is never started.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+
+JOB_QUEUE = os.getenv("CREW_JOB_QUEUE", "memory").lower()
+JOB_DB = os.getenv("CREW_JOB_DB", str(Path(__file__).resolve().parent / "jobs.db"))
+# Seconds finished jobs are kept for their submitters to collect
+JOB_RETENTION = float(os.getenv("CREW_JOB_RETENTION", "3600"))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+STATUSES = (QUEUED, RUNNING, DONE, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """Raised by put() when the queue already holds its limit of waiting jobs"""
+
+
+@dataclass
+class Job:
+    """One crew run: its question, state, attempts and outcome"""
+
+    id: str
+    question: str
+    status: str = QUEUED
+    attempts: int = 0
+    max_attempts: int = 2
+    timeout: float = 300.0
+    deadline: Optional[float] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    lease_until: Optional[float] = None
+    worker: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class JobQueue(ABC):
+    """Interface shared by the backends; all methods are thread-safe"""
+
+    @abstractmethod
+    def put(self, question: str, max_attempts: int = 2, timeout: float = 300.0,
+            limit: Optional[int] = None, deadline: Optional[float] = None) -> Job:
+        """
+        Adds a job.
+
+        Args:
+            question: The user's question
+            max_attempts: Runs allowed before the job fails for good
+            timeout: Seconds one attempt may take
+            limit: Maximum number of queued (not yet claimed) jobs
+            deadline: time.time() after which the answer is no longer wanted
+
+        Raises:
+            JobQueueFull: If limit queued jobs are already waiting
+        """
+
+    @abstractmethod
+    def claim(self, worker: str) -> Optional[Job]:
+        """Oldest claimable job, now running under worker, or None; jobs past their deadline fail instead"""
+
+    @abstractmethod
+    def finish(self, job_id: str, result: Dict[str, Any]) -> None:
+        """Records a running job's answer; cancelled jobs are left as they are"""
+
+    @abstractmethod
+    def fail(self, job_id: str, error: str, retry: bool = True) -> Job:
+        """Records a failed attempt; the job is queued again while attempts remain and retry is set"""
+
+    @abstractmethod
+    def cancel(self, job_id: str, reason: str) -> Optional[Job]:
+        """Marks a queued or running job cancelled; its worker stops it. Returns the job as it was before"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job's current state, or None if it is unknown or was pruned"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+
+    def wait(self, timeout: float) -> None:
+        """Blocks up to timeout seconds or until a job may have been added"""
+        time.sleep(timeout)
+
+
+class MemoryJobQueue(JobQueue):
+    """Jobs in a dict, for a single process"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._changed = threading.Condition()
+
+    def _prune(self, now: float) -> None:
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at and now - job.finished_at > JOB_RETENTION:
+                del self._jobs[job_id]
+
+    def put(self, question: str, max_attempts: int = 2, timeout: float = 300.0,
+            limit: Optional[int] = None, deadline: Optional[float] = None) -> Job:
+        with self._changed:
+            if limit is not None and sum(job.status == QUEUED for job in self._jobs.values()) >= limit:
+                raise JobQueueFull(f"{limit} jobs already queued")
+            job = Job(id=uuid.uuid4().hex, question=question, max_attempts=max_attempts, timeout=timeout,
+                      deadline=deadline)
+            self._jobs[job.id] = job
+            self._changed.notify()
+            return replace(job)
+
+    def claim(self, worker: str) -> Optional[Job]:
+        with self._changed:
+            now = time.time()
+            for job in sorted(self._jobs.values(), key=lambda job: job.created_at):
+                if job.status == QUEUED or (job.status == RUNNING and job.lease_until < now):
+                    if job.deadline is not None and job.deadline <= now:
+                        job.status, job.error, job.finished_at = FAILED, "deadline exceeded before start", now
+                        continue
+                    job.status, job.worker, job.started_at = RUNNING, worker, now
+                    job.attempts += 1
+                    job.lease_until = now + job.timeout + 30
+                    return replace(job)
+            return None
+
+    def finish(self, job_id: str, result: Dict[str, Any]) -> None:
+        with self._changed:
+            job = self._jobs[job_id]
+            if job.status != CANCELLED:
+                job.status, job.result, job.finished_at = DONE, result, time.time()
+            self._prune(time.time())
+
+    def fail(self, job_id: str, error: str, retry: bool = True) -> Job:
+        with self._changed:
+            job = self._jobs[job_id]
+            if job.status == CANCELLED:
+                return replace(job)
+            job.error = error
+            if retry and job.attempts < job.max_attempts:
+                job.status, job.worker, job.lease_until = QUEUED, None, None
+                self._changed.notify()
+            else:
+                job.status, job.finished_at = FAILED, time.time()
+            return replace(job)
+
+    def cancel(self, job_id: str, reason: str) -> Optional[Job]:
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            before = replace(job)
+            if job.status in (QUEUED, RUNNING):
+                job.status, job.error, job.finished_at = CANCELLED, reason, time.time()
+            return before
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._changed:
+            job = self._jobs.get(job_id)
+            return replace(job) if job else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._changed:
+            counts = {status: 0 for status in STATUSES}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def wait(self, timeout: float) -> None:
+        with self._changed:
+            self._changed.wait(timeout)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    question TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    timeout REAL NOT NULL,
+    deadline REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_until REAL,
+    worker TEXT,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class SQLiteJobQueue(JobQueue):
+    """Jobs in a SQLite table, shared by every process on the host that opens the same file"""
+
+    def __init__(self, path: str = JOB_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Autocommit; transactions that must be atomic across processes use BEGIN IMMEDIATE
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "deadline" not in columns:
+                # Queue files created before deadlines existed
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN deadline REAL")
+        return self._conn
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Job:
+        values = dict(row)
+        values["result"] = json.loads(values["result"]) if values["result"] else None
+        return Job(**values)
+
+    def _transaction(self, body: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = body(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return value
+
+    def put(self, question: str, max_attempts: int = 2, timeout: float = 300.0,
+            limit: Optional[int] = None, deadline: Optional[float] = None) -> Job:
+        job = Job(id=uuid.uuid4().hex, question=question, max_attempts=max_attempts, timeout=timeout,
+                  deadline=deadline)
+
+        def insert(conn: sqlite3.Connection) -> Job:
+            if limit is not None:
+                queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+                if queued >= limit:
+                    raise JobQueueFull(f"{limit} jobs already queued")
+            conn.execute(
+                "INSERT INTO jobs (id, question, status, max_attempts, timeout, deadline, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.question, job.status, job.max_attempts, job.timeout, job.deadline, job.created_at),
+            )
+            return job
+
+        return self._transaction(insert)
+
+    def claim(self, worker: str) -> Optional[Job]:
+        def take(conn: sqlite3.Connection) -> Optional[Job]:
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                "WHERE status IN (?, ?) AND deadline <= ? AND (status = ? OR lease_until < ?)",
+                (FAILED, "deadline exceeded before start", now, QUEUED, RUNNING, now, QUEUED, now),
+            )
+            row = conn.execute(
+                "SELECT id, timeout FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, started_at = ?, attempts = attempts + 1, lease_until = ? "
+                "WHERE id = ?",
+                (RUNNING, worker, now, now + row["timeout"] + 30, row["id"]),
+            )
+            return self._job(conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+
+        return self._transaction(take)
+
+    def finish(self, job_id: str, result: Dict[str, Any]) -> None:
+        def update(conn: sqlite3.Connection) -> None:
+            now = time.time()
+            conn.execute("UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ? AND status != ?",
+                         (DONE, json.dumps(result, default=str), now, job_id, CANCELLED))
+            conn.execute("DELETE FROM jobs WHERE finished_at < ?", (now - JOB_RETENTION,))
+
+        self._transaction(update)
+
+    def fail(self, job_id: str, error: str, retry: bool = True) -> Job:
+        def update(conn: sqlite3.Connection) -> Job:
+            row = conn.execute("SELECT status, attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row["status"] == CANCELLED:
+                pass
+            elif retry and row["attempts"] < row["max_attempts"]:
+                conn.execute("UPDATE jobs SET status = ?, error = ?, worker = NULL, lease_until = NULL WHERE id = ?",
+                             (QUEUED, error, job_id))
+            else:
+                conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                             (FAILED, error, time.time(), job_id))
+            return self._job(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+        return self._transaction(update)
+
+    def cancel(self, job_id: str, reason: str) -> Optional[Job]:
+        def update(conn: sqlite3.Connection) -> Optional[Job]:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)",
+                         (CANCELLED, reason, time.time(), job_id, QUEUED, RUNNING))
+            return self._job(row)
+
+        return self._transaction(update)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def wait(self, timeout: float) -> None:
+        # Other processes add jobs too, so there is nothing local to wait on
+        time.sleep(min(timeout, 0.2))
+
+
+_QUEUES: Dict[str, Callable[[], JobQueue]] = {
+    "memory": MemoryJobQueue,
+    "sqlite": SQLiteJobQueue,
+}
+
+
+def make_job_queue(kind: str = JOB_QUEUE) -> JobQueue:
+    """
+    Builds a job queue backend.
+
+    Raises:
+        ValueError: If kind is not a known backend
+    """
+    factory = _QUEUES.get(kind.lower())
+    if factory is None:
+        raise ValueError(f"Unknown job queue '{kind}'. Available: {', '.join(sorted(_QUEUES))}")
+    return factory()
+
+
+def available_queues() -> List[str]:
+    return sorted(_QUEUES)
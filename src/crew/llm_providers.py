@@ -0,0 +1,97 @@
+"""
+LLM backends for the crew, selected by name.
+
+CREW_LLM_PROVIDER picks the provider:
+    gemini    the real model (default)
+    scripted  FakeLLM: deterministic tool calls and answers, no network ("fake" is an alias)
+    replay    ReplayLLM: plays back CREW_LLM_TRANSCRIPT, falling back to the script
+
+CREW_LLM_RECORD=<path> wraps whichever provider is chosen in a RecordingLLM, so
+a live run can be captured once and replayed in benchmarks and CI.
+"""
+
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from crewai import LLM
+
+
+# "gemini" (default), "scripted" or "replay"
+LLM_PROVIDER = os.getenv("CREW_LLM_PROVIDER", "gemini").lower()
+
+# name -> factory(model, stream, api_key) returning an LLM
+_PROVIDERS: Dict[str, Callable[..., Any]] = {}
+
+
+def register_provider(*names: str):
+    """Decorator registering an LLM factory under one or more provider names"""
+    def decorator(factory: Callable[..., Any]) -> Callable[..., Any]:
+        for name in names:
+            _PROVIDERS[name] = factory
+        return factory
+    return decorator
+
+
+def available_providers() -> List[str]:
+    return sorted(_PROVIDERS)
+
+
+@register_provider("gemini")
+def _gemini(model: str, stream: bool = False, api_key: Optional[str] = None) -> Any:
+    kwargs = {"api_key": api_key} if api_key else {}
+    if stream:
+        kwargs["stream"] = True
+    return LLM(model=model, **kwargs)
+
+
+def _fake_settings() -> Dict[str, float]:
+    return {
+        "latency": float(os.getenv("FAKE_LLM_LATENCY", "0")),
+        "jitter": float(os.getenv("FAKE_LLM_JITTER", "0")),
+    }
+
+
+@register_provider("scripted", "fake")
+def _scripted(model: str, stream: bool = False, api_key: Optional[str] = None) -> Any:
+    from src.crew.perf.fake_llm import FakeLLM
+    return FakeLLM(model="fake", stream=stream, **_fake_settings())
+
+
+@register_provider("replay")
+def _replay(model: str, stream: bool = False, api_key: Optional[str] = None) -> Any:
+    from src.crew.perf.fake_llm import ReplayLLM
+    transcript = os.getenv("CREW_LLM_TRANSCRIPT", "")
+    if not transcript:
+        raise ValueError("CREW_LLM_PROVIDER=replay needs CREW_LLM_TRANSCRIPT (a transcript recorded "
+                         "with CREW_LLM_RECORD)")
+    return ReplayLLM(
+        model="replay",
+        stream=stream,
+        transcript=transcript,
+        recorded_latency=os.getenv("CREW_LLM_REPLAY_TIMING", "false").lower() == "true",
+        **_fake_settings(),
+    )
+
+
+def build_llm(provider: str, model: str, stream: bool = False, api_key: Optional[str] = None) -> Any:
+    """
+    Builds an LLM client for a provider.
+
+    Args:
+        provider: Registered provider name (see available_providers())
+        model: Model name passed to real providers
+        stream: Stream the response as LLMStreamChunkEvents
+        api_key: Provider API key (defaults to the environment)
+
+    Raises:
+        ValueError: If the provider is unknown or misconfigured
+    """
+    factory = _PROVIDERS.get(provider.lower())
+    if factory is None:
+        raise ValueError(f"Unknown LLM provider '{provider}'. Available: {', '.join(available_providers())}")
+    llm = factory(model, stream=stream, api_key=api_key)
+    record = os.getenv("CREW_LLM_RECORD", "")
+    if record:
+        from src.crew.perf.fake_llm import RecordingLLM
+        return RecordingLLM(model=getattr(llm, "model", model), inner=llm, path=record)
+    return llm
@@ -2,6 +2,7 @@
 
 import sys
 from conversation_crew import ConversationCrew
+from src.crew.schemas import to_answer
 
 def main():
     """
@@ -31,12 +32,19 @@ def main():
     
     try:
         # Run the crew with inputs
-        result = crew.crew().kickoff(inputs={'user_question': user_question})
+        result = crew.kickoff(user_question)
         
         print("\n✅ Analysis Complete!")
         print("-" * 60)
         print("📈 Result:")
-        print(result)
+        answer = to_answer(result)
+        print(answer.insights)
+        for data in answer.market_data:
+            print(f"   {data.symbol}: " + ", ".join(
+                f"{name} {value}" for name, value in data.model_dump(exclude={"symbol", "name"}).items()
+                if value is not None))
+        if answer.sources:
+            print(f"📚 Sources: {', '.join(answer.sources)}")
         
     except Exception as e:
         print(f"❌ Error: {str(e)}")
@@ -0,0 +1,264 @@
+"""
+Model tiering: run each agent on the cheapest model that handles its task.
+
+Tiers (config/models.yaml) are ordered from cheapest to strongest. Each agent
+names a starting tier and a ceiling in agents.yaml. TieredLLM answers on the
+starting tier and escalates one tier at a time, up to the ceiling, when a call
+fails or its output looks unreliable (empty, hedging, malformed ReAct text or
+schema-invalid structured output). Questions that look hard (several stocks,
+comparisons, buy/sell advice) start one tier up. Latency, estimated tokens and
+cost are recorded per tier for /metrics.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import yaml
+from crewai.llms.base_llm import BaseLLM
+from pydantic import PrivateAttr
+
+from src.crew.context_compaction import current_question, estimate_tokens
+from src.crew.llm_providers import LLM_PROVIDER, build_llm
+from src.crew.tools.deadline import check_deadline
+from src.crew.tools.symbols import find_known_symbols
+
+
+TIERING_ENABLED = os.getenv("CREW_MODEL_TIERING", "true").lower() not in ("0", "false", "no")
+MODELS_CONFIG = Path(__file__).resolve().parent / "config" / "models.yaml"
+
+# Answers that admit not knowing; worth a second opinion from a stronger model
+_LOW_CONFIDENCE = re.compile(
+    r"\b(i (?:don't|do not) know|i'm not sure|i am not sure|unable to (?:find|determine|identify)|"
+    r"could not (?:find|determine|identify)|cannot (?:find|determine|identify)|no (?:data|information) available)\b",
+    re.IGNORECASE,
+)
+_HARD_QUESTION = re.compile(r"\b(compare|comparison|versus|vs\.?|better|should i|portfolio|why)\b", re.IGNORECASE)
+
+
+@dataclass
+class ModelTier:
+    """A model and its price in USD per million input and output tokens"""
+
+    name: str
+    model: str
+    input_cost: float = 0.0
+    output_cost: float = 0.0
+
+
+def load_tiers(path: Path = MODELS_CONFIG) -> List[ModelTier]:
+    """Tiers in config order (cheapest first); CREW_MODEL_<TIER> overrides a tier's model"""
+    with open(path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    return [
+        ModelTier(name=name, model=os.getenv(f"CREW_MODEL_{name.upper()}", spec["model"]),
+                  input_cost=float(spec.get("input_cost", 0.0)), output_cost=float(spec.get("output_cost", 0.0)))
+        for name, spec in config.items()
+    ]
+
+
+def is_hard_question(question: str) -> bool:
+    """Several stocks, a comparison or advice: worth a stronger model from the start"""
+    return len(find_known_symbols(question)) > 1 or bool(_HARD_QUESTION.search(question))
+
+
+def assess(response: Any, react: bool, response_model: Any = None) -> Optional[str]:
+    """
+    Reason to distrust a response, or None if it looks usable.
+
+    Args:
+        response: What the LLM returned
+        react: The call used the ReAct text protocol, so the response must
+            hold an Action or a Final Answer
+        response_model: Pydantic model the response must validate against
+    """
+    if response is None or (isinstance(response, str) and not response.strip()):
+        return "empty"
+    if not isinstance(response, str):
+        # Structured objects and native tool calls were validated by the client
+        return None
+    if response_model is not None:
+        try:
+            response_model.model_validate_json(response)
+        except ValueError:
+            return "invalid_schema"
+    elif react and "Final Answer:" not in response and not re.search(r"Action\s*:", response):
+        return "malformed"
+    if _LOW_CONFIDENCE.search(response):
+        return "low_confidence"
+    return None
+
+
+class _TierStats:
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.escalated = 0
+        self.seconds = 0.0
+        self.latencies: deque = deque(maxlen=500)
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+
+class ModelPolicy:
+    """Tier ladder, shared per-tier LLM clients and per-tier accounting"""
+
+    def __init__(self, tiers: List[ModelTier], provider: str = LLM_PROVIDER):
+        self.tiers = tiers
+        self.provider = provider
+        self._index = {tier.name: position for position, tier in enumerate(tiers)}
+        self._clients: Dict[Tuple[str, bool, Optional[str], Tuple[str, ...]], Any] = {}
+        self._lock = threading.Lock()
+        self._stats = {tier.name: _TierStats() for tier in tiers}
+        self._reasons: Dict[str, int] = {}
+        self._hard_questions = 0
+
+    def ladder(self, start: str, ceiling: str, question: str = "") -> List[str]:
+        """Tier names to try in order, from the starting tier up to the ceiling"""
+        first = self._index[start]
+        last = max(first, self._index.get(ceiling, first))
+        if question and first < last and is_hard_question(question):
+            first += 1
+            with self._lock:
+                self._hard_questions += 1
+        return [tier.name for tier in self.tiers[first:last + 1]]
+
+    def client(self, tier: str, stream: bool = False, api_key: Optional[str] = None,
+               stop: Sequence[str] = ()) -> Any:
+        """
+        The shared LLM client for a tier and set of stop words.
+
+        crewAI reads stop words from the client rather than per call, so each
+        distinct set gets its own client and no caller's stop words leak into
+        another's calls (e.g. ReAct stops into structured-output calls).
+        """
+        stop = tuple(sorted(set(stop)))
+        key = (tier, bool(stream), api_key, stop)
+        with self._lock:
+            if key not in self._clients:
+                model = self.tiers[self._index[tier]].model
+                client = build_llm(self.provider, model, stream=bool(stream), api_key=api_key)
+                if stop and hasattr(client, "stop"):
+                    client.stop = list(stop)
+                self._clients[key] = client
+            return self._clients[key]
+
+    def clients(self) -> List[Any]:
+        with self._lock:
+            return list(self._clients.values())
+
+    def record(self, tier: str, seconds: float, messages: List[Any], response: Any,
+               failed: bool = False, reason: Optional[str] = None) -> None:
+        prompt = "".join(str(message.get("content", "")) if isinstance(message, dict) else str(message)
+                         for message in messages)
+        with self._lock:
+            stats = self._stats[tier]
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.latencies.append(seconds)
+            stats.input_tokens += estimate_tokens(prompt)
+            stats.output_tokens += estimate_tokens(str(response or ""))
+            if failed:
+                stats.failures += 1
+            if reason:
+                stats.escalated += 1
+                self._reasons[reason] = self._reasons.get(reason, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls, latency, estimated tokens and cost per tier, plus escalation reasons"""
+        with self._lock:
+            tiers = {}
+            for tier in self.tiers:
+                stats = self._stats[tier.name]
+                latencies = sorted(stats.latencies)
+                cost = (stats.input_tokens * tier.input_cost + stats.output_tokens * tier.output_cost) / 1e6
+                tiers[tier.name] = {
+                    "model": tier.model,
+                    "calls": stats.calls,
+                    "failures": stats.failures,
+                    "escalated": stats.escalated,
+                    "avg_ms": round(stats.seconds / stats.calls * 1000, 1) if stats.calls else None,
+                    "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                    "input_tokens_est": stats.input_tokens,
+                    "output_tokens_est": stats.output_tokens,
+                    "cost_usd_est": round(cost, 6),
+                }
+            return {"enabled": TIERING_ENABLED, "provider": self.provider, "tiers": tiers,
+                    "escalation_reasons": dict(self._reasons), "hard_questions": self._hard_questions}
+
+
+model_policy = ModelPolicy(load_tiers())
+
+
+class TieredLLM(BaseLLM):
+    """
+    An agent's LLM: answers on the cheapest allowed tier, escalating on failure or doubt.
+
+    Once a task has escalated, its later calls (the rest of that agent's ReAct
+    loop) start on the tier that worked. Streamed calls escalate only on
+    errors, since their tokens have already reached the client.
+
+    Attributes:
+        tier: Starting tier name
+        max_tier: Highest tier to escalate to
+    """
+
+    llm_type: str = "tiered"
+    tier: str = "standard"
+    max_tier: str = "standard"
+    _sticky: "OrderedDict[str, str]" = PrivateAttr(default_factory=OrderedDict)
+    # Concurrent kickoffs share the agent's LLM and update _sticky together
+    _sticky_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def _client(self, tier: str) -> Any:
+        # crewAI sets ReAct stop words on the agent's LLM; the model that answers needs them
+        return model_policy.client(tier, stream=self.stream, api_key=self.api_key, stop=self.stop or ())
+
+    def supports_function_calling(self) -> bool:
+        return self._client(self.tier).supports_function_calling()
+
+    def get_context_window_size(self) -> int:
+        return self._client(self.tier).get_context_window_size()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        task_id = str(getattr(from_task, "id", "") or "")
+        with self._sticky_lock:
+            start = self._sticky.get(task_id, self.tier)
+        ladder = model_policy.ladder(start, self.max_tier, current_question.get() if start == self.tier else "")
+        response = None
+        for position, tier in enumerate(ladder):
+            # No new model call, first or escalated, for an abandoned run
+            check_deadline()
+            client = self._client(tier)
+            last = position == len(ladder) - 1
+            started = time.perf_counter()
+            try:
+                response = client.call(messages, tools=tools, callbacks=callbacks,
+                                       available_functions=available_functions, from_task=from_task,
+                                       from_agent=from_agent, response_model=response_model)
+            except Exception:
+                model_policy.record(tier, time.perf_counter() - started, messages, None, failed=True,
+                                    reason=None if last else "error")
+                if last:
+                    raise
+                continue
+            reason = None
+            if not last and not self.stream:  # a streamed answer has already been shown
+                reason = assess(response, not client.supports_function_calling(), response_model)
+            model_policy.record(tier, time.perf_counter() - started, messages, response, reason=reason)
+            if reason is None:
+                if task_id and tier != self.tier:
+                    with self._sticky_lock:
+                        self._sticky[task_id] = tier
+                        while len(self._sticky) > 256:
+                            self._sticky.popitem(last=False)
+                return response
+        return response
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Per-task orchestration benchmark for ConversationCrew, with no network.
+
+Runs the crew with a scripted or replayed LLM (see src/crew/llm_providers.py)
+and replayed upstream data, and splits each task's wall time into LLM time,
+tool time and the remainder: crewAI scheduling, prompt assembly, tool dispatch
+and output parsing. With --baseline it fails (exit 1) when that overhead
+regresses, so orchestration changes can be gated in CI.
+
+Usage:
+    python -m src.crew.perf.crew_bench --iterations 10 --json bench.json
+    python -m src.crew.perf.crew_bench --provider replay --transcript run.jsonl
+    python -m src.crew.perf.crew_bench --baseline bench.json --tolerance 0.5
+
+Record a transcript from a live run with CREW_LLM_RECORD=run.jsonl.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.crew.tools.fixtures import FIXTURE_DIR
+
+
+DEFAULT_QUESTIONS = [
+    "Tell me about TCS",                    # names a symbol: parallel research + data fetch
+    "What are the top gainers today?",      # no symbol: sequential pipeline
+]
+
+
+class TaskTimer:
+    """Collects task and tool timings from crewAI events (handlers run on the bus's threads)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started: Dict[str, Any] = {}
+        self.finished: Dict[str, Any] = {}
+        self.tools: Dict[str, List[float]] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started.clear()
+            self.finished.clear()
+            self.tools.clear()
+
+    def on_task_started(self, source, event) -> None:
+        with self._lock:
+            self.started[event.task_name or ""] = event.timestamp
+
+    def on_task_completed(self, source, event) -> None:
+        with self._lock:
+            self.finished[event.task_name or ""] = event.timestamp
+
+    def on_tool_finished(self, source, event) -> None:
+        with self._lock:
+            self.tools.setdefault(event.task_name or "", []).append(
+                (event.finished_at - event.started_at).total_seconds())
+
+
+@contextlib.contextmanager
+def quiet_stdout():
+    """Silence the crew's verbose console output at the file-descriptor level
+    (crewAI's console keeps its own handle on the original stdout)"""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    try:
+        with open(os.devnull, "w") as devnull:
+            os.dup2(devnull.fileno(), 1)
+            yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+
+
+def run_once(crew, question: str, timer: TaskTimer, llms: Callable[[], List[Any]], bus) -> Dict[str, Any]:
+    """One kickoff, broken down per task (milliseconds)"""
+    timer.reset()
+    for llm in llms():
+        llm.call_stats(reset=True)
+    memo: Dict[str, Any] = {}
+    started = time.perf_counter()
+    with quiet_stdout():
+        crew.kickoff(question, on_event=lambda event: memo.update(event) if event["type"] == "memo" else None)
+        total = time.perf_counter() - started
+        # Event handlers run on the bus's threads; wait for the timings to land
+        bus.flush()
+
+    llm_stats: Dict[str, Dict[str, float]] = {}
+    for llm in llms():
+        for task, stats in llm.call_stats(reset=True).items():
+            entry = llm_stats.setdefault(task, {"calls": 0, "seconds": 0.0})
+            entry["calls"] += stats["calls"]
+            entry["seconds"] += stats["seconds"]
+
+    tasks = {}
+    for name, began in timer.started.items():
+        if name not in timer.finished:
+            continue
+        wall = (timer.finished[name] - began).total_seconds()
+        llm_seconds = llm_stats.get(name, {}).get("seconds", 0.0)
+        tool_seconds = sum(timer.tools.get(name, []))
+        tasks[name] = {
+            "wall_ms": wall * 1000,
+            "llm_ms": llm_seconds * 1000,
+            "tool_ms": tool_seconds * 1000,
+            "overhead_ms": max(0.0, wall - llm_seconds - tool_seconds) * 1000,
+            "llm_calls": llm_stats.get(name, {}).get("calls", 0),
+            "tool_calls": len(timer.tools.get(name, [])),
+        }
+    return {"total_ms": total * 1000, "tasks": tasks, "duplicates_avoided": memo.get("duplicates_avoided", 0)}
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median (and p90 for totals) over the measured runs"""
+    median = lambda values: round(statistics.median(values), 2) if values else None
+    totals = sorted(run["total_ms"] for run in runs)
+    tasks: Dict[str, Dict[str, Any]] = {}
+    for name in sorted({name for run in runs for name in run["tasks"]}):
+        samples = [run["tasks"][name] for run in runs if name in run["tasks"]]
+        tasks[name] = {metric: median([sample[metric] for sample in samples]) for metric in samples[0]}
+    return {
+        "runs": len(runs),
+        "total_ms": median(totals),
+        "total_p90_ms": round(totals[min(len(totals) - 1, int(0.9 * len(totals)))], 2),
+        "duplicates_avoided": median([run.get("duplicates_avoided", 0) for run in runs]),
+        "tasks": tasks,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, floor_ms: float) -> List[str]:
+    """Overhead regressions beyond tolerance (relative) and floor_ms (absolute)"""
+    regressions = []
+    for question, current in report["questions"].items():
+        previous = baseline.get("questions", {}).get(question)
+        if previous is None:
+            continue
+        checks = [("total", current["total_ms"], previous["total_ms"])]
+        checks += [(name, stats["overhead_ms"], previous["tasks"][name]["overhead_ms"])
+                   for name, stats in current["tasks"].items() if name in previous["tasks"]]
+        for name, now, before in checks:
+            if now > before * (1 + tolerance) and now - before > floor_ms:
+                regressions.append(f"{question!r} {name}: {before:.1f} -> {now:.1f} ms")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-task crew orchestration benchmark (no network)")
+    parser.add_argument("--provider", choices=["scripted", "replay"], default="scripted")
+    parser.add_argument("--transcript", help="Transcript for --provider replay (recorded with CREW_LLM_RECORD)")
+    parser.add_argument("--iterations", type=int, default=5, help="Measured runs per question")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured runs per question")
+    parser.add_argument("--questions", help="File with one question per line")
+    parser.add_argument("--cold-cache", action="store_true", help="Clear the API response cache before each run")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Earlier --json report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative overhead growth")
+    parser.add_argument("--floor-ms", type=float, default=20.0, help="Ignore regressions smaller than this")
+    args = parser.parse_args(argv)
+
+    # The crew module builds its LLMs and tools at import time
+    os.environ["CREW_LLM_PROVIDER"] = args.provider
+    os.environ["FAKE_LLM_LATENCY"] = "0"
+    os.environ.pop("CREW_LLM_RECORD", None)
+    if args.transcript:
+        os.environ["CREW_LLM_TRANSCRIPT"] = args.transcript
+    os.environ.setdefault("INDIAN_STOCK_REPLAY", str(FIXTURE_DIR))
+    os.environ.setdefault("SERPER_API_KEY", "bench")
+    os.environ["TIMELINE_ENABLED"] = "false"
+    os.environ["CACHE_WARMER_ENABLED"] = "false"
+    os.environ["CREWAI_DISABLE_TELEMETRY"] = "true"
+
+    from crewai.events import TaskCompletedEvent, TaskStartedEvent, ToolUsageFinishedEvent, crewai_event_bus
+    from src.crew import conversation_crew
+    from src.crew.context_compaction import context_stats
+    from src.crew.model_policy import model_policy
+    from src.crew.tools.cache import response_cache
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, "r", encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    timer = TaskTimer()
+    crewai_event_bus.on(TaskStartedEvent)(timer.on_task_started)
+    crewai_event_bus.on(TaskCompletedEvent)(timer.on_task_completed)
+    crewai_event_bus.on(ToolUsageFinishedEvent)(timer.on_tool_finished)
+    crew = conversation_crew.ConversationCrew()
+    # Scripted clients answering the agents: the tier clients, or the shared pair when tiering is off
+    llms = lambda: [client for client in {id(client): client for client in
+                                          [conversation_crew.llm, conversation_crew.coordinator_llm,
+                                           *model_policy.clients()]}.values()
+                    if hasattr(client, "call_stats")]
+
+    report: Dict[str, Any] = {"provider": args.provider, "iterations": args.iterations, "questions": {}}
+    print(f"⏱️ Crew orchestration benchmark ({args.provider} LLM, {args.iterations} runs per question)")
+    for question in questions:
+        runs = []
+        for index in range(args.warmup + args.iterations):
+            if index == args.warmup:
+                context_stats.reset()
+            if args.cold_cache:
+                response_cache.clear()
+            run = run_once(crew, question, timer, llms, crewai_event_bus)
+            if index >= args.warmup:
+                runs.append(run)
+        summary = summarize(runs)
+        summary["context"] = context_stats.stats()
+        report["questions"][question] = summary
+
+        print(f"\n❓ {question}")
+        print("-" * 30)
+        print(f"Kickoff: median {summary['total_ms']} ms, p90 {summary['total_p90_ms']} ms, "
+              f"{summary['duplicates_avoided']:.0f} repeated tool calls memoized per run")
+        context = summary["context"]
+        if context["runs"]:
+            print(f"Coordinator context: {context['raw_tokens'] // context['runs']} -> "
+                  f"{context['compact_tokens'] // context['runs']} tokens per run "
+                  f"(compaction {'on' if context['enabled'] else 'off'}), "
+                  f"time to first token p50 {context['coordinator_ttft_ms']['p50']} ms")
+        for name, stats in summary["tasks"].items():
+            print(f"  {name}: wall {stats['wall_ms']} ms = LLM {stats['llm_ms']} ({stats['llm_calls']:.0f} calls)"
+                  f" + tools {stats['tool_ms']} ({stats['tool_calls']:.0f} calls) + overhead {stats['overhead_ms']} ms")
+
+    if args.provider == "replay":
+        report["replay"] = {"hits": 0, "misses": 0}
+        for llm in llms():
+            stats = llm.replay_stats()
+            report["replay"]["hits"] += stats["hits"]
+            report["replay"]["misses"] += stats["misses"]
+        print(f"\n🎞️ Replay: {report['replay']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.floor_ms)
+        if regressions:
+            print("\n❌ Orchestration overhead regressed:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\n✅ No overhead regression against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Deterministic stand-ins for the Gemini LLM, for load tests, benchmarks and offline runs.
+
+FakeLLM speaks crewAI's ReAct text protocol: for the data analyst it issues a
+short script of real tool calls for the symbol named in the task, then returns
+a final answer built from the observations; every other agent answers
+immediately. Latency per call is configurable, and the same prompt always
+produces the same response and delay.
+
+RecordingLLM wraps a real LLM and writes every call to a JSONL transcript;
+ReplayLLM plays such a transcript back, so a recorded run's agent turns can be
+reproduced without the network.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from crewai.llms.base_llm import BaseLLM
+from pydantic import PrivateAttr
+
+from src.crew.tools.symbols import find_known_symbols
+
+
+_TOOL_NAME = re.compile(r"Tool Name: (\w+)")
+
+
+def _content(message: Any) -> str:
+    return str(message.get("content", "")) if isinstance(message, dict) else str(message)
+
+
+def _as_messages(messages: Any) -> List[Any]:
+    return [{"role": "user", "content": messages}] if isinstance(messages, str) else list(messages)
+
+
+def prompt_digest(messages: List[Any]) -> str:
+    """Stable hash of a conversation's roles and contents"""
+    digest = hashlib.sha256()
+    for message in messages:
+        role = message.get("role", "") if isinstance(message, dict) else ""
+        digest.update(f"{role}\x00{_content(message)}\x01".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def turn_key(messages: List[Any], from_task: Any = None, from_agent: Any = None) -> Tuple[str, str, int]:
+    """(agent role, task name, turn) identifying a call independently of prompt text"""
+    turn = sum(1 for message in messages if isinstance(message, dict) and message.get("role") == "assistant")
+    return (str(getattr(from_agent, "role", "") or "").strip(), str(getattr(from_task, "name", "") or ""), turn)
+
+
+class FakeLLM(BaseLLM):
+    """
+    Scripted LLM: (tool calls for the task's symbol, then a final answer).
+
+    Attributes:
+        latency: Mean seconds per call
+        jitter: Relative spread of the delay (0.5 = +/-50%)
+        max_tool_calls: Tool calls scripted per task before answering
+        answer_chars: Observation text carried into the final answer
+    """
+
+    llm_type: str = "fake"
+    latency: float = 0.0
+    jitter: float = 0.0
+    max_tool_calls: int = 2
+    answer_chars: int = 1500
+    _stats: Dict[str, List[float]] = PrivateAttr(default_factory=dict)
+    _stats_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def supports_function_calling(self) -> bool:
+        # Tool calls are written as ReAct text, the path crewAI uses for plain LLMs
+        return False
+
+    def script(self, task: str, tools: List[str]) -> List[Tuple[str, dict]]:
+        """Tool calls for a task, restricted to the tools the agent has"""
+        symbols = find_known_symbols(task)
+        if symbols:
+            calls = [("get_stock_details", {"symbol": symbols[0]}),
+                     ("get_stock_target_price", {"stock_id": symbols[0]})]
+        else:
+            calls = [("get_trending_stocks", {})]
+        return [(name, args) for name, args in calls if name in tools][:self.max_tool_calls]
+
+    def respond(self, messages: List[Any], from_task: Any = None, from_agent: Any = None) -> str:
+        """The response for a conversation, without any delay"""
+        system = " ".join(_content(message) for message in messages
+                          if isinstance(message, dict) and message.get("role") == "system")
+        task = next((_content(message) for message in messages
+                     if isinstance(message, dict) and message.get("role") == "user"), _content(messages[-1]))
+        tools = _TOOL_NAME.findall(system)
+        # Each tool round trip adds one assistant message holding the Observation
+        observations = [_content(message) for message in messages
+                        if isinstance(message, dict) and message.get("role") == "assistant"]
+        script = self.script(task, tools)
+        if len(observations) < len(script):
+            name, args = script[len(observations)]
+            return f"Thought: I need {name} for this.\nAction: {name}\nAction Input: {json.dumps(args)}"
+
+        gathered = "\n".join(observation.split("Observation:", 1)[-1].strip() for observation in observations)
+        answer = gathered[:self.answer_chars] if gathered else f"Scripted answer to: {task.strip()[:200]}"
+        return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+    def delay(self, messages: List[Any], from_task: Any = None, from_agent: Any = None) -> float:
+        """Seconds to wait before answering"""
+        if not self.latency:
+            return 0.0
+        # Seeded by the prompt so a replayed run sees the same delays
+        rng = random.Random(zlib.crc32(_content(messages[-1]).encode("utf-8")) ^ len(messages))
+        return max(0.0, self.latency * (1 + self.jitter * (2 * rng.random() - 1)))
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None) -> str:
+        started = time.perf_counter()
+        messages = _as_messages(messages)
+        response = self.respond(messages, from_task=from_task, from_agent=from_agent)
+        if response_model is not None:
+            response = self.structured(response, response_model)
+        wait = self.delay(messages, from_task=from_task, from_agent=from_agent)
+        if wait:
+            time.sleep(wait)
+        if self.stream:
+            for start in range(0, len(response), 64):
+                self._emit_stream_chunk_event(response[start:start + 64], from_task=from_task, from_agent=from_agent)
+        self._count(str(getattr(from_task, "name", "") or ""), time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def structured(response: str, response_model: Any) -> str:
+        """The response as JSON for response_model, the way a structured-output model answers"""
+        try:
+            response_model.model_validate_json(response)
+            return response
+        except ValueError:
+            pass
+        answer = response.split("Final Answer:", 1)[-1].strip()
+        # Fill the required text fields; everything else keeps its default
+        payload = {name: answer for name, field in response_model.model_fields.items()
+                   if field.is_required() and field.annotation is str}
+        return response_model.model_validate(payload).model_dump_json()
+
+    def _count(self, task: str, seconds: float) -> None:
+        with self._stats_lock:
+            entry = self._stats.setdefault(task, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def call_stats(self, reset: bool = False) -> Dict[str, Dict[str, float]]:
+        """Calls and seconds spent answering, per task name"""
+        with self._stats_lock:
+            stats = {task: {"calls": calls, "seconds": seconds} for task, (calls, seconds) in self._stats.items()}
+            if reset:
+                self._stats.clear()
+        return stats
+
+    def get_context_window_size(self) -> int:
+        return 1_000_000
+
+
+class ReplayLLM(FakeLLM):
+    """
+    Plays back a RecordingLLM transcript.
+
+    A call is answered with the recorded response for the identical prompt, or
+    failing that for the same (agent, task, turn); calls the transcript does
+    not cover fall back to FakeLLM's script and are counted as misses.
+
+    Attributes:
+        transcript: Path of the JSONL transcript
+        recorded_latency: Wait as long as the recorded call took (instead of latency)
+    """
+
+    llm_type: str = "replay"
+    transcript: str = ""
+    recorded_latency: bool = False
+    _by_prompt: Dict[str, Dict[str, Any]] = PrivateAttr(default_factory=dict)
+    _by_turn: Dict[Tuple[str, str, int], Dict[str, Any]] = PrivateAttr(default_factory=dict)
+    # A dict so crew copies of this LLM, which share private state, count together
+    _outcomes: Dict[str, int] = PrivateAttr(default_factory=lambda: {"hits": 0, "misses": 0})
+
+    def model_post_init(self, context: Any) -> None:
+        super().model_post_init(context)
+        if not self.transcript:
+            return
+        with open(self.transcript, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                # First recording wins, so repeated prompts replay the earliest answer
+                self._by_prompt.setdefault(entry["prompt_sha"], entry)
+                self._by_turn.setdefault((entry["agent"], entry["task"], entry["turn"]), entry)
+
+    def _entry(self, messages: List[Any], from_task: Any, from_agent: Any) -> Optional[Dict[str, Any]]:
+        return self._by_prompt.get(prompt_digest(messages)) or self._by_turn.get(turn_key(messages, from_task, from_agent))
+
+    def respond(self, messages: List[Any], from_task: Any = None, from_agent: Any = None) -> str:
+        entry = self._entry(messages, from_task, from_agent)
+        with self._stats_lock:
+            self._outcomes["misses" if entry is None else "hits"] += 1
+        return entry["response"] if entry is not None else super().respond(messages)
+
+    def delay(self, messages: List[Any], from_task: Any = None, from_agent: Any = None) -> float:
+        if self.recorded_latency:
+            entry = self._entry(messages, from_task, from_agent)
+            if entry is not None:
+                return float(entry.get("seconds", 0.0))
+        return super().delay(messages, from_task, from_agent)
+
+    def replay_stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {"entries": len(self._by_prompt), **self._outcomes}
+
+
+class RecordingLLM(BaseLLM):
+    """
+    Wraps an LLM and appends each call to a JSONL transcript for ReplayLLM.
+
+    Recording forces the ReAct text protocol (no native function calling), so
+    every response is plain text that replays through the same parsing path.
+
+    Attributes:
+        inner: The LLM that answers
+        path: Transcript file, appended to
+    """
+
+    llm_type: str = "recording"
+    inner: Any = None
+    path: str = ""
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None) -> str:
+        messages = _as_messages(messages)
+        started = time.perf_counter()
+        response = self.inner.call(messages, callbacks=callbacks, from_task=from_task, from_agent=from_agent,
+                                   response_model=response_model)
+        agent, task, turn = turn_key(messages, from_task, from_agent)
+        text = response.model_dump_json() if hasattr(response, "model_dump_json") else str(response)
+        entry = {"agent": agent, "task": task, "turn": turn, "prompt_sha": prompt_digest(messages),
+                 "response": text, "seconds": round(time.perf_counter() - started, 4)}
+        with self._lock:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return response
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Load test for the FastAPI service with a scripted LLM and replayed upstream data.
+
+Starts api:app under gunicorn (the Dockerfile's server and gunicorn.conf.py) with
+CREW_LLM_PROVIDER=fake and either INDIAN_STOCK_REPLAY pointing at the fixtures
+or, with --upstream mock, INDIAN_STOCK_API_URL pointing at a local mock server
+(mock_api.py) so upstream calls cross a real socket, then
+drives /analyze-stock with open-loop Poisson arrivals at each requested rate.
+Reports throughput, latency percentiles and error rate per rate, plus RSS and
+event-loop lag per worker, so the worker count can be sized from data.
+
+Usage:
+    python -m src.crew.perf.loadtest --workers 2 --rates 0.5,1,2,4 --duration 30
+    python -m src.crew.perf.loadtest --upstream mock --mock-args "--error-rate 0.02" --rates 1,2
+    python -m src.crew.perf.loadtest --url http://localhost:8000 --rates 1   # existing server
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from src.crew.perf.probe import rss_bytes
+from src.crew.tools.fixtures import FIXTURE_DIR
+
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+DEFAULT_QUESTIONS = [
+    "Tell me about TCS",
+    "What is the analyst target price for Reliance?",
+    "How has Infosys performed over the last year?",
+    "What are the top gainers today?",
+    "Should I buy HDFC Bank?",
+    "Current price of ITC",
+    "Give me an overview of Wipro",
+    "Which stocks hit 52 week highs today?",
+]
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _children(pid: int) -> List[int]:
+    children: List[int] = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children", "r", encoding="utf-8") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def worker_pids(server_pid: int) -> Dict[int, int]:
+    """
+    Every descendant of the server mapped to its parent: gunicorn workers and,
+    under them, their crew worker processes. Just the server when it has none.
+    """
+    parents: Dict[int, int] = {}
+    pending = [server_pid]
+    while pending:
+        parent = pending.pop()
+        for child in _children(parent):
+            if child not in parents:
+                parents[child] = parent
+                pending.append(child)
+    return parents or {server_pid: 0}
+
+
+def start_mock(args) -> subprocess.Popen:
+    """Mock Indian Stock API serving the fixtures, with upstream_latency per request"""
+    command = [sys.executable, "-m", "src.crew.perf.mock_api", "serve", "--port", str(args.mock_port),
+               "--latency", f"fixed:{args.upstream_latency}", *shlex.split(args.mock_args)]
+    return subprocess.Popen(command, cwd=REPO_ROOT,
+                            stdout=subprocess.DEVNULL if not args.server_logs else None,
+                            stderr=subprocess.DEVNULL if not args.server_logs else None)
+
+
+def start_server(args) -> subprocess.Popen:
+    env = dict(os.environ)
+    if args.upstream == "mock":
+        env.pop("INDIAN_STOCK_REPLAY", None)
+        env["INDIAN_STOCK_API_URL"] = f"http://127.0.0.1:{args.mock_port}"
+    else:
+        env.update({"INDIAN_STOCK_REPLAY": args.replay,
+                    "INDIAN_STOCK_REPLAY_LATENCY": str(args.upstream_latency)})
+    env.update({
+        "CREW_LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY": str(args.llm_latency),
+        "FAKE_LLM_JITTER": str(args.llm_jitter),
+        # Keep load-test traffic out of the time-travel history
+        "TIMELINE_ENABLED": "false",
+        "CACHE_WARMER_ENABLED": "true" if args.warmer else "false",
+        "SERPER_API_KEY": env.get("SERPER_API_KEY", "load-test"),
+        "CREW_EXECUTOR": args.executor,
+        "CREW_WORKER_PROCESSES": str(args.worker_processes),
+        "CREW_EXECUTOR_THREADS": str(args.executor_threads),
+        "CREW_EXECUTOR_QUEUE": str(args.executor_queue),
+    })
+    # The Dockerfile's settings (gunicorn.conf.py), with workers and bind from the options
+    command = ["gunicorn", "api:app", "-c", "gunicorn.conf.py", "--workers", str(args.workers),
+               "--bind", f"127.0.0.1:{args.port}"]
+    return subprocess.Popen(command, cwd=REPO_ROOT, env=env,
+                            stdout=subprocess.DEVNULL if not args.server_logs else None,
+                            stderr=subprocess.DEVNULL if not args.server_logs else None)
+
+
+async def wait_healthy(client: httpx.AsyncClient, url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{url}/health", timeout=2)).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server at {url} did not become healthy within {timeout:.0f}s")
+
+
+async def sample_workers(client: httpx.AsyncClient, url: str, server_pid: Optional[int],
+                         workers: Dict[int, Dict[str, Any]], stop: asyncio.Event) -> None:
+    """Poll /metrics (whichever worker answers) and worker RSS until stop is set"""
+    while not stop.is_set():
+        if server_pid is not None:
+            for pid, parent in worker_pids(server_pid).items():
+                rss = rss_bytes(pid)
+                if rss is not None:
+                    entry = workers.setdefault(pid, {})
+                    if parent != server_pid and parent:
+                        entry["parent"] = parent
+                    entry["rss_mb_max"] = max(entry.get("rss_mb_max", 0.0), round(rss / 2 ** 20, 1))
+        try:
+            process = (await client.get(f"{url}/metrics", timeout=5)).json().get("process", {})
+            entry = workers.setdefault(process["pid"], {})
+            entry["loop_lag"] = process.get("loop_lag")
+            entry["threads"] = process.get("threads")
+            if process.get("rss_mb") is not None:
+                entry["rss_mb_max"] = max(entry.get("rss_mb_max", 0.0), process["rss_mb"])
+        except (httpx.HTTPError, ValueError, KeyError):
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=1.0)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_rate(client: httpx.AsyncClient, url: str, rate: float, duration: float,
+                   questions: List[str], timeout: float, seed: int) -> Dict[str, Any]:
+    """Open-loop Poisson arrivals at rate requests/second for duration seconds"""
+    rng = random.Random(seed)
+    results: List[Dict[str, Any]] = []
+
+    async def one(question: str) -> None:
+        started = time.perf_counter()
+        try:
+            response = await client.post(f"{url}/analyze-stock", json={"question": question}, timeout=timeout)
+            outcome = {"status": response.status_code}
+            if response.status_code != 200:
+                outcome["error"] = response.text[:300]
+        except httpx.HTTPError as e:
+            outcome = {"status": None, "error": type(e).__name__}
+        outcome["latency"] = time.perf_counter() - started
+        results.append(outcome)
+
+    tasks = []
+    began = time.perf_counter()
+    next_at = began
+    index = 0
+    while True:
+        next_at += rng.expovariate(rate)
+        if next_at - began > duration:
+            break
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        tasks.append(asyncio.create_task(one(questions[index % len(questions)])))
+        index += 1
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - began
+
+    ok = [result["latency"] for result in results if result["status"] == 200]
+    errors = len(results) - len(ok)
+    statuses: Dict[str, int] = {}
+    sample = None
+    for result in results:
+        if result["status"] != 200:
+            label = str(result["status"] or result.get("error"))
+            statuses[label] = statuses.get(label, 0) + 1
+            sample = sample or result.get("error")
+    round_or_none = lambda value: round(value, 3) if value is not None else None
+    return {
+        "rate": rate,
+        "sent": len(results),
+        "ok": len(ok),
+        "errors": errors,
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "error_statuses": statuses,
+        "error_sample": sample,
+        "throughput": round(len(ok) / elapsed, 3) if elapsed else None,
+        "latency_p50": round_or_none(percentile(ok, 0.5)),
+        "latency_p90": round_or_none(percentile(ok, 0.9)),
+        "latency_p99": round_or_none(percentile(ok, 0.99)),
+        "latency_max": round_or_none(max(ok) if ok else None),
+        "elapsed": round(elapsed, 2),
+    }
+
+
+async def main_async(args) -> Dict[str, Any]:
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, "r", encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    mock = start_mock(args) if args.upstream == "mock" and not args.url else None
+    server = None if args.url else start_server(args)
+    url = args.url or f"http://127.0.0.1:{args.port}"
+    report: Dict[str, Any] = {"url": url, "workers": args.workers if server else None,
+                              "llm_latency": args.llm_latency, "upstream_latency": args.upstream_latency,
+                              "upstream": args.upstream, "rates": []}
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    try:
+        async with httpx.AsyncClient(limits=limits) as client:
+            await wait_healthy(client, url, args.startup_timeout)
+            for step, rate in enumerate(args.rates):
+                workers: Dict[int, Dict[str, Any]] = {}
+                stop = asyncio.Event()
+                sampler = asyncio.create_task(sample_workers(client, url, server.pid if server else None,
+                                                             workers, stop))
+                result = await run_rate(client, url, rate, args.duration, questions, args.timeout,
+                                        seed=args.seed + step)
+                stop.set()
+                await sampler
+                result["workers"] = {str(pid): stats for pid, stats in sorted(workers.items())}
+                report["rates"].append(result)
+                print_rate(result)
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if mock is not None:
+            report["mock"] = mock_stats(args.mock_port)
+            mock.terminate()
+            mock.wait(timeout=10)
+
+    sustainable = [result["rate"] for result in report["rates"]
+                   if result["error_rate"] <= args.max_error_rate and result["latency_p99"] is not None
+                   and result["latency_p99"] <= args.slo_p99]
+    report["max_sustainable_rate"] = max(sustainable) if sustainable else None
+    return report
+
+
+def mock_stats(port: int) -> Optional[Dict[str, Any]]:
+    """Request, connection and injected-failure counts from the mock server"""
+    try:
+        return httpx.get(f"http://127.0.0.1:{port}/__stats", timeout=5).json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+def print_rate(result: Dict[str, Any]) -> None:
+    print(f"\n🚦 {result['rate']} req/s for {result['elapsed']}s")
+    print("-" * 30)
+    print(f"Sent: {result['sent']} | OK: {result['ok']} | Errors: {result['errors']} "
+          f"({result['error_rate'] * 100:.1f}%) {result['error_statuses'] or ''}")
+    if result["error_sample"]:
+        print(f"First error: {result['error_sample']}")
+    print(f"Throughput: {result['throughput']} req/s")
+    print(f"Latency p50/p90/p99/max: {result['latency_p50']} / {result['latency_p90']} / "
+          f"{result['latency_p99']} / {result['latency_max']} s")
+    for pid, stats in result["workers"].items():
+        if stats.get("parent"):
+            continue
+        lag = stats.get("loop_lag") or {}
+        print(f"  Worker {pid}: RSS max {stats.get('rss_mb_max')} MB | "
+              f"loop lag p99 {lag.get('p99_ms')} ms, max {lag.get('max_ms')} ms")
+        for child, child_stats in result["workers"].items():
+            if str(child_stats.get("parent")) == pid:
+                print(f"    Child {child}: RSS max {child_stats.get('rss_mb_max')} MB")
+    total = sum(stats.get("rss_mb_max", 0.0) for stats in result["workers"].values())
+    print(f"  Total RSS (sum of per-process max): {round(total, 1)} MB")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test /analyze-stock with a scripted LLM")
+    parser.add_argument("--url", help="Test an already running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=2, help="Gunicorn workers to start")
+    parser.add_argument("--executor", choices=["process", "thread"], default="process",
+                        help="Run crews in worker processes or executor threads")
+    parser.add_argument("--worker-processes", type=int, default=2, help="Crew worker processes per web worker")
+    parser.add_argument("--executor-threads", type=int, default=8, help="Crew executor threads per worker")
+    parser.add_argument("--executor-queue", type=int, default=16,
+                        help="Crew runs that may wait per worker before requests get 503")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rates", type=lambda text: [float(rate) for rate in text.split(",")],
+                        default=[0.5, 1.0, 2.0], help="Comma-separated arrival rates (requests/second)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of arrivals per rate")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Mean seconds per fake LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=0.3, help="Relative spread of the LLM delay")
+    parser.add_argument("--upstream-latency", type=float, default=0.15,
+                        help="Seconds per replayed Indian Stock API request")
+    parser.add_argument("--upstream", choices=["replay", "mock"], default="replay",
+                        help="Serve upstream data in-process (replay) or from the local mock server (mock)")
+    parser.add_argument("--replay", default=str(FIXTURE_DIR), help="Fixture directory or snapshot pack")
+    parser.add_argument("--mock-port", type=int, default=8900)
+    parser.add_argument("--mock-args", default="", help="Extra mock_api serve options, e.g. \"--error-rate 0.02\"")
+    parser.add_argument("--questions", help="File with one question per line")
+    parser.add_argument("--warmer", action="store_true", help="Run the cache warmer in the workers")
+    parser.add_argument("--slo-p99", type=float, default=30.0, help="p99 latency target for sizing (seconds)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--startup-timeout", type=float, default=180.0)
+    parser.add_argument("--server-logs", action="store_true", help="Show the server's output")
+    parser.add_argument("--json", help="Write the full report to this file")
+    args = parser.parse_args(argv)
+
+    print(f"🚀 Load testing {args.url or f'{args.workers} gunicorn worker(s)'} "
+          f"(fake LLM {args.llm_latency}s/call, {args.upstream} upstream {args.upstream_latency}s/request)")
+    report = asyncio.run(main_async(args))
+    print("\n📊 SUMMARY")
+    print("=" * 60)
+    print(f"Max sustainable rate (error rate <= {args.max_error_rate * 100:.1f}%, p99 <= {args.slo_p99}s): "
+          f"{report['max_sustainable_rate'] or 'none of the tested rates'}")
+    if report.get("mock"):
+        mock = report["mock"]
+        print(f"Mock upstream: {mock['requests']} requests over {mock['connections']} connections, "
+              f"{mock['injected_errors']} injected errors, {mock['resets']} resets")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
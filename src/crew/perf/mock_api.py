@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Local mock of stock.indianapi.in for end-to-end and performance tests.
+
+Serves the api_responses/ fixtures (see fixtures.py) on the real routes over
+HTTP/1.1 keep-alive, with tunable latency distributions, injected failures and
+payload scaling, so connection pooling, retries and caching are exercised over
+a real socket. Point the app at it with INDIAN_STOCK_API_URL.
+
+Usage:
+    python -m src.crew.perf.mock_api serve --port 8900 --latency lognormal:0.25,0.5 --error-rate 0.02
+    INDIAN_STOCK_API_URL=http://127.0.0.1:8900 uvicorn api:app
+
+    python -m src.crew.perf.mock_api bench --requests 400 --threads 8   # pooled client vs cache
+
+Latency specs: fixed:S, uniform:LO,HI, exponential:MEAN, lognormal:MEDIAN,SIGMA
+(seconds), optionally per route with --route-latency stock=lognormal:0.4,0.6.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from src.crew.tools.fixtures import FIXTURE_DIR, FIXTURE_NAMES, FixtureReplay
+from src.crew.tools.history import API_PERIODS, VALID_FILTERS
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Build a latency sampler from a spec such as "lognormal:0.25,0.5".
+
+    Raises:
+        ValueError: If the distribution or its parameters are invalid.
+    """
+    name, _, args = (spec or "fixed:0").partition(":")
+    values = [float(value) for value in args.split(",") if value]
+    samplers = {
+        "fixed": (1, lambda rng, seconds: seconds),
+        "uniform": (2, lambda rng, low, high: rng.uniform(low, high)),
+        "exponential": (1, lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0),
+        "lognormal": (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0),
+    }
+    if name not in samplers or len(values) != samplers[name][0]:
+        raise ValueError(f"Invalid latency spec '{spec}'. Use fixed:S, uniform:LO,HI, exponential:MEAN "
+                         f"or lognormal:MEDIAN,SIGMA")
+    sampler = samplers[name][1]
+    return lambda rng: max(0.0, sampler(rng, *values))
+
+
+def scale_payload(payload: Any, factor: int, depth: int = 2) -> Any:
+    """
+    Repeat list elements factor times in the top depth levels of a payload.
+
+    Grows responses (news, financials, search results) roughly linearly without
+    changing their shape, to measure parse and transfer cost against size.
+    """
+    if factor <= 1 or depth < 0:
+        return payload
+    if isinstance(payload, list):
+        return [scale_payload(item, factor, depth - 1) for item in payload] * factor
+    if isinstance(payload, dict):
+        return {key: scale_payload(value, factor, depth - 1) for key, value in payload.items()}
+    return payload
+
+
+def validation_error(endpoint: str, params: Dict[str, str]) -> Optional[Dict]:
+    """The API's 422 body for invalid query parameters, or None"""
+    if endpoint != "historical_data":
+        return None
+    errors = []
+    if params.get("period") not in API_PERIODS:
+        errors.append({"type": "enum", "loc": ["query", "period"], "input": params.get("period"),
+                       "msg": "Input should be " + ", ".join(f"'{period}'" for period in API_PERIODS)})
+    if "filter" not in params:
+        errors.append({"type": "missing", "loc": ["query", "filter"], "msg": "Field required", "input": None})
+    elif params["filter"] not in VALID_FILTERS:
+        errors.append({"type": "enum", "loc": ["query", "filter"], "input": params["filter"],
+                       "msg": "Input should be " + ", ".join(f"'{value}'" for value in VALID_FILTERS)})
+    return {"detail": errors} if errors else None
+
+
+class MockConfig:
+    """Behaviour of the mock server; shared by all handler threads"""
+
+    def __init__(self, latency: str = "fixed:0", route_latency: Optional[Dict[str, str]] = None,
+                 error_rate: float = 0.0, error_codes: Tuple[int, ...] = (500, 503, 429),
+                 reset_rate: float = 0.0, scale: int = 1, api_key: Optional[str] = None,
+                 fixtures: str = str(FIXTURE_DIR), seed: int = 7):
+        self.latency = parse_latency(latency)
+        self.route_latency = {route: parse_latency(spec) for route, spec in (route_latency or {}).items()}
+        self.error_rate = error_rate
+        self.error_codes = error_codes
+        self.reset_rate = reset_rate
+        self.scale = scale
+        self.api_key = api_key
+        self.replay = FixtureReplay(fixtures)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies: Dict[Tuple[str, Tuple], bytes] = {}
+        self.stats: Dict[str, Any] = {"connections": 0, "requests": 0, "injected_errors": 0, "resets": 0,
+                                      "bytes_sent": 0, "routes": {}}
+
+    def draw(self, route: str) -> Tuple[float, float]:
+        """(latency for a request on route, uniform draw for fault injection)"""
+        with self._lock:
+            sampler = self.route_latency.get(route, self.latency)
+            return sampler(self._rng), self._rng.random()
+
+    def count(self, name: str, amount: int = 1, route: Optional[str] = None) -> None:
+        with self._lock:
+            self.stats[name] += amount
+            if route is not None:
+                self.stats["routes"][route] = self.stats["routes"].get(route, 0) + 1
+
+    def body(self, endpoint: str, params: Dict[str, str]) -> Tuple[int, bytes]:
+        """Status and encoded body for a request; encoded bodies are cached per request"""
+        key = (endpoint, tuple(sorted(params.items())))
+        with self._lock:
+            cached = self._bodies.get(key)
+        if cached is not None:
+            return 200, cached
+        error = validation_error(endpoint, params)
+        if error is not None:
+            return 422, json.dumps(error).encode("utf-8")
+        payload = self.replay(endpoint, params)
+        if isinstance(payload, dict) and "error" in payload:
+            return 404, json.dumps({"detail": payload["error"]}).encode("utf-8")
+        encoded = json.dumps(scale_payload(payload, self.scale), ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._bodies[key] = encoded
+        return 200, encoded
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self.stats))
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: MockConfig
+
+    def setup(self) -> None:
+        super().setup()
+        self.config.count("connections")
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.config.count("bytes_sent", len(body))
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        route = url.path.strip("/")
+        if route == "__stats":
+            self._send(200, json.dumps(self.config.snapshot()).encode("utf-8"))
+            return
+        if route not in FIXTURE_NAMES:
+            self._send(404, b'{"detail": "Not Found"}')
+            return
+        if self.config.api_key and self.headers.get("X-Api-Key") != self.config.api_key:
+            self._send(401, b'{"detail": "Invalid API key"}')
+            return
+
+        self.config.count("requests", route=route)
+        latency, draw = self.config.draw(route)
+        if latency:
+            time.sleep(latency)
+        if draw < self.config.reset_rate:
+            # Drop the connection without a response, as an overloaded proxy would
+            self.config.count("resets")
+            self.close_connection = True
+            self.connection.close()
+            return
+        if draw < self.config.reset_rate + self.config.error_rate:
+            self.config.count("injected_errors")
+            status = self.config.error_codes[int(draw * 1e6) % len(self.config.error_codes)]
+            self._send(status, json.dumps({"detail": f"Injected error {status}"}).encode("utf-8"))
+            return
+        status, body = self.config.body(route, dict(parse_qsl(url.query)))
+        self._send(status, body)
+
+
+def make_server(config: MockConfig, host: str = "127.0.0.1", port: int = 8900) -> ThreadingHTTPServer:
+    """HTTP server bound to (host, port) serving config; port 0 picks a free port"""
+    handler = type("ConfiguredMockHandler", (MockHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def bench(args) -> int:
+    """Compare the pooled client with and without the response cache against an in-process mock"""
+    config = MockConfig(latency=args.latency, error_rate=args.error_rate, reset_rate=args.reset_rate,
+                        scale=args.scale)
+    server = make_server(config, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # nse_tools reads the base URL at import time
+    os.environ["INDIAN_STOCK_API_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.setdefault("TIMELINE_ENABLED", "false")
+    from src.crew.tools import nse_tools
+
+    symbols = ["RELIANCE", "TCS", "INFY", "HDFC", "ITC"]
+    requests = [("stock", {"name": symbols[index % len(symbols)]}) for index in range(args.requests)]
+    modes = {
+        "pooled client": lambda endpoint, params: nse_tools._fetch_indian_stock(endpoint, params),
+        "pooled client + cache": lambda endpoint, params: nse_tools.make_indian_stock_request(endpoint, params),
+    }
+    print(f"🧪 {args.requests} /stock requests over {args.threads} threads "
+          f"(latency {args.latency}, errors {args.error_rate}, resets {args.reset_rate}, scale x{args.scale})")
+    for name, fetch in modes.items():
+        before = config.snapshot()
+        latencies: List[float] = []
+        errors = 0
+
+        def one(request) -> None:
+            nonlocal errors
+            started = time.perf_counter()
+            data = fetch(*request)
+            latencies.append(time.perf_counter() - started)
+            if isinstance(data, dict) and "error" in data:
+                errors += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            list(executor.map(one, requests))
+        elapsed = time.perf_counter() - started
+        after = config.snapshot()
+        latencies.sort()
+        print(f"\n{name}")
+        print("-" * 30)
+        print(f"Throughput: {len(requests) / elapsed:.1f} req/s | Errors: {errors}")
+        print(f"Latency p50/p99: {latencies[len(latencies) // 2] * 1000:.1f} / "
+              f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+        print(f"Upstream requests: {after['requests'] - before['requests']} | "
+              f"new connections: {after['connections'] - before['connections']} | "
+              f"resets: {after['resets'] - before['resets']}")
+    server.shutdown()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mock Indian Stock API server")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "bench"):
+        command = commands.add_parser(name)
+        command.add_argument("--latency", default="fixed:0", help="Latency distribution (see module docs)")
+        command.add_argument("--error-rate", type=float, default=0.0, help="Fraction answered with an error status")
+        command.add_argument("--reset-rate", type=float, default=0.0,
+                             help="Fraction of requests whose connection is dropped")
+        command.add_argument("--scale", type=int, default=1, help="Repeat payload list elements this many times")
+    serve = commands.choices["serve"]
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8900)
+    serve.add_argument("--route-latency", action="append", default=[], metavar="ROUTE=SPEC",
+                       help="Latency for one route, e.g. historical_data=lognormal:0.8,0.4")
+    serve.add_argument("--error-codes", default="500,503,429", help="Statuses used for injected errors")
+    serve.add_argument("--api-key", help="Require this X-Api-Key header")
+    serve.add_argument("--fixtures", default=str(FIXTURE_DIR), help="Fixture directory")
+    bench_command = commands.choices["bench"]
+    bench_command.add_argument("--requests", type=int, default=400)
+    bench_command.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        return bench(args)
+
+    config = MockConfig(
+        latency=args.latency,
+        route_latency=dict(item.split("=", 1) for item in args.route_latency),
+        error_rate=args.error_rate,
+        error_codes=tuple(int(code) for code in args.error_codes.split(",")),
+        reset_rate=args.reset_rate,
+        scale=args.scale,
+        api_key=args.api_key,
+        fixtures=args.fixtures,
+    )
+    server = make_server(config, args.host, args.port)
+    print(f"🧪 Mock Indian Stock API on http://{args.host}:{server.server_address[1]} "
+          f"(latency {args.latency}, errors {args.error_rate}, resets {args.reset_rate}, scale x{args.scale})")
+    print(f"   Stats: http://{args.host}:{server.server_address[1]}/__stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+In-process health probes reported by /metrics: event-loop lag and memory.
+
+Lag is how late a periodic timer fires. A blocking call on the event loop
+(a crew run outside the thread pool, a slow sync handler) shows up directly
+as lag, which is what limits how many requests one worker can hold open.
+"""
+
+import asyncio
+import os
+import resource
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+def rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    """Current resident set size of a process (this one by default)"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid is None:
+        # No procfs (macOS): fall back to the peak, reported in bytes there and KiB on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    return None
+
+
+def _percentile(values, fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag every interval seconds, keeping the last window samples"""
+
+    def __init__(self, interval: float = 0.1, window: int = 600):
+        self.interval = interval
+        self._samples: deque = deque(maxlen=window)
+        self._max = 0.0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            with self._lock:
+                self._samples.append(lag)
+                self._max = max(self._max, lag)
+
+    def start(self) -> None:
+        """Start sampling on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Lag percentiles in milliseconds over the recent window, plus the all-time max"""
+        with self._lock:
+            samples = list(self._samples)
+            peak = self._max
+        to_ms = lambda value: round(value * 1000, 2) if value is not None else None
+        return {
+            "samples": len(samples),
+            "p50_ms": to_ms(_percentile(samples, 0.5)),
+            "p99_ms": to_ms(_percentile(samples, 0.99)),
+            "max_ms": to_ms(peak),
+        }
+
+
+loop_lag_monitor = LoopLagMonitor()
+
+
+def process_stats() -> Dict[str, Any]:
+    """Worker identity, memory, threads and event-loop lag"""
+    rss = rss_bytes()
+    return {
+        "pid": os.getpid(),
+        "rss_mb": round(rss / 2 ** 20, 1) if rss is not None else None,
+        "threads": threading.active_count(),
+        "loop_lag": loop_lag_monitor.stats(),
+    }
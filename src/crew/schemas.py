@@ -0,0 +1,86 @@
+"""
+Structured answer contract between the coordinator, the API and the UI.
+
+The coordinator task declares StockAnswer as its output_pydantic, so crewAI
+asks the LLM for schema-constrained JSON and validates it; clients get typed
+fields instead of scraping a ```json block out of free text.
+"""
+
+import json
+from typing import Any, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class MarketData(BaseModel):
+    """Headline figures for one stock mentioned in the answer"""
+
+    symbol: str = Field(description="NSE symbol, e.g. TCS")
+    name: Optional[str] = Field(default=None, description="Company name")
+    current_price_nse: Optional[float] = Field(default=None, description="Last NSE price in INR")
+    current_price_bse: Optional[float] = Field(default=None, description="Last BSE price in INR")
+    change_percent: Optional[float] = Field(default=None, description="Today's change in percent")
+    week_52_high: Optional[float] = Field(default=None, description="52-week high in INR")
+    week_52_low: Optional[float] = Field(default=None, description="52-week low in INR")
+    target_price: Optional[float] = Field(default=None, description="Mean analyst target price in INR")
+
+
+class StockAnswer(BaseModel):
+    """The coordinator's answer to a user question"""
+
+    insights: str = Field(description="The answer for the user, in natural language (markdown allowed, no JSON)")
+    market_data: List[MarketData] = Field(default_factory=list,
+                                          description="Figures for each stock the answer discusses, taken from the data")
+    sources: List[str] = Field(default_factory=list,
+                               description="Where the facts came from, e.g. 'Indian Stock API: stock details'")
+
+
+def to_answer(output: Any) -> StockAnswer:
+    """
+    The StockAnswer of a crew result.
+
+    Falls back to the raw text as insights when the model's output did not
+    validate, so callers always get the typed shape.
+    """
+    if isinstance(output, StockAnswer):
+        return output
+    pydantic_output = getattr(output, "pydantic", None)
+    if isinstance(pydantic_output, StockAnswer):
+        return pydantic_output
+    raw = getattr(output, "raw", None)
+    return StockAnswer(insights=str(raw if raw is not None else output))
+
+
+def partial_insights(text: str) -> str:
+    """
+    The insights string decoded so far from a partially streamed StockAnswer JSON.
+
+    Lets a client render the answer token by token while the JSON is still
+    incomplete. Text that is not StockAnswer JSON is returned unchanged.
+    """
+    key = text.find('"insights"')
+    if key < 0:
+        return "" if text.lstrip().startswith("{") else text
+    start = text.find('"', text.find(":", key) + 1)
+    if start < 0:
+        return ""
+    chars = []
+    index = start + 1
+    while index < len(text):
+        char = text[index]
+        if char == '"':
+            break
+        if char == "\\":
+            if index + 1 >= len(text):
+                break
+            # Complete escapes only; a split \uXXXX waits for the next chunk
+            width = 6 if text[index + 1] == "u" else 2
+            if index + width > len(text):
+                break
+            chars.append(json.loads(f'"{text[index:index + width]}"'))
+            index += width
+            continue
+        chars.append(char)
+        index += 1
+    # Rejoin surrogate pairs decoded from separate \u escapes
+    return "".join(chars).encode("utf-16", "surrogatepass").decode("utf-16", "replace")
@@ -0,0 +1,245 @@
+"""
+Process-wide response cache for Indian Stock API payloads
+"""
+
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+
+# Seconds each endpoint's payload stays fresh
+DEFAULT_TTLS: Dict[str, int] = {
+    "stock": 60,
+    "stock_target_price": 3600,
+    "historical_data": 3600,
+    "industry_search": 3600,
+    "mutual_fund_search": 86400,
+    "trending": 60,
+    "fetch_52_week_high_low_data": 300,
+}
+
+# Distinct keys whose lookups are counted for most_requested()
+ACCESS_COUNT_LIMIT = 1000
+
+# Payloads kept at most; the least recently used go first
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+
+
+def make_cache_key(endpoint: str, params: Optional[Dict] = None) -> Tuple:
+    """Build a hashable cache key from an endpoint and its query parameters"""
+    return (endpoint, tuple(sorted((params or {}).items())))
+
+
+def job_key(endpoint: str, params: Dict) -> str:
+    """Stable string identifier for an endpoint/param combination ("stock?name=TCS")"""
+    query = urlencode(sorted(params.items()))
+    return f"{endpoint}?{query}" if query else endpoint
+
+
+def params_from_key(key: Tuple) -> Dict:
+    """Inverse of make_cache_key for the params part"""
+    return dict(key[1])
+
+
+class _Entry:
+    __slots__ = ("payload", "expires_at", "prefetched", "used", "derived")
+
+    def __init__(self, payload: Any, expires_at: float, prefetched: bool):
+        self.payload = payload
+        self.expires_at = expires_at
+        self.prefetched = prefetched
+        self.used = False
+        # Values computed from payload (parsed models, indexes), built once per fetch
+        self.derived: Dict[str, Any] = {}
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL cache with single-flight fetches and prefetch accounting.
+
+    A prefetched entry counts as a hit the first time a caller reads it and
+    as waste if it expires or is replaced without ever being read. Lookup
+    counts are bounded to ACCESS_COUNT_LIMIT keys and halved by
+    decay_access_counts(), so most_requested() follows current demand.
+    Every set() drops expired entries, then the least recently used ones
+    beyond max_entries.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, int]] = None, default_ttl: int = 300,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        # Least recently used first
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._inflight: Dict[Tuple, threading.Event] = {}
+        self._access_counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "prefetch_issued": 0,
+            "prefetch_hits": 0,
+            "prefetch_wasted": 0,
+            "evictions": 0,
+        }
+
+    def ttl_for(self, endpoint: str) -> int:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def _expire(self, key: Tuple, entry: _Entry) -> None:
+        # Caller holds the lock
+        if entry.prefetched and not entry.used:
+            self._stats["prefetch_wasted"] += 1
+        del self._entries[key]
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Return a fresh payload for key, or None on a miss"""
+        with self._lock:
+            self._access_counts[key] += 1
+            if len(self._access_counts) > 2 * ACCESS_COUNT_LIMIT:
+                self._access_counts = Counter(dict(self._access_counts.most_common(ACCESS_COUNT_LIMIT)))
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._expire(key, entry)
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._entries.move_to_end(key)
+            if entry.prefetched and not entry.used:
+                self._stats["prefetch_hits"] += 1
+            entry.used = True
+            return entry.payload
+
+    def peek(self, key: Tuple) -> Optional[Any]:
+        """Return a fresh payload for key without touching hit/miss statistics"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                return None
+            return entry.payload
+
+    def set(self, key: Tuple, payload: Any, prefetched: bool = False,
+            ttl: Optional[int] = None) -> None:
+        """Store a payload under key using ttl, or its endpoint's TTL by default"""
+        expires_at = time.monotonic() + (self.ttl_for(key[0]) if ttl is None else ttl)
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._expire(key, previous)
+            self._purge_expired()
+            while self._entries and len(self._entries) >= self.max_entries:
+                oldest_key, oldest = next(iter(self._entries.items()))
+                self._expire(oldest_key, oldest)
+                self._stats["evictions"] += 1
+            self._entries[key] = _Entry(payload, expires_at, prefetched)
+            if prefetched:
+                self._stats["prefetch_issued"] += 1
+
+    def _purge_expired(self) -> None:
+        # Caller holds the lock
+        now = time.monotonic()
+        for key, entry in [(key, entry) for key, entry in self._entries.items() if entry.expires_at <= now]:
+            self._expire(key, entry)
+
+    def get_or_fetch(self, key: Tuple, fetch, prefetched: bool = False,
+                     ttl: Optional[int] = None) -> Any:
+        """
+        Return the cached payload for key, calling fetch() on a miss.
+
+        Concurrent callers for the same key wait for a single in-flight fetch
+        instead of issuing duplicate upstream requests. Payloads containing an
+        "error" key are returned but never cached.
+        """
+        while True:
+            # Speculative lookups must not count as hits or consume a prefetched entry
+            payload = self.peek(key) if prefetched else self.get(key)
+            if payload is not None:
+                return payload
+            with self._lock:
+                event = self._inflight.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._inflight[key] = event
+                    owner = True
+                else:
+                    owner = False
+            if not owner:
+                event.wait()
+                if self.peek(key) is not None:
+                    continue
+                # The owner's fetch failed; fetch ourselves rather than loop
+                return fetch()
+            try:
+                payload = fetch()
+                if not (isinstance(payload, dict) and "error" in payload):
+                    self.set(key, payload, prefetched=prefetched, ttl=ttl)
+                return payload
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+                event.set()
+
+    def derive(self, key: Tuple, name: str, payload: Any, build: Callable[[Any], Any]) -> Any:
+        """
+        Return build(payload), computed at most once per cached payload.
+
+        The result is stored on the cache entry, so it is dropped together with
+        the payload when the entry expires or is refreshed. Payloads that are no
+        longer (or never were) cached are simply built.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.payload is not payload:
+                entry = None
+            elif name in entry.derived:
+                return entry.derived[name]
+        value = build(payload)
+        if entry is not None:
+            with self._lock:
+                entry.derived.setdefault(name, value)
+        return value
+
+    def most_requested(self, endpoint: str, limit: int) -> List[Tuple]:
+        """Keys for endpoint ordered by how often callers looked them up"""
+        with self._lock:
+            counts = [(key, count) for key, count in self._access_counts.items() if key[0] == endpoint]
+        counts.sort(key=lambda item: item[1], reverse=True)
+        return [key for key, _ in counts[:limit]]
+
+    def decay_access_counts(self) -> None:
+        """Halve every lookup count, forgetting keys that drop to zero"""
+        with self._lock:
+            self._access_counts = Counter(
+                {key: count // 2 for key, count in self._access_counts.items() if count > 1}
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus prefetch hit and waste rates"""
+        with self._lock:
+            self._purge_expired()
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+            stats["prefetch_pending"] = sum(
+                1 for entry in self._entries.values() if entry.prefetched and not entry.used
+            )
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        issued = stats["prefetch_issued"]
+        stats["prefetch_hit_rate"] = round(stats["prefetch_hits"] / issued, 3) if issued else 0.0
+        stats["prefetch_waste_rate"] = round(stats["prefetch_wasted"] / issued, 3) if issued else 0.0
+        return stats
+
+
+# Shared by every tool, the prefetcher and the API
+response_cache = ResponseCache()
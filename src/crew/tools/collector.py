@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Bulk snapshot collector for Indian Stock API payloads.
+
+Reads a manifest of symbols, industries, fund queries and history periods,
+fetches every endpoint/param combination concurrently under a rate limit and
+stores each payload as a gzip-compressed, content-addressed object. An
+append-only index records what each run fetched, so an interrupted run picks
+up where it stopped.
+
+Usage:
+    python -m src.crew.tools.collector --manifest manifest.json --out snapshots/
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.crew.tools.cache import job_key
+from src.crew.tools.history import API_PERIODS, DEFAULT_FILTER, normalize_filter, normalize_period
+from src.crew.tools.nse_tools import _fetch_indian_stock
+
+
+DEFAULT_MANIFEST = Path(__file__).resolve().parent / "collector_manifest.json"
+DEFAULT_OUTPUT_DIR = os.getenv("SNAPSHOT_DIR", str(Path(__file__).resolve().parent / "snapshots"))
+INDEX_FILE = "index.jsonl"
+OBJECTS_DIR = "objects"
+
+
+def expand_manifest(manifest: Dict) -> List[Tuple[str, Dict]]:
+    """
+    Turn a manifest into the (endpoint, params) jobs to fetch.
+
+    Manifest keys (all optional):
+        symbols: Stocks fetched from /stock
+        target_price: Stocks fetched from /stock_target_price (defaults to symbols)
+        industries: /industry_search queries
+        mutual_funds: /mutual_fund_search queries
+        history: {"symbols": [...] (defaults to symbols), "periods": ["1yr"], "filter": "price"}
+        market: Include /trending and /fetch_52_week_high_low_data (default true)
+    """
+    symbols = [str(symbol).upper() for symbol in manifest.get("symbols", [])]
+    jobs: List[Tuple[str, Dict]] = []
+    if manifest.get("market", True):
+        jobs.append(("trending", {}))
+        jobs.append(("fetch_52_week_high_low_data", {}))
+    jobs.extend(("stock", {"name": symbol}) for symbol in symbols)
+    for symbol in manifest.get("target_price", symbols):
+        jobs.append(("stock_target_price", {"stock_id": str(symbol).upper()}))
+    jobs.extend(("industry_search", {"query": query}) for query in manifest.get("industries", []))
+    jobs.extend(("mutual_fund_search", {"query": query}) for query in manifest.get("mutual_funds", []))
+
+    history = manifest.get("history") or {}
+    history_filter = normalize_filter(history.get("filter", DEFAULT_FILTER))
+    for symbol in history.get("symbols", symbols if history else []):
+        for period in history.get("periods", ["1yr"]):
+            period = normalize_period(period)
+            if period not in API_PERIODS:
+                raise ValueError(f"History period '{period}' is not one the API serves: {', '.join(API_PERIODS)}")
+            jobs.append(("historical_data", {"stock_name": str(symbol).upper(), "period": period,
+                                             "filter": history_filter}))
+
+    # Drop duplicates while keeping manifest order
+    seen = set()
+    unique = []
+    for endpoint, params in jobs:
+        key = job_key(endpoint, params)
+        if key not in seen:
+            seen.add(key)
+            unique.append((endpoint, params))
+    return unique
+
+
+def load_manifest(path: str) -> Dict:
+    """Load a JSON (or, with PyYAML installed, YAML) manifest"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads (no limit when rate <= 0)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class SnapshotStore:
+    """
+    Content-addressed gzip objects plus an append-only JSONL index.
+
+    Identical payloads (e.g. an unchanged fund list) are stored once no matter
+    how many runs fetch them.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        (self.root / OBJECTS_DIR).mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / INDEX_FILE
+        self._lock = threading.Lock()
+        # Terminate a line torn by an interrupted run so new entries start cleanly
+        if self.index_path.exists() and self.index_path.stat().st_size:
+            with open(self.index_path, "rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / OBJECTS_DIR / digest[:2] / f"{digest}.json.gz"
+
+    def put(self, payload: Any) -> Tuple[str, int, bool]:
+        """Store a payload; returns (sha256, compressed size, newly written)"""
+        body = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.object_path(digest)
+        if path.exists():
+            return digest, path.stat().st_size, False
+        path.parent.mkdir(exist_ok=True)
+        # mtime=0 keeps the compressed bytes deterministic for identical payloads
+        compressed = gzip.compress(body, compresslevel=6, mtime=0)
+        tmp = path.with_suffix(f".tmp{threading.get_ident()}")
+        tmp.write_bytes(compressed)
+        os.replace(tmp, path)
+        return digest, len(compressed), True
+
+    def get(self, digest: str) -> Any:
+        return json.loads(gzip.decompress(self.object_path(digest).read_bytes()))
+
+    def record(self, entry: Dict) -> None:
+        """Append one index line; flushed immediately so an interrupted run keeps its progress"""
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock, open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+
+    def entries(self, run: Optional[str] = None) -> Iterable[Dict]:
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from an interrupted write
+                    continue
+                if run is None or entry.get("run") == run:
+                    yield entry
+
+    def completed(self, run: str) -> set:
+        """Job keys already stored successfully in a run"""
+        return {entry["key"] for entry in self.entries(run) if entry.get("status") == "ok"}
+
+    def latest(self) -> Dict[str, Dict]:
+        """Most recent successful index entry per job key"""
+        latest: Dict[str, Dict] = {}
+        for entry in self.entries():
+            if entry.get("status") == "ok":
+                latest[entry["key"]] = entry
+        return latest
+
+
+def _retryable(error: str) -> bool:
+    # Rate limiting, server errors and network failures are worth retrying; 4xx validation is not
+    if "HTTP " not in error:
+        return True
+    return "HTTP 429" in error or "HTTP 5" in error
+
+
+def collect(jobs: List[Tuple[str, Dict]], store: SnapshotStore, run: str, concurrency: int = 8,
+            rate: float = 5.0, retries: int = 3, verbose: bool = True) -> Dict[str, Any]:
+    """
+    Fetch jobs concurrently and store them, skipping jobs the run already completed.
+
+    Returns:
+        Run summary with counts, bytes written and elapsed time.
+    """
+    done = store.completed(run)
+    pending = [(endpoint, params) for endpoint, params in jobs if job_key(endpoint, params) not in done]
+    limiter = RateLimiter(rate)
+    summary = {"run": run, "jobs": len(jobs), "skipped": len(jobs) - len(pending), "fetched": 0,
+               "errors": 0, "new_objects": 0, "bytes_written": 0}
+    started = time.monotonic()
+
+    def fetch(endpoint: str, params: Dict) -> Dict:
+        key = job_key(endpoint, params)
+        for attempt in range(retries + 1):
+            limiter.acquire()
+            data = _fetch_indian_stock(endpoint, params)
+            error = data.get("error") if isinstance(data, dict) else None
+            if error is None or not _retryable(str(error)) or attempt == retries:
+                break
+            time.sleep(min(2 ** attempt, 30))
+        entry = {"run": run, "key": key, "endpoint": endpoint, "params": params,
+                 "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+        if error is not None:
+            entry.update(status="error", error=str(error))
+        else:
+            digest, size, created = store.put(data)
+            entry.update(status="ok", sha256=digest, bytes=size, new=created)
+        store.record(entry)
+        return entry
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="collector") as executor:
+        futures = [executor.submit(fetch, endpoint, params) for endpoint, params in pending]
+        for count, future in enumerate(as_completed(futures), start=1):
+            entry = future.result()
+            if entry["status"] == "ok":
+                summary["fetched"] += 1
+                if entry["new"]:
+                    summary["new_objects"] += 1
+                    summary["bytes_written"] += entry["bytes"]
+            else:
+                summary["errors"] += 1
+            if verbose:
+                mark = "✅" if entry["status"] == "ok" else "❌"
+                print(f"{mark} [{count}/{len(pending)}] {entry['key']}"
+                      + (f" - {entry['error']}" if entry["status"] != "ok" else ""))
+
+    summary["elapsed_seconds"] = round(time.monotonic() - started, 2)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Collect Indian Stock API snapshots")
+    parser.add_argument("--manifest", default=str(DEFAULT_MANIFEST), help="Manifest file (JSON or YAML)")
+    parser.add_argument("--out", default=DEFAULT_OUTPUT_DIR, help="Snapshot directory (env SNAPSHOT_DIR)")
+    parser.add_argument("--run", default=datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+                        help="Run id; re-running the same id resumes it (default: today's UTC date)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel requests")
+    parser.add_argument("--rate", type=float, default=5.0, help="Max requests per second (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=3, help="Retries for rate-limited or failed requests")
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    args = parser.parse_args(argv)
+
+    jobs = expand_manifest(load_manifest(args.manifest))
+    store = SnapshotStore(args.out)
+    print(f"🚀 Collecting {len(jobs)} snapshots into {store.root} (run {args.run})")
+    summary = collect(jobs, store, args.run, concurrency=args.concurrency, rate=args.rate,
+                      retries=args.retries, verbose=not args.quiet)
+    print("\n📊 SUMMARY")
+    for key, value in summary.items():
+        print(f"  {key}: {value}")
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
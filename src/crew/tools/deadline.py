@@ -0,0 +1,128 @@
+"""
+Per-run deadlines and cancellation.
+
+The API (or UI) gives each crew run a Deadline. ConversationCrew.kickoff puts
+it in a context variable that crewAI copies into the run's task threads. Task
+and step callbacks, the tiered LLM and upstream requests then call
+check_deadline(), and upstream sockets time out after the remaining time. A
+cancelled or expired run stops at its next check instead of running every
+agent to completion. abandoned_work counts what was cut short for /metrics.
+"""
+
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+
+# Seconds a question may take end to end before it is abandoned
+REQUEST_DEADLINE = float(os.getenv("CREW_REQUEST_DEADLINE", "180"))
+
+
+class RunAborted(Exception):
+    """Raised at a deadline check once the run was cancelled or ran out of time"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Deadline:
+    """
+    A point in wall-clock time (comparable across processes) plus a cancel flag.
+
+    Args:
+        seconds: Time allowed from now (None for no time limit)
+        expires_at: Absolute time.time() expiry, e.g. received from another process
+    """
+
+    def __init__(self, seconds: Optional[float] = None, expires_at: Optional[float] = None):
+        self.started_at = time.time()
+        self.expires_at = self.started_at + seconds if seconds is not None else expires_at
+        self.reason: Optional[str] = None
+        self._cancelled = threading.Event()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._cancelled.is_set():
+            self.reason = reason
+            self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None without a time limit"""
+        return None if self.expires_at is None else max(0.0, self.expires_at - time.time())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.time() >= self.expires_at
+
+    def aborted(self) -> Optional[str]:
+        """Why the run should stop, or None to carry on"""
+        if self.cancelled:
+            return self.reason
+        if self.expired():
+            return "deadline exceeded"
+        return None
+
+    def check(self) -> None:
+        """
+        Raises:
+            RunAborted: If the run was cancelled or its deadline passed
+        """
+        reason = self.aborted()
+        if reason:
+            raise RunAborted(reason)
+
+
+# Deadline of the running kickoff, set by ConversationCrew.kickoff
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("crew_deadline", default=None)
+
+
+def check_deadline() -> None:
+    """Stops the current run (RunAborted) if it was cancelled or is out of time; no-op outside a run"""
+    deadline = current_deadline.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def remaining_timeout(default: float) -> float:
+    """Timeout for a blocking call: default, capped at the current run's remaining time"""
+    deadline = current_deadline.get()
+    remaining = deadline.remaining() if deadline is not None else None
+    return default if remaining is None else max(0.001, min(default, remaining))
+
+
+class AbandonedWork:
+    """Counts runs, jobs and upstream calls cut short by cancellation or deadlines"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self.seconds = 0.0
+
+    def record(self, what: str, reason: str, seconds: float = 0.0) -> None:
+        """
+        Args:
+            what: "run" (stopped mid-way), "job" (dropped before it started) or "upstream" (request skipped)
+            reason: Why, e.g. "client disconnected" or "deadline exceeded"
+            seconds: Work already spent on it
+        """
+        with self._lock:
+            key = f"{what}:{reason}"
+            self._counts[key] = self._counts.get(key, 0) + 1
+            self.seconds += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            totals: Dict[str, int] = {}
+            for key, count in self._counts.items():
+                what = key.split(":", 1)[0]
+                totals[what] = totals.get(what, 0) + count
+            return {"deadline_seconds": REQUEST_DEADLINE, "totals": totals, "by_reason": dict(self._counts),
+                    "seconds_abandoned": round(self.seconds, 2)}
+
+
+abandoned_work = AbandonedWork()
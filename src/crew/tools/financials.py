@@ -0,0 +1,171 @@
+"""
+Indexed financial-statement store built from a parsed /stock payload.
+
+Statement lines are normalized into a (symbol, period, statement, key) -> value
+mapping so any metric is an O(1) lookup, and multi-year series (growth, CAGR,
+margins) are read straight off the index.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.crew.tools.models import FinancialStatement
+
+
+# Statement precedence when a key is looked up without naming the statement
+# (e.g. MinorityInterest appears in both INC and BAL)
+STATEMENT_ORDER: Tuple[str, ...] = ("INC", "BAL", "CAS")
+
+# Bookkeeping lines present in every statement that are not financial metrics
+_IGNORED_KEYS = {"periodType", "periodLength"}
+
+# Ratio metrics computed from two statement lines: name -> (numerator, denominator, scale)
+DERIVED_METRICS: Dict[str, Tuple[str, str, float]] = {
+    "GrossMargin": ("GrossProfit", "TotalRevenue", 100.0),
+    "OperatingMargin": ("OperatingIncome", "TotalRevenue", 100.0),
+    "NetMargin": ("NetIncome", "TotalRevenue", 100.0),
+    "ReturnOnEquity": ("NetIncome", "TotalEquity", 100.0),
+    "ReturnOnAssets": ("NetIncome", "TotalAssets", 100.0),
+    "DebtToEquity": ("TotalDebt", "TotalEquity", 1.0),
+}
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def derived_metric(name: str) -> Optional[str]:
+    """Canonical DERIVED_METRICS name for a user-supplied metric name, if it is a ratio"""
+    normalized = _normalize(name)
+    for metric in DERIVED_METRICS:
+        if _normalize(metric) == normalized:
+            return metric
+    return None
+
+
+def cagr(first: Optional[float], last: Optional[float], years: float) -> Optional[float]:
+    """
+    Compound annual growth rate between two values, in percent.
+
+    Returns None when it is undefined (missing values, non-positive endpoints
+    or a zero-length span).
+    """
+    if first is None or last is None or years <= 0 or first <= 0 or last <= 0:
+        return None
+    return ((last / first) ** (1 / years) - 1) * 100
+
+
+class FinancialStore:
+    """
+    (symbol, period, statement, key) -> value index over a stock's financials.
+
+    Annual statements are identified by fiscal year and interim statements by
+    their period end date, since several interim periods share a fiscal year.
+    """
+
+    def __init__(self, symbol: str, statements: Iterable[FinancialStatement]):
+        self.symbol = symbol.upper()
+        self._values: Dict[Tuple[str, str, str, str], Optional[float]] = {}
+        self._labels: Dict[Tuple[str, str], str] = {}
+        # Normalized key or display name -> (statement, key)
+        self._names: Dict[str, Tuple[str, str]] = {}
+        periods: Dict[str, List[str]] = {"Annual": [], "Interim": []}
+
+        for statement in statements:
+            period_type = "Annual" if statement.period_type == "Annual" else "Interim"
+            period = statement.fiscal_year if period_type == "Annual" else statement.end_date
+            if period not in periods[period_type]:
+                periods[period_type].append(period)
+            for key, value in statement.values.items():
+                if key in _IGNORED_KEYS:
+                    continue
+                self._values.setdefault((self.symbol, period, statement.statement, key), value)
+                label = statement.labels.get(key, key)
+                self._labels.setdefault((statement.statement, key), label)
+
+        for statement, key in sorted(self._labels, key=lambda item: STATEMENT_ORDER.index(item[0])
+                                     if item[0] in STATEMENT_ORDER else len(STATEMENT_ORDER)):
+            self._names.setdefault(_normalize(key), (statement, key))
+            self._names.setdefault(_normalize(self._labels[(statement, key)]), (statement, key))
+
+        # Newest first, matching the payload order
+        self.annual_periods: Tuple[str, ...] = tuple(sorted(periods["Annual"], reverse=True))
+        self.interim_periods: Tuple[str, ...] = tuple(sorted(periods["Interim"], reverse=True))
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def periods(self, period_type: str = "Annual") -> Tuple[str, ...]:
+        return self.annual_periods if period_type == "Annual" else self.interim_periods
+
+    def resolve(self, name: str, statement: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """
+        Map a key ("TotalRevenue") or display name ("Total Revenue") to (statement, key).
+        """
+        if statement is not None:
+            if (statement, name) in self._labels:
+                return statement, name
+            for (candidate, key) in self._labels:
+                if candidate == statement and _normalize(key) == _normalize(name):
+                    return candidate, key
+            return None
+        return self._names.get(_normalize(name))
+
+    def label(self, key: str, statement: Optional[str] = None) -> str:
+        resolved = self.resolve(key, statement)
+        return self._labels[resolved] if resolved else key
+
+    def value(self, key: str, period: str, statement: Optional[str] = None) -> Optional[float]:
+        """Value of one statement line for a period, or None if it was not reported"""
+        if statement is not None:
+            found = self._values.get((self.symbol, period, statement, key))
+            if found is not None:
+                return found
+        resolved = self.resolve(key, statement)
+        if resolved is None:
+            return None
+        return self._values.get((self.symbol, period, resolved[0], resolved[1]))
+
+    def series(self, key: str, statement: Optional[str] = None,
+               period_type: str = "Annual", limit: Optional[int] = None) -> List[Tuple[str, Optional[float]]]:
+        """(period, value) pairs for a line, oldest first, over the newest `limit` periods"""
+        periods = self.periods(period_type)[:limit]
+        return [(period, self.value(key, period, statement)) for period in reversed(periods)]
+
+    def ratio_series(self, numerator: str, denominator: str, scale: float = 100.0,
+                     period_type: str = "Annual", limit: Optional[int] = None) -> List[Tuple[str, Optional[float]]]:
+        """numerator / denominator * scale per period (e.g. margins in percent), oldest first"""
+        result = []
+        for period, top in self.series(numerator, period_type=period_type, limit=limit):
+            bottom = self.value(denominator, period)
+            ratio = top / bottom * scale if top is not None and bottom else None
+            result.append((period, ratio))
+        return result
+
+    def metric_series(self, name: str, period_type: str = "Annual",
+                      limit: Optional[int] = None) -> Optional[List[Tuple[str, Optional[float]]]]:
+        """Series for a statement line or a DERIVED_METRICS ratio, None if the name is unknown"""
+        metric = derived_metric(name)
+        if metric is not None:
+            return self.ratio_series(*DERIVED_METRICS[metric], period_type=period_type, limit=limit)
+        if self.resolve(name) is None:
+            return None
+        return self.series(name, period_type=period_type, limit=limit)
+
+    def growth(self, key: str, statement: Optional[str] = None,
+               limit: Optional[int] = None) -> Optional[float]:
+        """CAGR of an annual line between the oldest and newest of the last `limit` years"""
+        points = [(period, value) for period, value in self.series(key, statement, "Annual", limit)
+                  if value is not None]
+        if len(points) < 2:
+            return None
+        try:
+            years = int(points[-1][0]) - int(points[0][0])
+        except ValueError:
+            years = len(points) - 1
+        return cagr(points[0][1], points[-1][1], years)
+
+    def keys(self, statement: Optional[str] = None) -> List[str]:
+        """Statement line keys available in the store"""
+        return sorted({key for (candidate, key) in self._labels if statement in (None, candidate)})
+
@@ -0,0 +1,151 @@
+"""
+Replay of recorded API payloads in place of the live Indian Stock API.
+
+FixtureReplay serves the api_responses/ fixtures written by
+save_api_responses.py; load_replay() also accepts a snapshot pack (see
+snapshot_pack.py). Used for offline runs, load tests and the mock server.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.crew.tools.history import API_PERIODS
+
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "api_responses"
+
+# endpoint -> (file prefix, request param, param name used in the file name)
+FIXTURE_NAMES: Dict[str, Tuple[str, Optional[str], Optional[str]]] = {
+    "stock": ("stock_details", "name", "symbol"),
+    "industry_search": ("industry_search", "query", "query"),
+    "mutual_fund_search": ("mutual_fund_search", "query", "query"),
+    "stock_target_price": ("stock_target_price", "stock_id", "stock_id"),
+    "trending": ("trending_stocks", None, None),
+    "fetch_52_week_high_low_data": ("52_week_high_low", None, None),
+    "historical_data": ("historical_data", "stock_name", "symbol"),
+}
+
+
+def synthetic_history(symbol: str, period: str, filter: str = "price",
+                      today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Deterministic /historical_data payload (a seeded random walk per symbol).
+
+    The recorded historical fixtures predate the API's required parameters and
+    hold only validation errors, so replay generates series in the payload
+    shape instead.
+    """
+    today = today or date.today()
+    days = API_PERIODS.get(period) or 10 * 366
+    seed = int(hashlib.sha256(f"{symbol}:{filter}".encode("utf-8")).hexdigest()[:8], 16)
+    price = 100 + seed % 3000
+    dates, prices, volumes = [], [], []
+    for offset in range(days, -1, -1):
+        day = today - timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+        # Cheap deterministic noise: a linear congruential step per trading day
+        seed = (seed * 1103515245 + 12345) % 2 ** 31
+        price *= 1 + ((seed / 2 ** 31) - 0.5) * 0.03
+        dates.append(day.isoformat())
+        prices.append(round(price, 2))
+        volumes.append(100000 + seed % 900000)
+    return {"datasets": [
+        {"metric": "Price", "label": "Price on NSE", "values": [[d, str(p)] for d, p in zip(dates, prices)]},
+        {"metric": "Volume", "label": "Volume", "values": [[d, v] for d, v in zip(dates, volumes)]},
+    ]}
+
+
+class FixtureReplay:
+    """
+    Fetch function (endpoint, params) -> payload backed by a fixture directory.
+
+    Requests for symbols or queries without a fixture are answered with another
+    fixture of the same endpoint (chosen deterministically) when substitute is
+    True, so load tests can use any symbol; otherwise they get a 404-style error.
+    """
+
+    def __init__(self, directory: str = str(FIXTURE_DIR), substitute: bool = True, latency: float = 0.0):
+        self.directory = Path(directory)
+        self.substitute = substitute
+        self.latency = latency
+        self._payloads: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.served = 0
+        self.substituted = 0
+
+    def _load(self, name: str) -> Optional[Any]:
+        with self._lock:
+            if name not in self._payloads:
+                path = self.directory / f"{name}.json"
+                self._payloads[name] = json.loads(path.read_text(encoding="utf-8")) if path.exists() else None
+            return self._payloads[name]
+
+    def _candidates(self, prefix: str) -> List[str]:
+        return sorted(path.stem for path in self.directory.glob(f"{prefix}_*.json"))
+
+    @staticmethod
+    def _is_error(payload: Any) -> bool:
+        return payload is None or (isinstance(payload, dict) and ("detail" in payload or "error" in payload))
+
+    def lookup(self, endpoint: str, params: Dict) -> Tuple[Optional[Any], bool]:
+        """(payload or None, whether it was substituted)"""
+        if endpoint not in FIXTURE_NAMES:
+            return None, False
+        prefix, param, file_param = FIXTURE_NAMES[endpoint]
+        if param is None:
+            return self._load(prefix), False
+
+        value = str(params.get(param, ""))
+        if endpoint == "historical_data":
+            payload = self._load(f"{prefix}_{file_param}-{value}_period-{params.get('period', '')}")
+            if self._is_error(payload):
+                return synthetic_history(value.upper(), params.get("period", "max"), params.get("filter", "price")), False
+            return payload, False
+
+        payload = self._load(f"{prefix}_{file_param}-{value}")
+        if payload is not None or not self.substitute:
+            return payload, False
+        candidates = self._candidates(prefix)
+        if not candidates:
+            return None, False
+        index = int(hashlib.sha256(value.encode("utf-8")).hexdigest(), 16) % len(candidates)
+        return self._load(candidates[index]), True
+
+    def __call__(self, endpoint: str, params: Dict) -> Any:
+        if self.latency:
+            time.sleep(self.latency)
+        payload, substituted = self.lookup(endpoint, params or {})
+        with self._lock:
+            self.served += 1
+            self.substituted += substituted
+        if payload is None:
+            return {"error": f"Indian Stock API returned HTTP 404: no fixture for /{endpoint} {params}"}
+        return payload
+
+
+def load_replay(source: str, latency: float = 0.0) -> Callable[[str, Dict], Any]:
+    """
+    Fetch function for a replay source: a fixture directory or a snapshot pack file.
+
+    Args:
+        source: Directory of fixtures, or a .snap pack
+        latency: Seconds to sleep per request, to mimic the upstream round trip
+    """
+    if Path(source).is_file():
+        # Imported here: snapshot_pack pulls in the collector, which imports nse_tools
+        from src.crew.tools.snapshot_pack import SnapshotPack, replay_fetch
+        fetch = replay_fetch(SnapshotPack(source))
+        if not latency:
+            return fetch
+
+        def delayed(endpoint: str, params: Dict) -> Any:
+            time.sleep(latency)
+            return fetch(endpoint, params)
+        return delayed
+    return FixtureReplay(source, latency=latency)
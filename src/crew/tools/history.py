@@ -0,0 +1,285 @@
+"""
+Historical price data: local parameter validation plus a per-symbol series
+cache that downloads one long series and then syncs only the missing tail.
+
+The /historical_data endpoint only accepts the periods in API_PERIODS and a
+required filter; requests are validated here so malformed ones never reach
+the API. Every window (1m, 3m, 6m, 1yr, ...) is served as a slice of the
+stored series.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.crew.tools.models import to_float
+
+
+# Periods accepted by the API, with their length in days (None = full history)
+API_PERIODS: Dict[str, Optional[int]] = {
+    "1m": 31,
+    "6m": 183,
+    "1yr": 366,
+    "3yr": 3 * 366,
+    "5yr": 5 * 366,
+    "10yr": 10 * 366,
+    "max": None,
+}
+
+# Windows served from the stored series; superset of API_PERIODS
+WINDOWS: Dict[str, Optional[int]] = dict(API_PERIODS, **{"1w": 7, "3m": 92})
+
+# Values accepted for the API's required "filter" parameter
+VALID_FILTERS: Tuple[str, ...] = ("default", "price", "pe", "sm", "evebitda", "ptb", "mcs")
+DEFAULT_FILTER = "price"
+
+# Series downloaded on first use; later syncs only fetch the gap since its last point
+BASE_PERIOD = os.getenv("HISTORY_BASE_PERIOD", "max")
+
+# Seconds a stale series is served as-is after a failed top-up before retrying
+SYNC_RETRY_SECONDS = 30
+
+# Series kept in memory at most; the least recently used are dropped first
+HISTORY_MAX_SERIES = int(os.getenv("HISTORY_MAX_SERIES", "256"))
+
+_UNIT_DAYS = {"d": 1, "w": 7, "m": 31, "y": 366}
+_PERIOD_PATTERN = re.compile(r"^(\d+)\s*(d|days?|w|wk|weeks?|m|mo|mon|months?|y|yr|yrs|years?)$")
+
+
+def normalize_period(period: str) -> str:
+    """
+    Map a user or LLM supplied period ("1Y", "6M", "3 months", "max") to a window name.
+
+    Raises:
+        ValueError: If the period cannot be understood.
+    """
+    text = (period or "").strip().lower()
+    if text in WINDOWS:
+        return text
+    if text in ("all", "maximum", "full"):
+        return "max"
+    match = _PERIOD_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Unsupported period '{period}'. Use one of: {', '.join(WINDOWS)}")
+    days = int(match.group(1)) * _UNIT_DAYS[match.group(2)[0]]
+    # Smallest window covering the requested span
+    for name, window_days in sorted(((n, d) for n, d in WINDOWS.items() if d), key=lambda item: item[1]):
+        if days <= window_days:
+            return name
+    return "max"
+
+
+def normalize_filter(value: Optional[str]) -> str:
+    """
+    Validate the API's filter parameter, defaulting to "price".
+
+    Raises:
+        ValueError: If the filter is not one the API accepts.
+    """
+    text = (value or DEFAULT_FILTER).strip().lower()
+    if text not in VALID_FILTERS:
+        raise ValueError(f"Unsupported filter '{value}'. Use one of: {', '.join(VALID_FILTERS)}")
+    return text
+
+
+def covering_period(days: int) -> str:
+    """Smallest API period whose window covers the last `days` days"""
+    for name, window_days in API_PERIODS.items():
+        if window_days is not None and days <= window_days:
+            return name
+    return "max"
+
+
+@dataclass(slots=True)
+class PriceSeries:
+    """Date-aligned metric columns from /historical_data ("Price", "DMA50", "Volume", ...)"""
+    symbol: str
+    filter: str
+    dates: List[str] = field(default_factory=list)  # ISO dates, ascending
+    metrics: Dict[str, List[Optional[float]]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def last_date(self) -> Optional[str]:
+        return self.dates[-1] if self.dates else None
+
+    def column(self, metric: str) -> List[Optional[float]]:
+        return self.metrics.get(metric, [None] * len(self.dates))
+
+    def window(self, days: Optional[int], today: Optional[date] = None) -> "PriceSeries":
+        """Slice covering the last `days` calendar days (the full series for None)"""
+        if days is None or not self.dates:
+            return self
+        start = ((today or date.today()) - timedelta(days=days)).isoformat()
+        # Dates are ISO strings, so lexical order is chronological
+        lo, hi = 0, len(self.dates)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.dates[mid] < start:
+                lo = mid + 1
+            else:
+                hi = mid
+        return PriceSeries(
+            symbol=self.symbol,
+            filter=self.filter,
+            dates=self.dates[lo:],
+            metrics={name: values[lo:] for name, values in self.metrics.items()},
+        )
+
+
+def parse_historical_data(payload: Any, symbol: str, filter: str) -> PriceSeries:
+    """Parse a /historical_data payload ({"datasets": [{"metric", "values": [[date, value, ...]]}]})"""
+    columns: Dict[str, Dict[str, Optional[float]]] = {}
+    datasets = payload.get("datasets") if isinstance(payload, dict) else None
+    for dataset in datasets if isinstance(datasets, list) else []:
+        if not isinstance(dataset, dict):
+            continue
+        metric = str(dataset.get("metric") or dataset.get("label") or "Value")
+        points = columns.setdefault(metric, {})
+        for point in dataset.get("values") or []:
+            if isinstance(point, list) and len(point) >= 2:
+                points[str(point[0])[:10]] = to_float(point[1])
+    dates = sorted({day for points in columns.values() for day in points})
+    return PriceSeries(
+        symbol=symbol,
+        filter=filter,
+        dates=dates,
+        metrics={metric: [points.get(day) for day in dates] for metric, points in columns.items()},
+    )
+
+
+def merge_series(base: PriceSeries, update: PriceSeries) -> PriceSeries:
+    """Union of two series; points in update replace base points on the same date"""
+    columns: Dict[str, Dict[str, Optional[float]]] = {}
+    for series in (base, update):
+        for metric, values in series.metrics.items():
+            columns.setdefault(metric, {}).update(zip(series.dates, values))
+    dates = sorted(set(base.dates) | set(update.dates))
+    return PriceSeries(
+        symbol=base.symbol,
+        filter=base.filter,
+        dates=dates,
+        metrics={metric: [points.get(day) for day in dates] for metric, points in columns.items()},
+    )
+
+
+class _Slot:
+    __slots__ = ("series", "synced_at", "lock")
+
+    def __init__(self):
+        self.series: Optional[PriceSeries] = None
+        self.synced_at = 0.0
+        self.lock = threading.Lock()
+
+
+class HistoryStore:
+    """
+    Per (symbol, filter) series cache with incremental sync.
+
+    The first request downloads BASE_PERIOD once. When the series goes stale
+    only the smallest API period covering the gap since its last point is
+    fetched and merged, and every window is a slice of the stored series.
+    At most max_series series are kept, least recently used dropped first.
+    """
+
+    def __init__(self, fetch: Callable[[str, Dict], Any], ttl: int = 3600,
+                 base_period: str = BASE_PERIOD, max_series: int = HISTORY_MAX_SERIES):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.base_period = base_period if base_period in API_PERIODS else "max"
+        self.max_series = max_series
+        # Least recently used first
+        self._slots: "OrderedDict[Tuple[str, str], _Slot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"full_syncs": 0, "incremental_syncs": 0, "windows_served": 0, "sync_errors": 0,
+                       "evictions": 0}
+
+    def _slot(self, key: Tuple[str, str]) -> _Slot:
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None:
+                self._slots.move_to_end(key)
+                return slot
+            # Slots mid-sync are skipped; they are still in use
+            for old_key in [old_key for old_key, old in self._slots.items() if not old.lock.locked()]:
+                if len(self._slots) < self.max_series:
+                    break
+                del self._slots[old_key]
+                self._stats["evictions"] += 1
+            slot = self._slots[key] = _Slot()
+            return slot
+
+    def _request(self, symbol: str, period: str, filter: str) -> Tuple[Optional[PriceSeries], Optional[str]]:
+        data = self._fetch("historical_data", {"stock_name": symbol, "period": period, "filter": filter})
+        if isinstance(data, dict) and "error" in data:
+            return None, data["error"]
+        series = parse_historical_data(data, symbol, filter)
+        if not series.dates:
+            return None, f"No historical data returned for period {period}"
+        return series, None
+
+    def sync(self, symbol: str, filter: str = DEFAULT_FILTER,
+             today: Optional[date] = None) -> Tuple[Optional[PriceSeries], Optional[str]]:
+        """
+        Return the stored series for a symbol, downloading or topping it up if stale.
+
+        Returns:
+            Tuple of (series or None, error message or None). A stale series is
+            still returned if the top-up request fails, and the top-up is not
+            retried for SYNC_RETRY_SECONDS.
+        """
+        symbol = symbol.upper()
+        slot = self._slot((symbol, filter))
+        # One sync per series at a time; concurrent callers wait and reuse it
+        with slot.lock:
+            if slot.series is not None and time.monotonic() - slot.synced_at < self.ttl:
+                return slot.series, None
+
+            if slot.series is None or slot.series.last_date is None:
+                series, error = self._request(symbol, self.base_period, filter)
+                counter = "full_syncs"
+            else:
+                gap = ((today or date.today()) - date.fromisoformat(slot.series.last_date)).days
+                update, error = self._request(symbol, covering_period(max(gap, 1)), filter)
+                series = merge_series(slot.series, update) if update is not None else None
+                counter = "incremental_syncs"
+
+            with self._lock:
+                self._stats[counter if error is None else "sync_errors"] += 1
+            if error is not None:
+                if slot.series is not None:
+                    slot.synced_at = time.monotonic() - self.ttl + SYNC_RETRY_SECONDS
+                    return slot.series, None
+                return None, error
+            slot.series = series
+            slot.synced_at = time.monotonic()
+            return series, None
+
+    def window(self, symbol: str, period: str, filter: str = DEFAULT_FILTER,
+               today: Optional[date] = None) -> Tuple[Optional[PriceSeries], Optional[str]]:
+        """Series for one window ("1m", "6m", "1yr", ...), sliced from the stored series"""
+        series, error = self.sync(symbol, filter, today)
+        if series is None:
+            return None, error
+        with self._lock:
+            self._stats["windows_served"] += 1
+        return series.window(WINDOWS[period], today), None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slots.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["series"] = sum(1 for slot in self._slots.values() if slot.series is not None)
+            stats["points"] = sum(len(slot.series) for slot in self._slots.values() if slot.series is not None)
+            stats["max_series"] = self.max_series
+        return stats
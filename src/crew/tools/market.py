@@ -0,0 +1,169 @@
+"""
+Market snapshot engine: trending and 52-week high/low payloads indexed into
+in-memory tables, so filtered and ranked views are served without re-fetching
+or re-parsing for every question.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.crew.tools.models import (
+    HighLowEntry,
+    TrendingEntry,
+    parse_52_week_high_low,
+    parse_trending,
+)
+
+
+def distance_from_high(entry: TrendingEntry) -> Optional[float]:
+    """Percent below the 52-week high (0 at the high, negative below it)"""
+    if entry.price is None or not entry.year_high:
+        return None
+    return (entry.price / entry.year_high - 1) * 100
+
+
+def distance_from_level(entry: HighLowEntry) -> Optional[float]:
+    """Percent between the price and the 52-week level it is testing"""
+    if entry.price is None or not entry.level:
+        return None
+    return (entry.price / entry.level - 1) * 100
+
+
+def distance_through_level(entry: HighLowEntry) -> Optional[float]:
+    """
+    Signed percent past the 52-week level: above a high or below a low counts
+    as positive, short of the level as negative.
+    """
+    distance = distance_from_level(entry)
+    if distance is None:
+        return None
+    return distance if entry.kind == "high" else -distance
+
+
+# Sort keys per view: name -> (key function, descending)
+TRENDING_SORTS: Dict[str, Tuple[Callable[[TrendingEntry], Optional[float]], bool]] = {
+    "percent_change": (lambda entry: entry.percent_change, True),
+    "volume": (lambda entry: entry.volume, True),
+    "distance_from_high": (distance_from_high, True),
+    "price": (lambda entry: entry.price, True),
+}
+
+HIGH_LOW_SORTS: Dict[str, Tuple[Callable[[HighLowEntry], Optional[float]], bool]] = {
+    "distance": (distance_through_level, True),
+    "price": (lambda entry: entry.price, True),
+}
+
+
+def _split_sorted(entries: Sequence, key: Callable, descending: bool) -> Tuple[Tuple, Tuple]:
+    """(entries with a value sorted by key, entries without one)"""
+    present = [entry for entry in entries if key(entry) is not None]
+    missing = tuple(entry for entry in entries if key(entry) is None)
+    present.sort(key=key, reverse=descending)
+    return tuple(present), missing
+
+
+def _sorted(entries: Sequence, key: Callable, descending: bool) -> Tuple:
+    """Sort by key, keeping entries without a value at the end"""
+    present, missing = _split_sorted(entries, key, descending)
+    return present + missing
+
+
+class TrendingTable:
+    """Trending gainers and losers with precomputed orderings per sort key"""
+
+    def __init__(self, entries: Sequence[TrendingEntry]):
+        self.entries = tuple(entries)
+        self.exchanges = tuple(sorted({entry.exchange for entry in self.entries}))
+        self._orders = {name: _split_sorted(self.entries, key, descending)
+                        for name, (key, descending) in TRENDING_SORTS.items()}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def view(self, direction: Optional[str] = None, exchange: Optional[str] = None,
+             min_abs_change: Optional[float] = None, sort_by: str = "percent_change",
+             ascending: bool = False, limit: Optional[int] = 10) -> List[TrendingEntry]:
+        """
+        Filtered, ranked slice of the table.
+
+        Args:
+            direction: "gainer" or "loser" (both when None)
+            exchange: Exchange code such as "NSE" (all when None)
+            min_abs_change: Only moves of at least this many percent either way
+            sort_by: One of TRENDING_SORTS
+            ascending: Reverse the default (largest first) order
+            limit: Maximum number of rows
+        """
+        present, missing = self._orders.get(sort_by, self._orders["percent_change"])
+        ordered = (present[::-1] if ascending else present) + missing
+        rows = []
+        for entry in ordered:
+            if direction and entry.direction != direction:
+                continue
+            if exchange and entry.exchange != exchange.upper():
+                continue
+            if min_abs_change is not None and abs(entry.percent_change or 0.0) < min_abs_change:
+                continue
+            rows.append(entry)
+            if limit is not None and len(rows) >= limit:
+                break
+        return rows
+
+
+class HighLowTable:
+    """Stocks testing 52-week highs and lows, indexed by (exchange, kind)"""
+
+    def __init__(self, entries: Sequence[HighLowEntry]):
+        self.entries = tuple(entries)
+        self._index: Dict[Tuple[str, str], Dict[str, Tuple[HighLowEntry, ...]]] = {}
+        groups: Dict[Tuple[str, str], List[HighLowEntry]] = {}
+        for entry in self.entries:
+            groups.setdefault((entry.exchange, entry.kind), []).append(entry)
+        for group, members in groups.items():
+            self._index[group] = {name: _sorted(members, key, descending)
+                                  for name, (key, descending) in HIGH_LOW_SORTS.items()}
+        self.exchanges = tuple(dict.fromkeys(exchange for exchange, _ in self._index))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def count(self, exchange: str, kind: str) -> int:
+        orders = self._index.get((exchange, kind))
+        return len(orders["price"]) if orders else 0
+
+    def view(self, kind: str, exchange: Optional[str] = None, sort_by: str = "distance",
+             limit: Optional[int] = 10) -> List[HighLowEntry]:
+        """
+        Stocks at 52-week highs ("high") or lows ("low"), ranked.
+
+        Args:
+            kind: "high" or "low"
+            exchange: "NSE" or "BSE" (both when None)
+            sort_by: "distance" (furthest through the level first) or "price"
+            limit: Maximum number of rows
+        """
+        sort_by = sort_by if sort_by in HIGH_LOW_SORTS else "distance"
+        exchanges = [exchange.upper()] if exchange else self.exchanges
+        rows: List[HighLowEntry] = []
+        for code in exchanges:
+            orders = self._index.get((code, kind))
+            if orders:
+                rows.extend(orders[sort_by])
+        if len(exchanges) > 1:
+            key, descending = HIGH_LOW_SORTS[sort_by]
+            rows = list(_sorted(rows, key, descending))
+        return rows[:limit] if limit is not None else rows
+
+
+def build_trending_table(payload) -> TrendingTable:
+    return TrendingTable(parse_trending(payload))
+
+
+def build_high_low_table(payload) -> HighLowTable:
+    return HighLowTable(parse_52_week_high_low(payload))
+
+
+# Index builders for the market-wide endpoints, keyed by endpoint name
+MARKET_TABLE_BUILDERS: Dict[str, Callable] = {
+    "trending": build_trending_table,
+    "fetch_52_week_high_low_data": build_high_low_table,
+}
@@ -0,0 +1,348 @@
+"""
+Typed domain model for Indian Stock API payloads.
+
+Each payload is parsed once into slotted dataclasses; tools, the cache and the
+API work with these instead of re-walking the raw nested dicts.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Fast coercion helpers (the API mixes numbers, numeric strings, "" and None)
+def to_float(value: Any) -> Optional[float]:
+    """Coerce an API value to float, returning None for blanks and "N/A"."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
+
+
+def to_str(value: Any, default: str = "") -> str:
+    if value is None:
+        return default
+    return str(value)
+
+
+def _dict(value: Any) -> Dict:
+    return value if isinstance(value, dict) else {}
+
+
+def _list(value: Any) -> List:
+    return value if isinstance(value, list) else []
+
+
+def format_number(value: Optional[float]) -> str:
+    """Render a parsed number the way the tools print it ("N/A" when missing)."""
+    if value is None:
+        return "N/A"
+    if value.is_integer():
+        return str(int(value))
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+@dataclass(slots=True)
+class Quote:
+    company_name: str
+    industry: str
+    nse_price: Optional[float]
+    bse_price: Optional[float]
+    percent_change: Optional[float]
+    year_high: Optional[float]
+    year_low: Optional[float]
+    # (days, NSE price) moving averages
+    moving_averages: Tuple[Tuple[int, Optional[float]], ...] = ()
+
+
+@dataclass(slots=True)
+class CompanyProfile:
+    description: str
+    industry: str
+    isin: str
+    bse_code: str
+    nse_code: str
+    # (full name, title) of key executives in rank order
+    officers: Tuple[Tuple[str, str], ...] = ()
+
+
+@dataclass(slots=True)
+class Peer:
+    ticker_id: str
+    company_name: str
+    local_name: str  # company name in the listing's local script
+    price: Optional[float]
+    percent_change: Optional[float]
+    market_cap: Optional[float]
+    pe_ratio: Optional[float]
+    pb_ratio: Optional[float]
+    roe_ttm: Optional[float]
+    net_margin_ttm: Optional[float]
+    dividend_yield: Optional[float]
+    year_high: Optional[float]
+    year_low: Optional[float]
+    rating: str
+
+
+@dataclass(slots=True)
+class FinancialStatement:
+    fiscal_year: str
+    end_date: str
+    period_type: str  # "Annual" or "Interim"
+    statement: str  # "INC", "BAL" or "CAS"
+    values: Dict[str, Optional[float]] = field(default_factory=dict)
+    labels: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class StockDetails:
+    """Parsed /stock payload"""
+    quote: Quote
+    profile: CompanyProfile
+    peers: Tuple[Peer, ...]
+    financials: Tuple[FinancialStatement, ...]
+
+
+@dataclass(slots=True)
+class IndustryStock:
+    id: str
+    name: str
+    industry: str
+    sector: str
+    nse_code: str
+    bse_code: str
+    short_term_trend: str
+    long_term_trend: str
+    overall_rating: str
+
+
+@dataclass(slots=True)
+class MutualFundScheme:
+    id: str
+    scheme_name: str
+    isin: str
+    scheme_type: str
+    category_id: str
+    plan: str  # "direct", "regular" or "other"
+    option: str  # "growth", "dividend" or "other"
+
+
+@dataclass(slots=True)
+class TrendingEntry:
+    ticker_id: str
+    ric: str  # Reuters code, e.g. "WIPR.NS"
+    company_name: str
+    direction: str  # "gainer" or "loser"
+    exchange: str
+    price: Optional[float]
+    percent_change: Optional[float]
+    net_change: Optional[float]
+    open: Optional[float]
+    high: Optional[float]
+    low: Optional[float]
+    close: Optional[float]
+    volume: Optional[float]
+    year_high: Optional[float]
+    year_low: Optional[float]
+    overall_rating: str
+    short_term_trend: str
+    long_term_trend: str
+
+
+@dataclass(slots=True)
+class HighLowEntry:
+    ticker: str
+    company: str
+    exchange: str  # "NSE" or "BSE"
+    kind: str  # "high" or "low"
+    price: Optional[float]
+    level: Optional[float]  # the 52-week high or low being tested
+
+
+# Parsers: one per endpoint payload
+def parse_stock_details(payload: Dict) -> StockDetails:
+    """Parse a /stock payload."""
+    data = _dict(payload)
+    current_price = _dict(data.get("currentPrice"))
+    quote = Quote(
+        company_name=to_str(data.get("companyName"), "N/A"),
+        industry=to_str(data.get("industry"), "N/A"),
+        nse_price=to_float(current_price.get("NSE")),
+        bse_price=to_float(current_price.get("BSE")),
+        percent_change=to_float(data.get("percentChange")),
+        year_high=to_float(data.get("yearHigh")),
+        year_low=to_float(data.get("yearLow")),
+        moving_averages=tuple(
+            (int(to_float(item.get("days")) or 0), to_float(item.get("nsePrice")))
+            for item in _list(data.get("stockTechnicalData"))
+            if isinstance(item, dict)
+        ),
+    )
+
+    profile_data = _dict(data.get("companyProfile"))
+    officers = []
+    for officer in _list(_dict(profile_data.get("officers")).get("officer")):
+        if isinstance(officer, dict):
+            name = f"{to_str(officer.get('firstName'))} {to_str(officer.get('lastName'))}"
+            title = to_str(_dict(officer.get("title")).get("Value"), "N/A")
+            officers.append((name, title))
+    profile = CompanyProfile(
+        description=to_str(profile_data.get("companyDescription")),
+        industry=to_str(profile_data.get("mgIndustry"), "N/A"),
+        isin=to_str(profile_data.get("isInId"), "N/A"),
+        bse_code=to_str(profile_data.get("exchangeCodeBse"), "N/A"),
+        nse_code=to_str(profile_data.get("exchangeCodeNse"), "N/A"),
+        officers=tuple(officers),
+    )
+
+    peers = tuple(
+        Peer(
+            ticker_id=to_str(peer.get("tickerId")),
+            company_name=to_str(peer.get("companyName"), "N/A"),
+            local_name=to_str(peer.get("languageSupport")),
+            price=to_float(peer.get("price")),
+            percent_change=to_float(peer.get("percentChange")),
+            market_cap=to_float(peer.get("marketCap")),
+            pe_ratio=to_float(peer.get("priceToEarningsValueRatio")),
+            pb_ratio=to_float(peer.get("priceToBookValueRatio")),
+            roe_ttm=to_float(peer.get("returnOnAverageEquityTrailing12Month")),
+            net_margin_ttm=to_float(peer.get("netProfitMarginPercentTrailing12Month")),
+            dividend_yield=to_float(peer.get("dividendYieldIndicatedAnnualDividend")),
+            year_high=to_float(peer.get("yhigh")),
+            year_low=to_float(peer.get("ylow")),
+            rating=to_str(peer.get("overallRating"), "N/A"),
+        )
+        for peer in _list(profile_data.get("peerCompanyList"))
+        if isinstance(peer, dict)
+    )
+
+    financials = []
+    for period in _list(data.get("financials")):
+        if not isinstance(period, dict):
+            continue
+        for statement, items in _dict(period.get("stockFinancialMap")).items():
+            values = {}
+            labels = {}
+            for item in _list(items):
+                if isinstance(item, dict) and item.get("key"):
+                    values[item["key"]] = to_float(item.get("value"))
+                    labels[item["key"]] = to_str(item.get("displayName"), item["key"]).strip()
+            financials.append(FinancialStatement(
+                fiscal_year=to_str(period.get("FiscalYear"), "N/A"),
+                end_date=to_str(period.get("EndDate")),
+                period_type=to_str(period.get("Type")),
+                statement=statement,
+                values=values,
+                labels=labels,
+            ))
+
+    return StockDetails(quote=quote, profile=profile, peers=peers, financials=tuple(financials))
+
+
+def parse_industry_search(payload: Any) -> Tuple[IndustryStock, ...]:
+    """Parse an /industry_search payload."""
+    stocks = []
+    for stock in _list(payload):
+        if not isinstance(stock, dict):
+            continue
+        trends = _dict(stock.get("activeStockTrends"))
+        stocks.append(IndustryStock(
+            id=to_str(stock.get("id")),
+            name=to_str(stock.get("commonName"), "N/A"),
+            industry=to_str(stock.get("mgIndustry"), "N/A"),
+            sector=to_str(stock.get("mgSector"), "N/A"),
+            nse_code=to_str(stock.get("exchangeCodeNsi"), "N/A"),
+            bse_code=to_str(stock.get("exchangeCodeBse"), "N/A"),
+            short_term_trend=to_str(trends.get("shortTermTrends"), "N/A"),
+            long_term_trend=to_str(trends.get("longTermTrends"), "N/A"),
+            overall_rating=to_str(trends.get("overallRating"), "N/A"),
+        ))
+    return tuple(stocks)
+
+
+def _classify_scheme(scheme_name: str) -> Tuple[str, str]:
+    name = scheme_name.lower()
+    plan = "direct" if "direct" in name else "regular" if "regular" in name else "other"
+    if "growth" in name:
+        option = "growth"
+    elif "dividend" in name or "payout" in name:
+        option = "dividend"
+    else:
+        option = "other"
+    return plan, option
+
+
+def parse_mutual_funds(payload: Any) -> Tuple[MutualFundScheme, ...]:
+    """Parse a /mutual_fund_search payload."""
+    schemes = []
+    for fund in _list(payload):
+        if not isinstance(fund, dict):
+            continue
+        scheme_name = to_str(fund.get("schemeName"), "N/A")
+        plan, option = _classify_scheme(scheme_name)
+        schemes.append(MutualFundScheme(
+            id=to_str(fund.get("id")),
+            scheme_name=scheme_name,
+            isin=to_str(fund.get("isin"), "N/A"),
+            scheme_type=to_str(fund.get("schemeType"), "N/A"),
+            category_id=to_str(fund.get("categoryId"), "N/A"),
+            plan=plan,
+            option=option,
+        ))
+    return tuple(schemes)
+
+
+def parse_trending(payload: Any) -> Tuple[TrendingEntry, ...]:
+    """Parse a /trending payload ({"trending_stocks": {"top_gainers": [...], "top_losers": [...]}})."""
+    groups = _dict(_dict(payload).get("trending_stocks"))
+    entries = []
+    for group, direction in (("top_gainers", "gainer"), ("top_losers", "loser")):
+        for stock in _list(groups.get(group)):
+            if not isinstance(stock, dict):
+                continue
+            entries.append(TrendingEntry(
+                ticker_id=to_str(stock.get("ticker_id")),
+                ric=to_str(stock.get("ric")),
+                company_name=to_str(stock.get("company_name"), "N/A"),
+                direction=direction,
+                exchange="NSE" if stock.get("exchange_type") == "NSI" else to_str(stock.get("exchange_type"), "N/A"),
+                price=to_float(stock.get("price")),
+                percent_change=to_float(stock.get("percent_change")),
+                net_change=to_float(stock.get("net_change")),
+                open=to_float(stock.get("open")),
+                high=to_float(stock.get("high")),
+                low=to_float(stock.get("low")),
+                close=to_float(stock.get("close")),
+                volume=to_float(stock.get("volume")),
+                year_high=to_float(stock.get("year_high")),
+                year_low=to_float(stock.get("year_low")),
+                overall_rating=to_str(stock.get("overall_rating"), "N/A"),
+                short_term_trend=to_str(stock.get("short_term_trends"), "N/A"),
+                long_term_trend=to_str(stock.get("long_term_trends"), "N/A"),
+            ))
+    return tuple(entries)
+
+
+def parse_52_week_high_low(payload: Any) -> Tuple[HighLowEntry, ...]:
+    """Parse a /fetch_52_week_high_low_data payload (BSE_52WeekHighLow / NSE_52WeekHighLow)."""
+    data = _dict(payload)
+    entries = []
+    for exchange in ("NSE", "BSE"):
+        section = _dict(data.get(f"{exchange}_52WeekHighLow"))
+        for group, kind, level_key in (("high52Week", "high", "52_week_high"),
+                                       ("low52Week", "low", "52_week_low")):
+            for stock in _list(section.get(group)):
+                if not isinstance(stock, dict):
+                    continue
+                entries.append(HighLowEntry(
+                    ticker=to_str(stock.get("ticker"), "N/A"),
+                    company=to_str(stock.get("company"), "N/A"),
+                    exchange=exchange,
+                    kind=kind,
+                    price=to_float(stock.get("price")),
+                    level=to_float(stock.get(level_key)),
+                ))
+    return tuple(entries)
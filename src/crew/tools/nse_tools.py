@@ -1,8 +1,36 @@
 import http.client
 import json
-from typing import Dict, List, Optional
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
 import os
-from urllib.parse import urlencode
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from src.crew.tools.cache import response_cache, make_cache_key
+from src.crew.tools.deadline import abandoned_work, current_deadline, remaining_timeout
+from src.crew.tools.financials import DERIVED_METRICS, FinancialStore, derived_metric
+from src.crew.tools.history import HistoryStore, normalize_filter, normalize_period
+from src.crew.tools.market import (
+    TRENDING_SORTS,
+    build_high_low_table,
+    build_trending_table,
+    distance_from_high,
+    distance_from_level,
+)
+from src.crew.tools.models import (
+    IndustryStock,
+    MutualFundScheme,
+    format_number,
+    parse_industry_search,
+    parse_mutual_funds,
+    parse_stock_details,
+)
+from src.crew.tools.peers import PEER_METRICS, PeerFrame, resolve_metric
+from src.crew.tools.timeline import IST, MARKET_LISTS, RECORDED_ENDPOINTS, TIMELINE_ENABLED, timeline_store
+from src.crew.tools.tool_memo import memoize_per_run
 
 # Try to import CrewAI tool decorator, fallback if not available
 try:
@@ -23,27 +51,175 @@ except ImportError:
 
 
 # Indian Stock API Helper Functions
-def make_indian_stock_request(endpoint: str, params: Dict = None) -> Dict:
-    """Make API request to Indian Stock API"""
+def make_indian_stock_request(endpoint: str, params: Dict = None,
+                              use_cache: bool = True, prefetched: bool = False,
+                              ttl: Optional[int] = None) -> Dict:
+    """
+    Make API request to Indian Stock API, served from the shared response cache when fresh.
+    
+    Args:
+        endpoint: API endpoint name (e.g., stock, trending)
+        params: Query parameters
+        use_cache: Set False to force an upstream request (the result still refreshes the cache)
+        prefetched: Mark the cached result as speculative so prefetch hit/waste rates can be tracked
+        ttl: Seconds to keep the result cached (defaults to the endpoint's TTL)
+    """
     if params is None:
         params = {}
     
+    key = make_cache_key(endpoint, params)
+    
+    def fetch():
+        data = _fetch_indian_stock(endpoint, params)
+        # Fresh upstream payloads feed the time-travel history
+        if TIMELINE_ENABLED and endpoint in RECORDED_ENDPOINTS and not (isinstance(data, dict) and "error" in data):
+            timeline_store.record_async(endpoint, params, data)
+        return data
+    
+    if not use_cache:
+        data = fetch()
+        if not (isinstance(data, dict) and "error" in data):
+            response_cache.set(key, data, prefetched=prefetched, ttl=ttl)
+        return data
+    return response_cache.get_or_fetch(key, fetch, prefetched=prefetched, ttl=ttl)
+
+
+def fetch_parsed(endpoint: str, params: Dict, parser: Callable[[Any], Any],
+                 name: Optional[str] = None):
+    """
+    Fetch a payload and parse it into the typed domain model.
+    
+    The parsed value is memoized on the cache entry, so every tool (and the API)
+    shares one parse per fetched payload.
+    
+    Args:
+        endpoint: API endpoint name
+        params: Query parameters
+        parser: Builds the model from the raw payload
+        name: Memoization name (defaults to the parser's name)
+    
+    Returns:
+        Tuple of (parsed model or None, error message or None).
+    """
+    data = make_indian_stock_request(endpoint, params)
+    if isinstance(data, dict) and "error" in data:
+        return None, data["error"]
+    if not data:
+        return None, None
+    key = make_cache_key(endpoint, params)
+    return response_cache.derive(key, name or parser.__name__, data, parser), None
+
+
+def fetch_financial_store(symbol: str):
+    """
+    Fetch a stock's financials as an indexed FinancialStore.
+    
+    The store is built once per fetched /stock payload, on top of the shared
+    parse, and reused by every caller until the payload is refreshed.
+    
+    Returns:
+        Tuple of (FinancialStore or None, error message or None).
+    """
+    endpoint = "stock"
+    params = {"name": symbol.upper()}
+    key = make_cache_key(endpoint, params)
+    
+    def build(payload):
+        details = response_cache.derive(key, parse_stock_details.__name__, payload, parse_stock_details)
+        return FinancialStore(symbol, details.financials)
+    
+    return fetch_parsed(endpoint, params, build, name=FinancialStore.__name__)
+
+
+# Per-symbol historical series, fetched incrementally (see history.py)
+history_store = HistoryStore(lambda endpoint, params: _fetch_indian_stock(endpoint, params),
+                             ttl=response_cache.ttl_for("historical_data"))
+
+
+# Upstream base URL; point it at the mock server (src/crew/perf/mock_api.py) for
+# offline end-to-end and performance tests
+INDIAN_STOCK_API_URL = os.getenv("INDIAN_STOCK_API_URL", "https://stock.indianapi.in")
+_api_url = urlsplit(INDIAN_STOCK_API_URL)
+INDIAN_STOCK_API_HOST = _api_url.netloc
+_API_PATH_PREFIX = _api_url.path.rstrip("/")
+
+# Serve recorded payloads (a fixture directory or snapshot pack) instead of the
+# network, for offline runs and load tests; see fixtures.py
+REPLAY_SOURCE = os.getenv("INDIAN_STOCK_REPLAY", "")
+REPLAY_LATENCY = float(os.getenv("INDIAN_STOCK_REPLAY_LATENCY", "0"))
+_replay_fetch: Optional[Callable[[str, Dict], Any]] = None
+
+# Keep-alive connections shared by every tool call in the process
+_connection_pool: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=8)
+
+
+def _acquire_connection() -> http.client.HTTPConnection:
+    try:
+        return _connection_pool.get_nowait()
+    except queue.Empty:
+        connection_class = http.client.HTTPConnection if _api_url.scheme == "http" else http.client.HTTPSConnection
+        return connection_class(_api_url.hostname, _api_url.port, timeout=30)
+
+
+def _release_connection(conn: http.client.HTTPConnection) -> None:
+    try:
+        _connection_pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+def _fetch_indian_stock(endpoint: str, params: Dict) -> Dict:
+    """Perform the upstream Indian Stock API request over a pooled connection"""
+    deadline = current_deadline.get()
+    reason = deadline.aborted() if deadline is not None else None
+    if reason:
+        # The run is being abandoned; don't spend upstream quota on it
+        abandoned_work.record("upstream", reason)
+        return {"error": f"Request skipped: {reason}"}
+    if REPLAY_SOURCE:
+        return _replay(endpoint, params)
     try:
-        conn = http.client.HTTPSConnection("stock.indianapi.in")
-        headers = { 'X-Api-Key': "sk-live-efd6p1wyz4wDUWtKAGLzn4diji8ObRXgPC4d05Ir" }
+        headers = { 'X-Api-Key': os.getenv("INDIAN_API_KEY") or "sk-live-efd6p1wyz4wDUWtKAGLzn4diji8ObRXgPC4d05Ir" }
         
         # Build the URL with query parameters
-        url_path = f"/{endpoint}"
+        url_path = f"{_API_PATH_PREFIX}/{endpoint}"
         if params:
             url_path += f"?{urlencode(params)}"
         
-        conn.request("GET", url_path, headers=headers)
-        res = conn.getresponse()
-        data = res.read()
+        for attempt in range(2):
+            conn = _acquire_connection()
+            # Never wait on upstream longer than the run has left
+            conn.timeout = remaining_timeout(30)
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+            try:
+                conn.request("GET", url_path, headers=headers)
+                res = conn.getresponse()
+                data = res.read()
+            except (http.client.RemoteDisconnected, ConnectionError, BrokenPipeError):
+                # The server closed an idle pooled connection; retry once on a fresh one
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+            _release_connection(conn)
+            break
         
         # Parse JSON response
         response_text = data.decode("utf-8")
-        return json.loads(response_text)
+        payload = json.loads(response_text)
+        if res.status >= 400:
+            # Validation failures come back as {"detail": [...]}; surface them as errors
+            # so they are never cached or formatted as data
+            detail = payload.get("detail") if isinstance(payload, dict) else None
+            if isinstance(detail, list):
+                detail = "; ".join(str(item.get("msg", item)) if isinstance(item, dict) else str(item)
+                                   for item in detail)
+            return {"error": f"Indian Stock API returned HTTP {res.status}: {detail or response_text[:200]}"}
+        return payload
         
     except http.client.HTTPException as e:
         return {"error": f"Indian Stock API request failed: {str(e)}"}
@@ -53,8 +229,17 @@ def make_indian_stock_request(endpoint: str, params: Dict = None) -> Dict:
         return {"error": f"Unexpected error: {str(e)}"}
 
 
+def _replay(endpoint: str, params: Dict) -> Any:
+    global _replay_fetch
+    if _replay_fetch is None:
+        from src.crew.tools.fixtures import load_replay
+        _replay_fetch = load_replay(REPLAY_SOURCE, REPLAY_LATENCY)
+    return _replay_fetch(endpoint, params)
+
+
 # 1. Stock Details
 @tool
+@memoize_per_run
 def get_stock_details(symbol: str) -> str:
     """
     Get comprehensive stock details from Indian Stock API.
@@ -70,142 +255,90 @@ def get_stock_details(symbol: str) -> str:
     print(symbol)
     params = {"name": symbol.upper()}
     
-    data = make_indian_stock_request(endpoint, params)
+    details, error = fetch_parsed(endpoint, params, parse_stock_details)
     
-    if "error" in data:
-        return f"Error fetching stock data for {symbol}: {data['error']}"
+    if error:
+        return f"Error fetching stock data for {symbol}: {error}"
     
-    if not data:
+    if details is None:
         return f"No stock data found for {symbol.upper()}"
     
     try:
+        quote = details.quote
+        profile = details.profile
+        
         result = f"📈 COMPREHENSIVE STOCK ANALYSIS: {symbol.upper()}\n"
         result += "=" * 60 + "\n\n"
         
-        if isinstance(data, dict):
-            # 🏢 COMPANY OVERVIEW
-            result += "🏢 COMPANY OVERVIEW\n"
+        # 🏢 COMPANY OVERVIEW
+        result += "🏢 COMPANY OVERVIEW\n"
+        result += "-" * 30 + "\n"
+        result += f"Company Name: {quote.company_name}\n"
+        result += f"Industry: {quote.industry}\n"
+        result += f"BSE Code: {profile.bse_code}\n"
+        result += f"NSE Code: {profile.nse_code}\n"
+        result += f"ISIN: {profile.isin}\n"
+        
+        # Company description (first 300 chars for better context)
+        if profile.description:
+            result += f"Description: {profile.description[:300]}...\n"
+        
+        # 💰 CURRENT MARKET DATA
+        result += "\n💰 CURRENT MARKET DATA\n"
+        result += "-" * 30 + "\n"
+        result += f"BSE Price: ₹{format_number(quote.bse_price)}\n"
+        result += f"NSE Price: ₹{format_number(quote.nse_price)}\n"
+        result += f"Today's Change: {format_number(quote.percent_change)}%\n"
+        result += f"52 Week High: ₹{format_number(quote.year_high)}\n"
+        result += f"52 Week Low: ₹{format_number(quote.year_low)}\n"
+        
+        # 📊 TECHNICAL ANALYSIS
+        if quote.moving_averages:
+            result += "\n📊 TECHNICAL ANALYSIS (Moving Averages)\n"
             result += "-" * 30 + "\n"
-            result += f"Company Name: {data.get('companyName', 'N/A')}\n"
-            result += f"Industry: {data.get('industry', 'N/A')}\n"
-            
-            company_profile = data.get('companyProfile', {})
-            if isinstance(company_profile, dict):
-                result += f"BSE Code: {company_profile.get('exchangeCodeBse', 'N/A')}\n"
-                result += f"NSE Code: {company_profile.get('exchangeCodeNse', 'N/A')}\n"
-                result += f"ISIN: {company_profile.get('isInId', 'N/A')}\n"
-                
-                # Company description (first 300 chars for better context)
-                description = company_profile.get('companyDescription', '')
-                if description:
-                    result += f"Description: {description[:300]}...\n"
-            
-            # 💰 CURRENT MARKET DATA
-            result += "\n💰 CURRENT MARKET DATA\n"
+            for days, nse_price in quote.moving_averages:
+                result += f"  MA {days} Days: ₹{format_number(nse_price)}\n"
+        
+        # 👥 KEY EXECUTIVES
+        if profile.officers:
+            result += "\n👥 KEY EXECUTIVES\n"
+            result += "-" * 30 + "\n"
+            for name, title in profile.officers[:5]:  # Top 5 executives
+                result += f"  • {name} - {title}\n"
+        
+        # 🏭 PEER COMPARISON
+        if details.peers:
+            result += "\n🏭 PEER COMPARISON\n"
+            result += "-" * 30 + "\n"
+            for i, peer in enumerate(details.peers):
+                result += f"  {i+1}. {peer.company_name}\n"
+                result += f"     Price: ₹{format_number(peer.price)} ({format_number(peer.percent_change)}%)\n"
+                result += f"     Market Cap: ₹{format_number(peer.market_cap)} Cr | P/E: {format_number(peer.pe_ratio)}\n"
+                result += "\n"
+        
+        # 📈 FINANCIAL HIGHLIGHTS
+        store, _ = fetch_financial_store(symbol)
+        # Prefer annual statements; fall back to interim periods when none are reported
+        period_type = "Annual" if store and store.annual_periods else "Interim"
+        periods = store.periods(period_type) if store else ()
+        
+        if periods:
+            result += "\n📈 FINANCIAL HIGHLIGHTS\n"
             result += "-" * 30 + "\n"
-            current_price = data.get('currentPrice', {})
-            if isinstance(current_price, dict):
-                bse_price = current_price.get('BSE', 'N/A')
-                nse_price = current_price.get('NSE', 'N/A')
-                result += f"BSE Price: ₹{bse_price}\n"
-                result += f"NSE Price: ₹{nse_price}\n"
-            
-            percent_change = data.get('percentChange', 'N/A')
-            year_high = data.get('yearHigh', 'N/A')
-            year_low = data.get('yearLow', 'N/A')
-            result += f"Today's Change: {percent_change}%\n"
-            result += f"52 Week High: ₹{year_high}\n"
-            result += f"52 Week Low: ₹{year_low}\n"
-            
-            # 📊 TECHNICAL ANALYSIS
-            stock_technical_data = data.get('stockTechnicalData', [])
-            if isinstance(stock_technical_data, list) and stock_technical_data:
-                result += "\n📊 TECHNICAL ANALYSIS (Moving Averages)\n"
-                result += "-" * 30 + "\n"
-                for tech_data in stock_technical_data:
-                    if isinstance(tech_data, dict):
-                        days = tech_data.get('days', 'N/A')
-                        nse_price = tech_data.get('nsePrice', 'N/A')
-                        result += f"  MA {days} Days: ₹{nse_price}\n"
-            
-            # 👥 KEY EXECUTIVES
-            if isinstance(company_profile, dict):
-                officers = company_profile.get('officers', {}).get('officer', [])
-                if isinstance(officers, list) and officers:
-                    result += "\n👥 KEY EXECUTIVES\n"
-                    result += "-" * 30 + "\n"
-                    for officer in officers[:5]:  # Top 5 executives
-                        if isinstance(officer, dict):
-                            first_name = officer.get('firstName', '')
-                            last_name = officer.get('lastName', '')
-                            title_info = officer.get('title', {})
-                            if isinstance(title_info, dict):
-                                title = title_info.get('Value', 'N/A')
-                            else:
-                                title = 'N/A'
-                            result += f"  • {first_name} {last_name} - {title}\n"
-            
-            # 🏭 PEER COMPARISON
-            if isinstance(company_profile, dict):
-                peer_companies = company_profile.get('peerCompanyList', [])
-                if isinstance(peer_companies, list) and peer_companies:
-                    result += "\n🏭 PEER COMPARISON\n"
-                    result += "-" * 30 + "\n"
-                    for i, peer in enumerate(peer_companies):
-                        if isinstance(peer, dict):
-                            name = peer.get('companyName', 'N/A')
-                            price = peer.get('price', 'N/A')
-                            change = peer.get('percentChange', 'N/A')
-                            market_cap = peer.get('marketCap', 'N/A')
-                            pe_ratio = peer.get('priceToEarningsValueRatio', 'N/A')
-                            result += f"  {i+1}. {name}\n"
-                            result += f"     Price: ₹{price} ({change}%)\n"
-                            result += f"     Market Cap: ₹{market_cap} Cr | P/E: {pe_ratio}\n"
-                            result += "\n"
             
-            # 📈 FINANCIAL HIGHLIGHTS
-            financials = data.get('financials', [])
-            if isinstance(financials, list) and financials:
-                result += "\n📈 FINANCIAL HIGHLIGHTS\n"
-                result += "-" * 30 + "\n"
+            for i, period in enumerate(periods[:3]):  # Last 3 years
+                result += f"\nFiscal Year {period}:\n"
                 
-                for i, financial_year in enumerate(financials[:3]):  # Last 3 years
-                    if isinstance(financial_year, dict):
-                        fiscal_year = financial_year.get('FiscalYear', 'N/A')
-                        result += f"\nFiscal Year {fiscal_year}:\n"
-                        
-                        # Income statement highlights
-                        inc_data = financial_year.get('stockFinancialMap', {}).get('INC', [])
-                        if isinstance(inc_data, list):
-                            for item in inc_data:
-                                if isinstance(item, dict):
-                                    key = item.get('key', '')
-                                    display_name = item.get('displayName', '')
-                                    value = item.get('value', '')
-                                    
-                                    # Key financial metrics
-                                    if key in ['TotalRevenue', 'NetIncome', 'DilutedNormalizedEPS', 'OperatingIncome']:
-                                        if value and value != 'N/A':
-                                            if key == 'DilutedNormalizedEPS':
-                                                result += f"  {display_name}: ₹{value}\n"
-                                            else:
-                                                result += f"  {display_name}: ₹{value} Cr\n"
-                        
-                        # Balance sheet highlights
-                        bal_data = financial_year.get('stockFinancialMap', {}).get('BAL', [])
-                        if isinstance(bal_data, list):
-                            for item in bal_data:
-                                if isinstance(item, dict):
-                                    key = item.get('key', '')
-                                    display_name = item.get('displayName', '')
-                                    value = item.get('value', '')
-                                    
-                                    if key in ['TotalAssets', 'TotalEquity', 'TotalDebt']:
-                                        if value and value != 'N/A':
-                                            result += f"  {display_name}: ₹{value} Cr\n"
-                        
-                        if i < 2:  # Add separator except for last year
-                            result += "  " + "-" * 25 + "\n"
+                for statement_type, keys in HIGHLIGHT_KEYS:
+                    for key in keys:
+                        value = store.value(key, period, statement_type)
+                        if value is None:
+                            continue
+                        unit = "" if key == 'DilutedNormalizedEPS' else " Cr"
+                        result += f"  {store.label(key, statement_type)}: ₹{format_number(value)}{unit}\n"
+                
+                if i < 2:  # Add separator except for last year
+                    result += "  " + "-" * 25 + "\n"
         
         result += "\n" + "=" * 60
         return result
@@ -214,8 +347,16 @@ def get_stock_details(symbol: str) -> str:
         return f"Error parsing stock data: {str(e)}"
 
 
+# Income statement and balance sheet lines shown in the financial highlights
+HIGHLIGHT_KEYS = (
+    ('INC', ('TotalRevenue', 'NetIncome', 'DilutedNormalizedEPS', 'OperatingIncome')),
+    ('BAL', ('TotalAssets', 'TotalEquity', 'TotalDebt')),
+)
+
+
 # 2. Industry Search
 @tool
+@memoize_per_run
 def get_industry_search(query: str) -> str:
     """
     Search for stocks by industry from Indian Stock API.
@@ -229,72 +370,68 @@ def get_industry_search(query: str) -> str:
     endpoint = "industry_search"
     params = {"query": query}
     
-    data = make_indian_stock_request(endpoint, params)
+    stocks, error = fetch_parsed(endpoint, params, parse_industry_search)
     
-    if "error" in data:
-        return f"Error fetching industry data for {query}: {data['error']}"
+    if error:
+        return f"Error fetching industry data for {query}: {error}"
     
-    if not data:
+    if not stocks:
         return f"No industry data found for {query}"
     
     try:
         result = f"🔍 INDUSTRY SEARCH RESULTS: '{query.upper()}'\n"
         result += "=" * 60 + "\n\n"
         
-        if isinstance(data, list):
-            # Group stocks by rating for better organization
-            bullish_stocks = []
-            neutral_stocks = []
-            bearish_stocks = []
-            na_stocks = []
-            
-            for stock in data:
-                if isinstance(stock, dict):
-                    trends = stock.get('activeStockTrends', {})
-                    if isinstance(trends, dict):
-                        overall_rating = trends.get('overallRating', 'N/A')
-                        if overall_rating and 'Bullish' in str(overall_rating):
-                            bullish_stocks.append(stock)
-                        elif overall_rating and 'Bearish' in str(overall_rating):
-                            bearish_stocks.append(stock)
-                        elif overall_rating and overall_rating not in ['N/A', None, 'NA']:
-                            neutral_stocks.append(stock)
-                        else:
-                            na_stocks.append(stock)
-            
-            # Display bullish stocks first
-            if bullish_stocks:
-                result += "🟢 BULLISH RECOMMENDATIONS\n"
-                result += "-" * 30 + "\n"
-                for i, stock in enumerate(bullish_stocks[:8]):  # Top 8 bullish
-                    result += _format_industry_stock(stock, i + 1)
-                result += "\n"
-            
-            # Display neutral stocks
-            if neutral_stocks:
-                result += "🟡 NEUTRAL RECOMMENDATIONS\n"
-                result += "-" * 30 + "\n"
-                for i, stock in enumerate(neutral_stocks[:5]):  # Top 5 neutral
-                    result += _format_industry_stock(stock, i + 1)
-                result += "\n"
-            
-            # Display bearish stocks
-            if bearish_stocks:
-                result += "🔴 BEARISH RECOMMENDATIONS\n"
-                result += "-" * 30 + "\n"
-                for i, stock in enumerate(bearish_stocks[:5]):  # Top 5 bearish
-                    result += _format_industry_stock(stock, i + 1)
-                result += "\n"
-            
-            # Summary statistics
-            total_stocks = len(data)
-            result += f"📊 SUMMARY STATISTICS\n"
+        # Group stocks by rating for better organization
+        bullish_stocks = []
+        neutral_stocks = []
+        bearish_stocks = []
+        na_stocks = []
+        
+        for stock in stocks:
+            overall_rating = stock.overall_rating
+            if 'Bullish' in overall_rating:
+                bullish_stocks.append(stock)
+            elif 'Bearish' in overall_rating:
+                bearish_stocks.append(stock)
+            elif overall_rating not in ['N/A', 'NA', '']:
+                neutral_stocks.append(stock)
+            else:
+                na_stocks.append(stock)
+        
+        # Display bullish stocks first
+        if bullish_stocks:
+            result += "🟢 BULLISH RECOMMENDATIONS\n"
+            result += "-" * 30 + "\n"
+            for i, stock in enumerate(bullish_stocks[:8]):  # Top 8 bullish
+                result += _format_industry_stock(stock, i + 1)
+            result += "\n"
+        
+        # Display neutral stocks
+        if neutral_stocks:
+            result += "🟡 NEUTRAL RECOMMENDATIONS\n"
+            result += "-" * 30 + "\n"
+            for i, stock in enumerate(neutral_stocks[:5]):  # Top 5 neutral
+                result += _format_industry_stock(stock, i + 1)
+            result += "\n"
+        
+        # Display bearish stocks
+        if bearish_stocks:
+            result += "🔴 BEARISH RECOMMENDATIONS\n"
             result += "-" * 30 + "\n"
-            result += f"Total Stocks Found: {total_stocks}\n"
-            result += f"Bullish Recommendations: {len(bullish_stocks)}\n"
-            result += f"Neutral Recommendations: {len(neutral_stocks)}\n"
-            result += f"Bearish Recommendations: {len(bearish_stocks)}\n"
-            result += f"No Rating Available: {len(na_stocks)}\n"
+            for i, stock in enumerate(bearish_stocks[:5]):  # Top 5 bearish
+                result += _format_industry_stock(stock, i + 1)
+            result += "\n"
+        
+        # Summary statistics
+        total_stocks = len(stocks)
+        result += f"📊 SUMMARY STATISTICS\n"
+        result += "-" * 30 + "\n"
+        result += f"Total Stocks Found: {total_stocks}\n"
+        result += f"Bullish Recommendations: {len(bullish_stocks)}\n"
+        result += f"Neutral Recommendations: {len(neutral_stocks)}\n"
+        result += f"Bearish Recommendations: {len(bearish_stocks)}\n"
+        result += f"No Rating Available: {len(na_stocks)}\n"
         
         result += "\n" + "=" * 60
         return result
@@ -303,24 +440,16 @@ def get_industry_search(query: str) -> str:
         return f"Error parsing industry data: {str(e)}"
 
 
-def _format_industry_stock(stock: dict, index: int) -> str:
+def _format_industry_stock(stock: IndustryStock, index: int) -> str:
     """Helper function to format individual stock information"""
-    if not isinstance(stock, dict):
-        return ""
-    
-    result = f"{index}. {stock.get('commonName', 'N/A')}\n"
-    result += f"   NSE: {stock.get('exchangeCodeNsi', 'N/A')} | BSE: {stock.get('exchangeCodeBse', 'N/A')}\n"
-    result += f"   Industry: {stock.get('mgIndustry', 'N/A')}\n"
-    result += f"   Sector: {stock.get('mgSector', 'N/A')}\n"
+    result = f"{index}. {stock.name}\n"
+    result += f"   NSE: {stock.nse_code} | BSE: {stock.bse_code}\n"
+    result += f"   Industry: {stock.industry}\n"
+    result += f"   Sector: {stock.sector}\n"
     
     # Trading trends
-    trends = stock.get('activeStockTrends', {})
-    if isinstance(trends, dict):
-        short_term = trends.get('shortTermTrends', 'N/A')
-        long_term = trends.get('longTermTrends', 'N/A')
-        overall = trends.get('overallRating', 'N/A')
-        result += f"   Trends: Short-term: {short_term} | Long-term: {long_term}\n"
-        result += f"   Overall Rating: {overall}\n"
+    result += f"   Trends: Short-term: {stock.short_term_trend} | Long-term: {stock.long_term_trend}\n"
+    result += f"   Overall Rating: {stock.overall_rating}\n"
     
     result += "   " + "-" * 40 + "\n"
     return result
@@ -328,6 +457,7 @@ def _format_industry_stock(stock: dict, index: int) -> str:
 
 # 3. Mutual Fund Search
 @tool
+@memoize_per_run
 def get_mutual_fund_search(query: str) -> str:
     """
     Search for mutual funds from Indian Stock API.
@@ -341,89 +471,74 @@ def get_mutual_fund_search(query: str) -> str:
     endpoint = "mutual_fund_search"
     params = {"query": query}
     
-    data = make_indian_stock_request(endpoint, params)
+    funds, error = fetch_parsed(endpoint, params, parse_mutual_funds)
     
-    if "error" in data:
-        return f"Error fetching mutual fund data for {query}: {data['error']}"
+    if error:
+        return f"Error fetching mutual fund data for {query}: {error}"
     
-    if not data:
+    if not funds:
         return f"No mutual fund data found for {query}"
     
     try:
         result = f"💰 MUTUAL FUND SEARCH RESULTS: '{query.upper()}'\n"
         result += "=" * 60 + "\n\n"
         
-        if isinstance(data, list):
-            # Group funds by category and plan type
-            direct_growth_funds = []
-            direct_dividend_funds = []
-            regular_growth_funds = []
-            regular_dividend_funds = []
-            other_funds = []
-            
-            for fund in data:
-                if isinstance(fund, dict):
-                    scheme_name = fund.get('schemeName', '').lower()
-                    
-                    if 'direct' in scheme_name and 'growth' in scheme_name:
-                        direct_growth_funds.append(fund)
-                    elif 'direct' in scheme_name and ('dividend' in scheme_name or 'payout' in scheme_name):
-                        direct_dividend_funds.append(fund)
-                    elif 'regular' in scheme_name and 'growth' in scheme_name:
-                        regular_growth_funds.append(fund)
-                    elif 'regular' in scheme_name and ('dividend' in scheme_name or 'payout' in scheme_name):
-                        regular_dividend_funds.append(fund)
-                    else:
-                        other_funds.append(fund)
-            
-            # Display Direct Growth Plans first (most popular)
-            if direct_growth_funds:
-                result += "🎯 DIRECT GROWTH PLANS (Recommended)\n"
-                result += "-" * 30 + "\n"
-                for i, fund in enumerate(direct_growth_funds[:10]):  # Top 10
-                    result += _format_mutual_fund(fund, i + 1)
-                result += "\n"
-            
-            # Display Regular Growth Plans
-            if regular_growth_funds:
-                result += "📈 REGULAR GROWTH PLANS\n"
-                result += "-" * 30 + "\n"
-                for i, fund in enumerate(regular_growth_funds[:8]):  # Top 8
-                    result += _format_mutual_fund(fund, i + 1)
-                result += "\n"
-            
-            # Display Direct Dividend Plans
-            if direct_dividend_funds:
-                result += "💵 DIRECT DIVIDEND PLANS\n"
-                result += "-" * 30 + "\n"
-                for i, fund in enumerate(direct_dividend_funds[:5]):  # Top 5
-                    result += _format_mutual_fund(fund, i + 1)
-                result += "\n"
-            
-            # Display Regular Dividend Plans
-            if regular_dividend_funds:
-                result += "🏦 REGULAR DIVIDEND PLANS\n"
-                result += "-" * 30 + "\n"
-                for i, fund in enumerate(regular_dividend_funds[:5]):  # Top 5
-                    result += _format_mutual_fund(fund, i + 1)
-                result += "\n"
-            
-            # Summary statistics
-            total_funds = len(data)
-            result += f"📊 SEARCH SUMMARY\n"
+        # Group funds by plan and option
+        direct_growth_funds = [f for f in funds if f.plan == 'direct' and f.option == 'growth']
+        direct_dividend_funds = [f for f in funds if f.plan == 'direct' and f.option == 'dividend']
+        regular_growth_funds = [f for f in funds if f.plan == 'regular' and f.option == 'growth']
+        regular_dividend_funds = [f for f in funds if f.plan == 'regular' and f.option == 'dividend']
+        other_count = (len(funds) - len(direct_growth_funds) - len(direct_dividend_funds)
+                       - len(regular_growth_funds) - len(regular_dividend_funds))
+        
+        # Display Direct Growth Plans first (most popular)
+        if direct_growth_funds:
+            result += "🎯 DIRECT GROWTH PLANS (Recommended)\n"
             result += "-" * 30 + "\n"
-            result += f"Total Funds Found: {total_funds}\n"
-            result += f"Direct Growth Plans: {len(direct_growth_funds)}\n"
-            result += f"Regular Growth Plans: {len(regular_growth_funds)}\n"
-            result += f"Direct Dividend Plans: {len(direct_dividend_funds)}\n"
-            result += f"Regular Dividend Plans: {len(regular_dividend_funds)}\n"
-            result += f"Other Plans: {len(other_funds)}\n"
-            
-            # Investment tip
-            result += f"\n💡 INVESTMENT TIP\n"
+            for i, fund in enumerate(direct_growth_funds[:10]):  # Top 10
+                result += _format_mutual_fund(fund, i + 1)
+            result += "\n"
+        
+        # Display Regular Growth Plans
+        if regular_growth_funds:
+            result += "📈 REGULAR GROWTH PLANS\n"
+            result += "-" * 30 + "\n"
+            for i, fund in enumerate(regular_growth_funds[:8]):  # Top 8
+                result += _format_mutual_fund(fund, i + 1)
+            result += "\n"
+        
+        # Display Direct Dividend Plans
+        if direct_dividend_funds:
+            result += "💵 DIRECT DIVIDEND PLANS\n"
+            result += "-" * 30 + "\n"
+            for i, fund in enumerate(direct_dividend_funds[:5]):  # Top 5
+                result += _format_mutual_fund(fund, i + 1)
+            result += "\n"
+        
+        # Display Regular Dividend Plans
+        if regular_dividend_funds:
+            result += "🏦 REGULAR DIVIDEND PLANS\n"
             result += "-" * 30 + "\n"
-            result += "Direct Growth plans typically offer better returns due to lower expense ratios.\n"
-            result += "Consider Direct plans if you don't need distributor services.\n"
+            for i, fund in enumerate(regular_dividend_funds[:5]):  # Top 5
+                result += _format_mutual_fund(fund, i + 1)
+            result += "\n"
+        
+        # Summary statistics
+        total_funds = len(funds)
+        result += f"📊 SEARCH SUMMARY\n"
+        result += "-" * 30 + "\n"
+        result += f"Total Funds Found: {total_funds}\n"
+        result += f"Direct Growth Plans: {len(direct_growth_funds)}\n"
+        result += f"Regular Growth Plans: {len(regular_growth_funds)}\n"
+        result += f"Direct Dividend Plans: {len(direct_dividend_funds)}\n"
+        result += f"Regular Dividend Plans: {len(regular_dividend_funds)}\n"
+        result += f"Other Plans: {other_count}\n"
+        
+        # Investment tip
+        result += f"\n💡 INVESTMENT TIP\n"
+        result += "-" * 30 + "\n"
+        result += "Direct Growth plans typically offer better returns due to lower expense ratios.\n"
+        result += "Consider Direct plans if you don't need distributor services.\n"
         
         result += "\n" + "=" * 60
         return result
@@ -432,12 +547,17 @@ def get_mutual_fund_search(query: str) -> str:
         return f"Error parsing mutual fund data: {str(e)}"
 
 
-def _format_mutual_fund(fund: dict, index: int) -> str:
+_PLAN_TYPES = {
+    ("direct", "growth"): "Direct Growth",
+    ("direct", "dividend"): "Direct Dividend",
+    ("regular", "growth"): "Regular Growth",
+    ("regular", "dividend"): "Regular Dividend",
+}
+
+
+def _format_mutual_fund(fund: MutualFundScheme, index: int) -> str:
     """Helper function to format individual mutual fund information"""
-    if not isinstance(fund, dict):
-        return ""
-    
-    scheme_name = fund.get('schemeName', 'N/A')
+    scheme_name = fund.scheme_name
     
     # Extract fund house name (usually the first few words)
     fund_house = ""
@@ -448,30 +568,20 @@ def _format_mutual_fund(fund: dict, index: int) -> str:
         elif len(words) == 1:
             fund_house = words[0]
     
-    # Determine plan type
-    plan_type = "Other"
-    if 'direct' in scheme_name.lower():
-        if 'growth' in scheme_name.lower():
-            plan_type = "Direct Growth"
-        elif any(word in scheme_name.lower() for word in ['dividend', 'payout']):
-            plan_type = "Direct Dividend"
-    elif 'regular' in scheme_name.lower():
-        if 'growth' in scheme_name.lower():
-            plan_type = "Regular Growth"
-        elif any(word in scheme_name.lower() for word in ['dividend', 'payout']):
-            plan_type = "Regular Dividend"
+    plan_type = _PLAN_TYPES.get((fund.plan, fund.option), "Other")
     
     result = f"{index}. {fund_house} - {plan_type}\n"
     result += f"   Full Name: {scheme_name[:80]}{'...' if len(scheme_name) > 80 else ''}\n"
-    result += f"   ISIN: {fund.get('isin', 'N/A')}\n"
-    result += f"   Scheme Type: {fund.get('schemeType', 'N/A')}\n"
-    result += f"   Category ID: {fund.get('categoryId', 'N/A')}\n"
+    result += f"   ISIN: {fund.isin}\n"
+    result += f"   Scheme Type: {fund.scheme_type}\n"
+    result += f"   Category ID: {fund.category_id}\n"
     result += "   " + "-" * 50 + "\n"
     return result
 
 
 # 4. Stock Target Price
 @tool
+@memoize_per_run
 def get_stock_target_price(stock_id: str) -> str:
     """
     Get stock target price from Indian Stock API.
@@ -516,36 +626,59 @@ def get_stock_target_price(stock_id: str) -> str:
 
 # 5. Trending Stocks
 @tool
-def get_trending_stocks() -> str:
+@memoize_per_run
+def get_trending_stocks(direction: str = "all", exchange: str = "", sort_by: str = "percent_change",
+                        min_change: float = 0.0, limit: int = 10) -> str:
     """
-    Get trending stocks from Indian Stock API.
+    Get today's trending stocks (top gainers and losers) from Indian Stock API.
+    
+    Args:
+        direction: "gainers", "losers" or "all"
+        exchange: Exchange filter such as "NSE" (empty for all)
+        sort_by: percent_change, volume, distance_from_high (closest to the 52-week high first) or price
+        min_change: Only include moves of at least this many percent either way
+        limit: Maximum number of stocks per list
     
     Returns:
-        List of trending stocks.
+        Ranked gainers and losers with price, change, volume and 52-week context.
     """
     endpoint = "trending"
     
-    data = make_indian_stock_request(endpoint)
+    table, error = fetch_parsed(endpoint, {}, build_trending_table)
     
-    if "error" in data:
-        return f"Error fetching trending stocks: {data['error']}"
+    if error:
+        return f"Error fetching trending stocks: {error}"
     
-    if not data:
+    if table is None or not len(table):
         return "No trending stocks data found"
     
     try:
-        result = "Trending Stocks:\n\n"
-        
-        if isinstance(data, list):
-            for i, stock in enumerate(data[:10]):  # Top 10
-                result += f"{i+1}. {stock.get('symbol', 'N/A')}\n"
-                result += f"   Company: {stock.get('company_name', 'N/A')}\n"
-                result += f"   Price: ₹{stock.get('price', 'N/A')}\n"
-                result += f"   Change: {stock.get('change', 'N/A')} ({stock.get('change_percent', 'N/A')}%)\n"
-                result += f"   Volume: {stock.get('volume', 'N/A')}\n"
-                result += f"   Trend: {stock.get('trend', 'N/A')}\n"
-                result += "-" * 40 + "\n"
+        wanted = direction.lower().rstrip("s")
+        sort_by = sort_by if sort_by in TRENDING_SORTS else "percent_change"
         
+        result = "🔥 TRENDING STOCKS\n"
+        result += "=" * 60 + "\n"
+        
+        for kind, title in (("gainer", "🟢 TOP GAINERS"), ("loser", "🔴 TOP LOSERS")):
+            if wanted in ("gainer", "loser") and wanted != kind:
+                continue
+            # Losers rank biggest fall first when sorting by change
+            ascending = kind == "loser" and sort_by == "percent_change"
+            rows = table.view(direction=kind, exchange=exchange or None, min_abs_change=min_change or None,
+                              sort_by=sort_by, ascending=ascending, limit=limit)
+            result += f"\n{title} (by {sort_by})\n"
+            result += "-" * 30 + "\n"
+            if not rows:
+                result += "  No stocks match the filters\n"
+            for i, stock in enumerate(rows):
+                result += f"{i+1}. {stock.company_name} ({stock.ric or stock.ticker_id}, {stock.exchange})\n"
+                result += f"   Price: ₹{format_number(stock.price)} | Change: {format_number(stock.net_change)} ({format_number(stock.percent_change)}%)\n"
+                result += f"   Day Range: ₹{format_number(stock.low)} - ₹{format_number(stock.high)} | Volume: {format_number(stock.volume)}\n"
+                result += f"   52W Range: ₹{format_number(stock.year_low)} - ₹{format_number(stock.year_high)} ({format_number(distance_from_high(stock))}% from high)\n"
+                result += f"   Rating: {stock.overall_rating} | Short-term: {stock.short_term_trend} | Long-term: {stock.long_term_trend}\n"
+                result += "   " + "-" * 40 + "\n"
+        
+        result += "\n" + "=" * 60
         return result
         
     except Exception as e:
@@ -554,38 +687,52 @@ def get_trending_stocks() -> str:
 
 # 6. 52 Week High Low Data
 @tool
-def get_52_week_high_low() -> str:
+@memoize_per_run
+def get_52_week_high_low(exchange: str = "", kind: str = "both", sort_by: str = "distance",
+                         limit: int = 5) -> str:
     """
-    Get 52-week high and low data from Indian Stock API.
+    Get stocks trading at 52-week highs and lows from Indian Stock API.
+    
+    Args:
+        exchange: "NSE" or "BSE" (empty for both)
+        kind: "high", "low" or "both"
+        sort_by: "distance" (furthest beyond the 52-week level first) or "price"
+        limit: Maximum number of stocks per list
     
     Returns:
-        Stocks at 52-week highs and lows.
+        Stocks at 52-week highs and lows per exchange with their breakout distance.
     """
     endpoint = "fetch_52_week_high_low_data"
     
-    data = make_indian_stock_request(endpoint)
+    table, error = fetch_parsed(endpoint, {}, build_high_low_table)
     
-    if "error" in data:
-        return f"Error fetching 52-week high/low data: {data['error']}"
+    if error:
+        return f"Error fetching 52-week high/low data: {error}"
     
-    if not data:
+    if table is None or not len(table):
         return "No 52-week high/low data found"
     
     try:
-        result = "52-Week High/Low Data:\n\n"
+        exchanges = [exchange.upper()] if exchange else list(table.exchanges)
+        kinds = [kind.lower()] if kind.lower() in ("high", "low") else ["high", "low"]
         
-        if isinstance(data, dict):
-            if 'high' in data:
-                result += "52-Week Highs:\n"
-                for i, stock in enumerate(data['high'][:5]):  # Top 5
-                    result += f"{i+1}. {stock.get('symbol', 'N/A')} - ₹{stock.get('price', 'N/A')}\n"
-                result += "\n"
-            
-            if 'low' in data:
-                result += "52-Week Lows:\n"
-                for i, stock in enumerate(data['low'][:5]):  # Top 5
-                    result += f"{i+1}. {stock.get('symbol', 'N/A')} - ₹{stock.get('price', 'N/A')}\n"
+        result = "📊 52-WEEK HIGH/LOW\n"
+        result += "=" * 60 + "\n"
+        
+        for code in exchanges:
+            for level_kind in kinds:
+                rows = table.view(level_kind, exchange=code, sort_by=sort_by, limit=limit)
+                title = "🚀 52-WEEK HIGHS" if level_kind == "high" else "📉 52-WEEK LOWS"
+                result += f"\n{title} - {code} ({table.count(code, level_kind)} stocks)\n"
+                result += "-" * 30 + "\n"
+                if not rows:
+                    result += "  None\n"
+                for i, stock in enumerate(rows):
+                    result += (f"{i+1}. {stock.company} ({stock.ticker}) - ₹{format_number(stock.price)} "
+                               f"vs 52W {level_kind} ₹{format_number(stock.level)} "
+                               f"({format_number(distance_from_level(stock))}%)\n")
         
+        result += "\n" + "=" * 60
         return result
         
     except Exception as e:
@@ -594,48 +741,381 @@ def get_52_week_high_low() -> str:
 
 # 7. Historical Data
 @tool
-def get_historical_data(symbol: str, period: str = "1Y") -> str:
+@memoize_per_run
+def get_historical_data(symbol: str, period: str = "1yr", filter: str = "price") -> str:
     """
-    Get historical data for a stock from Indian Stock API.
+    Get historical price data for a stock from Indian Stock API.
     
     Args:
         symbol: Stock symbol (e.g., RELIANCE, TCS)
-        period: Time period (e.g., 1Y, 6M, 3M, 1M)
+        period: Time window: 1w, 1m, 3m, 6m, 1yr, 3yr, 5yr, 10yr or max (1Y, 6M and
+            "3 months" are understood too)
+        filter: Data series: price (default), pe, sm, evebitda, ptb, mcs or default
     
     Returns:
-        Historical price data for the stock.
+        Performance summary for the window (return, range, averages) and recent data points.
     """
-    endpoint = "historical_data"
-    params = {"stock_name": symbol.upper(), "period": period}
+    try:
+        window = normalize_period(period)
+        data_filter = normalize_filter(filter)
+    except ValueError as e:
+        # Rejected locally; the API would answer 422 for these
+        return f"Invalid historical data request for {symbol.upper()}: {str(e)}"
     
-    data = make_indian_stock_request(endpoint, params)
+    series, error = history_store.window(symbol, window, data_filter)
     
-    if "error" in data:
-        return f"Error fetching historical data for {symbol}: {data['error']}"
+    if error:
+        return f"Error fetching historical data for {symbol}: {error}"
     
-    if not data:
-        return f"No historical data found for {symbol.upper()}"
+    if series is None or not len(series):
+        return f"No historical data found for {symbol.upper()} ({window})"
     
     try:
-        result = f"Historical Data for {symbol.upper()} ({period}):\n\n"
-        
-        if isinstance(data, list):
-            # Show last 10 data points
-            for i, point in enumerate(data[-10:]):
-                result += f"{i+1}. Date: {point.get('date', 'N/A')}\n"
-                result += f"   Open: ₹{point.get('open', 'N/A')}\n"
-                result += f"   High: ₹{point.get('high', 'N/A')}\n"
-                result += f"   Low: ₹{point.get('low', 'N/A')}\n"
-                result += f"   Close: ₹{point.get('close', 'N/A')}\n"
-                result += f"   Volume: {point.get('volume', 'N/A')}\n"
-                result += "-" * 30 + "\n"
+        result = f"📅 HISTORICAL DATA: {symbol.upper()} ({window}, {data_filter})\n"
+        result += "=" * 60 + "\n\n"
+        result += f"Period: {series.dates[0]} to {series.dates[-1]} ({len(series)} trading days)\n"
+        
+        prices = series.column("Price")
+        known = [(day, value) for day, value in zip(series.dates, prices) if value is not None]
+        if known:
+            first, last = known[0][1], known[-1][1]
+            high_day, high = max(known, key=lambda point: point[1])
+            low_day, low = min(known, key=lambda point: point[1])
+            result += "\n📈 PRICE PERFORMANCE\n"
+            result += "-" * 30 + "\n"
+            result += f"Start: ₹{format_number(first)} | End: ₹{format_number(last)}\n"
+            if first:
+                result += f"Return: {format_number((last / first - 1) * 100)}%\n"
+            result += f"High: ₹{format_number(high)} ({high_day}) | Low: ₹{format_number(low)} ({low_day})\n"
+        
+        averages = [(metric, series.column(metric)[-1]) for metric in series.metrics
+                    if metric.upper().startswith("DMA") and series.column(metric)[-1] is not None]
+        if averages:
+            result += "Moving Averages: " + " | ".join(f"{metric}: ₹{format_number(value)}" for metric, value in averages) + "\n"
+        
+        volumes = [value for value in series.column("Volume") if value is not None]
+        if volumes:
+            result += f"Average Volume: {format_number(round(sum(volumes) / len(volumes)))}\n"
         
+        # Non-price filters (pe, ptb, ...) carry their own metrics
+        other = [metric for metric in series.metrics
+                 if metric not in ("Price", "Volume") and not metric.upper().startswith("DMA")]
+        
+        result += "\n🕒 RECENT DATA POINTS\n"
+        result += "-" * 30 + "\n"
+        for index in range(max(0, len(series) - 10), len(series)):
+            values = [f"{metric}: {format_number(series.metrics[metric][index])}"
+                      for metric in ("Price", "Volume", *other) if metric in series.metrics]
+            result += f"  {series.dates[index]}  " + " | ".join(values) + "\n"
+        
+        result += "\n" + "=" * 60
         return result
         
     except Exception as e:
         return f"Error parsing historical data: {str(e)}"
 
 
+# 8. Financial Metrics
+@tool
+@memoize_per_run
+def get_financial_metrics(symbol: str, metrics: str = "TotalRevenue,NetIncome,OperatingMargin,NetMargin",
+                          years: int = 5) -> str:
+    """
+    Get multi-year financial metric series for a stock with growth and margin trends.
+    
+    Args:
+        symbol: Stock symbol (e.g., RELIANCE, TCS, INFY)
+        metrics: Comma-separated statement lines (e.g., TotalRevenue, NetIncome, TotalDebt,
+            CashfromOperatingActivities) or ratios (GrossMargin, OperatingMargin, NetMargin,
+            ReturnOnEquity, ReturnOnAssets, DebtToEquity)
+        years: Number of most recent fiscal years to include
+    
+    Returns:
+        Year-by-year values for each metric with year-over-year change and CAGR.
+    """
+    store, error = fetch_financial_store(symbol)
+    
+    if error:
+        return f"Error fetching financial data for {symbol}: {error}"
+    
+    if store is None or not store.annual_periods:
+        return f"No annual financial data found for {symbol.upper()}"
+    
+    try:
+        years = max(int(years), 2)
+        names = [name.strip() for name in metrics.split(",") if name.strip()]
+        
+        result = f"📑 FINANCIAL METRICS: {symbol.upper()}\n"
+        result += "=" * 60 + "\n"
+        
+        unknown = []
+        for name in names:
+            series = store.metric_series(name, limit=years)
+            if series is None:
+                unknown.append(name)
+                continue
+            
+            ratio = derived_metric(name)
+            is_ratio = ratio is not None
+            label = ratio if is_ratio else store.label(name)
+            unit = "%" if is_ratio and DERIVED_METRICS[ratio][2] == 100.0 else ""
+            
+            result += f"\n{label}\n"
+            result += "-" * 30 + "\n"
+            previous = None
+            for period, value in series:
+                line = f"  FY{period}: {format_number(value)}{unit}"
+                if not is_ratio and value is not None and previous:
+                    line += f" (YoY {format_number((value - previous) / abs(previous) * 100)}%)"
+                elif is_ratio and value is not None and previous is not None:
+                    line += f" ({'+' if value >= previous else ''}{format_number(value - previous)} pts)"
+                result += line + "\n"
+                previous = value
+            
+            if not is_ratio:
+                growth = store.growth(name, limit=years)
+                if growth is not None:
+                    result += f"  CAGR ({series[0][0]}-{series[-1][0]}): {format_number(growth)}%\n"
+        
+        if unknown:
+            result += f"\n⚠️ Unknown metrics: {', '.join(unknown)}\n"
+            result += f"Available ratios: {', '.join(DERIVED_METRICS)}\n"
+            result += f"Available lines: {', '.join(store.keys())}\n"
+        
+        result += "\n" + "=" * 60
+        return result
+        
+    except Exception as e:
+        return f"Error computing financial metrics: {str(e)}"
+
+
+# 9. Peer Comparison
+@tool
+@memoize_per_run
+def get_peer_comparison(symbols: str, sort_by: str = "market_cap") -> str:
+    """
+    Rank a stock against its industry peers on valuation, profitability and size.
+    
+    Args:
+        symbols: One stock symbol, or several comma-separated symbols to compare
+            (e.g., "TCS" or "TCS,INFY,HDFCBANK")
+        sort_by: Metric to rank by: market_cap, pe_ratio, pb_ratio, roe_ttm,
+            net_margin_ttm, dividend_yield or percent_change (aliases like "P/E" work)
+    
+    Returns:
+        Ranked peer table per industry with sector medians, plus each requested
+        stock's rank, percentile and z-score on every metric.
+    """
+    requested = [symbol.strip().upper() for symbol in symbols.split(",") if symbol.strip()]
+    if not requested:
+        return "Please provide at least one stock symbol"
+    
+    metric = resolve_metric(sort_by) or "market_cap"
+    
+    fetch = lambda symbol: fetch_parsed("stock", {"name": symbol}, parse_stock_details)
+    if len(requested) == 1:
+        results = [fetch(requested[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(4, len(requested))) as executor:
+            results = list(executor.map(fetch, requested))
+    
+    rows = []
+    targets = []  # (symbol, industry, company name)
+    errors = []
+    for symbol, (details, error) in zip(requested, results):
+        if details is None:
+            errors.append(f"{symbol}: {error or 'no data'}")
+            continue
+        industry = details.quote.industry
+        targets.append((symbol, industry, details.quote.company_name))
+        rows.extend((industry, peer) for peer in details.peers)
+    
+    if not rows:
+        message = f"No peer data found for {', '.join(requested)}"
+        return f"{message} ({'; '.join(errors)})" if errors else message
+    
+    try:
+        frame = PeerFrame(rows)
+        ranks = {name: frame.ranks(name) for name, _, _ in PEER_METRICS}
+        percentiles = {name: frame.percentiles(name) for name, _, _ in PEER_METRICS}
+        zscores = {name: frame.zscores(name) for name, _, _ in PEER_METRICS}
+        highlighted = {row for _, _, company in targets
+                       for row in [frame.find(company)] if row is not None}
+        
+        result = f"🏁 PEER COMPARISON: {', '.join(symbol for symbol, _, _ in targets)}\n"
+        result += "=" * 60 + "\n"
+        
+        header = "  #  " + f"{'Company':<26}" + "".join(f"{label:>10}" for _, label, _ in PEER_METRICS)
+        for group in frame.group_names:
+            result += f"\n🏭 {group} (ranked by {sort_by})\n"
+            result += "-" * 30 + "\n"
+            result += header + "\n"
+            for position, row in enumerate(frame.order(group, metric)):
+                marker = "*" if row in highlighted else " "
+                cells = "".join(f"{_format_peer_value(name, _nan_to_none(frame.columns[name][row])):>10}"
+                                for name, _, _ in PEER_METRICS)
+                result += f" {marker}{position + 1:>2}  {frame.names[row][:25]:<26}{cells}\n"
+            medians = frame.medians(group)
+            cells = "".join(f"{_format_peer_value(name, medians[name]):>10}" for name, _, _ in PEER_METRICS)
+            result += f"     {'Sector median':<26}{cells}\n"
+        
+        result += "\n📐 POSITION VS PEERS (rank/peers, percentile, z-score)\n"
+        result += "-" * 30 + "\n"
+        for symbol, industry, company in targets:
+            row = frame.find(company)
+            if row is None:
+                result += f"{symbol}: not present in its own peer list\n"
+                continue
+            result += f"{symbol} ({company}):\n"
+            for name, label, _ in PEER_METRICS:
+                if np.isnan(ranks[name][row]):
+                    continue
+                ranked = int(np.count_nonzero(~np.isnan(ranks[name][frame.rows(industry)])))
+                result += (f"  {label}: #{int(ranks[name][row])}/{ranked}, "
+                           f"P{format_number(round(percentiles[name][row]))}, "
+                           f"z {format_number(zscores[name][row])}\n")
+        
+        if errors:
+            result += f"\n⚠️ Skipped: {'; '.join(errors)}\n"
+        
+        result += ("\n* = requested stock. Ranks: 1 = best (lowest P/E and P/B, highest for the rest); "
+                   "P100 = ahead of every ranked peer. Negative P/E or P/B (losses) is not ranked.\n")
+        result += "=" * 60
+        return result
+        
+    except Exception as e:
+        return f"Error computing peer comparison: {str(e)}"
+
+
+
+def _nan_to_none(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def _format_peer_value(metric: str, value: Optional[float]) -> str:
+    # Market caps run to seven digits of crores; paise add nothing to a comparison
+    if metric == "market_cap" and value is not None:
+        value = float(round(value))
+    return format_number(value)
+
+
+# 10. Metric History (time travel)
+@tool
+@memoize_per_run
+def get_metric_history(symbol: str, metric: str = "target_mean", days: int = 90, as_of: str = "") -> str:
+    """
+    Look up how a stock's recorded metrics moved over time, or their value as of a past date.
+    
+    Values come from the local history of earlier API responses, so only dates on
+    which data was fetched (plus the API's own 1-week to 90-day snapshots of
+    targets and recommendations) are covered.
+    
+    Args:
+        symbol: Stock symbol (e.g., RELIANCE, TCS)
+        metric: target_mean, target_high, target_low, target_median, target_estimates,
+            reco_mean, reco_count, price, percent_change, analyst_rating_mean,
+            analyst_count or holding_<group> (e.g., holding_promoter, holding_fii)
+        days: Length of the range to show, ending at as_of
+        as_of: End date (YYYY-MM-DD); defaults to today
+    
+    Returns:
+        The metric's value as of the end date and its recorded points over the range.
+    """
+    try:
+        end = date.fromisoformat(as_of) if as_of else datetime.now(IST).date()
+    except ValueError:
+        return f"Invalid as_of date '{as_of}'. Use YYYY-MM-DD"
+    
+    try:
+        symbol = symbol.upper()
+        metric = metric.strip().lower()
+        start = end - timedelta(days=max(int(days), 1))
+        latest = timeline_store.as_of(symbol, metric, end.isoformat())
+        
+        if latest is None:
+            available = timeline_store.metrics(symbol)
+            if not available:
+                return f"No recorded history for {symbol} yet; fetch its details or target price first"
+            return f"No recorded {metric} for {symbol} on or before {end}. Available metrics: {', '.join(available)}"
+        
+        points = timeline_store.series(symbol, metric, start.isoformat(), end.isoformat())
+        
+        result = f"🕰️ METRIC HISTORY: {symbol} {metric}\n"
+        result += "=" * 60 + "\n\n"
+        result += f"As of {end}: {format_number(latest[1])} (recorded for {latest[0]})\n"
+        
+        result += f"\n📈 {start} TO {end}\n"
+        result += "-" * 30 + "\n"
+        if not points:
+            result += "No points recorded in this range\n"
+        for day, value, source in points:
+            note = " (API snapshot)" if source == "snapshot" else ""
+            result += f"  {day}: {format_number(value)}{note}\n"
+        
+        known = [value for _, value, _ in points if value is not None]
+        if len(known) >= 2 and known[0]:
+            result += f"\nChange over range: {format_number(known[-1] - known[0])} ({format_number((known[-1] / known[0] - 1) * 100)}%)\n"
+        
+        result += "\n" + "=" * 60
+        return result
+        
+    except Exception as e:
+        return f"Error reading metric history: {str(e)}"
+
+
+# 11. Market List Changes (time travel)
+@tool
+@memoize_per_run
+def get_market_list_changes(list_name: str = "52w_high:NSE", days: int = 7, as_of: str = "") -> str:
+    """
+    Find stocks that newly entered a market list (trending gainers/losers or 52-week highs/lows).
+    
+    Args:
+        list_name: gainers, losers, 52w_high:NSE, 52w_low:NSE, 52w_high:BSE or 52w_low:BSE
+        days: Look-back window ending at as_of
+        as_of: End date (YYYY-MM-DD); defaults to today
+    
+    Returns:
+        Stocks that joined the list in the window with the day they first appeared,
+        plus the list's members as of the end date.
+    """
+    if list_name not in MARKET_LISTS:
+        return f"Unknown list '{list_name}'. Use one of: {', '.join(MARKET_LISTS)}"
+    
+    try:
+        end = date.fromisoformat(as_of) if as_of else datetime.now(IST).date()
+    except ValueError:
+        return f"Invalid as_of date '{as_of}'. Use YYYY-MM-DD"
+    
+    try:
+        start = end - timedelta(days=max(int(days), 1))
+        entered = timeline_store.entered(list_name, start.isoformat(), end.isoformat())
+        members = timeline_store.members(list_name, end.isoformat())
+        
+        if not entered and not members:
+            return f"No recorded history for {list_name} on or before {end}"
+        
+        result = f"🕰️ LIST CHANGES: {list_name} ({start} to {end})\n"
+        result += "=" * 60 + "\n"
+        
+        result += f"\n🆕 NEW ENTRANTS ({len(entered)})\n"
+        result += "-" * 30 + "\n"
+        for day, symbol, name, value in entered:
+            result += f"  {day}  {name or symbol} ({symbol}): {format_number(value)}\n"
+        
+        result += f"\n📋 MEMBERS AS OF {end} ({len(members)})\n"
+        result += "-" * 30 + "\n"
+        for symbol, name, value in members:
+            result += f"  {name or symbol} ({symbol}): {format_number(value)}\n"
+        
+        result += "\nValues: % change for gainers/losers, price for 52-week lists.\n"
+        result += "=" * 60
+        return result
+        
+    except Exception as e:
+        return f"Error reading market list history: {str(e)}"
+
+
 # Helper function to get all Indian Stock API tools
 def get_all_indian_stock_tools():
     """
@@ -651,7 +1131,11 @@ def get_all_indian_stock_tools():
         get_stock_target_price,
         get_trending_stocks,
         get_52_week_high_low,
-        get_historical_data
+        get_historical_data,
+        get_financial_metrics,
+        get_peer_comparison,
+        get_metric_history,
+        get_market_list_changes
     ]
 
 
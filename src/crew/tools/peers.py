@@ -0,0 +1,179 @@
+"""
+Peer analytics: peer lists loaded into column arrays so ranks, percentiles,
+z-scores and sector medians are computed with vectorized math.
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.crew.tools.models import Peer
+
+
+# (Peer attribute, column label, higher is better) in display order
+PEER_METRICS: Tuple[Tuple[str, str, bool], ...] = (
+    ("market_cap", "MCap Cr", True),
+    ("pe_ratio", "P/E", False),
+    ("pb_ratio", "P/B", False),
+    ("roe_ttm", "ROE%", True),
+    ("net_margin_ttm", "NPM%", True),
+    ("dividend_yield", "Yield%", True),
+    ("percent_change", "Chg%", True),
+)
+
+_METRIC_NAMES = {name for name, _, _ in PEER_METRICS}
+
+# Valuation ratios only comparable when positive: a loss-maker's negative P/E
+# is not "cheap", so it is left out of ranks, percentiles, z-scores and medians
+POSITIVE_ONLY_METRICS = {"pe_ratio", "pb_ratio"}
+
+_ALIASES = {
+    "mcap": "market_cap", "marketcap": "market_cap",
+    "pe": "pe_ratio", "p/e": "pe_ratio",
+    "pb": "pb_ratio", "p/b": "pb_ratio",
+    "roe": "roe_ttm",
+    "margin": "net_margin_ttm", "npm": "net_margin_ttm",
+    "yield": "dividend_yield", "dividend": "dividend_yield",
+    "change": "percent_change",
+}
+
+
+def resolve_metric(name: str) -> Optional[str]:
+    """Map a user-facing metric name ("P/E", "roe", "market_cap") to a Peer attribute"""
+    key = name.strip().lower().replace(" ", "_")
+    if key in _METRIC_NAMES:
+        return key
+    return _ALIASES.get(key.replace("_", ""))
+
+
+def _company_key(name: str) -> str:
+    words = re.sub(r"[^a-z0-9 ]", " ", name.lower()).split()
+    while words and words[-1] in ("ltd", "limited"):
+        words.pop()
+    return " ".join(words)
+
+
+def _rank(values: np.ndarray, higher_is_better: bool) -> np.ndarray:
+    """1-based rank per value (1 = best); NaN stays NaN"""
+    valid = ~np.isnan(values)
+    ranks = np.full(values.shape, np.nan)
+    if not valid.any():
+        return ranks
+    keyed = -values[valid] if higher_is_better else values[valid]
+    order = np.argsort(keyed, kind="stable")
+    valid_ranks = np.empty(order.size)
+    valid_ranks[order] = np.arange(1, order.size + 1)
+    ranks[valid] = valid_ranks
+    return ranks
+
+
+def _percentile(ranks: np.ndarray) -> np.ndarray:
+    """Share of ranked peers ranked below, 0-100 (100 = best); derived from _rank so the two agree"""
+    valid = ~np.isnan(ranks)
+    result = np.full(ranks.shape, np.nan)
+    count = int(valid.sum())
+    if count == 0:
+        return result
+    result[valid] = (count - ranks[valid]) / (count - 1) * 100 if count > 1 else 100.0
+    return result
+
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(values)
+    result = np.full(values.shape, np.nan)
+    if valid.sum() < 2:
+        return result
+    std = np.nanstd(values)
+    result[valid] = 0.0 if std == 0 else (values[valid] - np.nanmean(values)) / std
+    return result
+
+
+class PeerFrame:
+    """
+    Peer metrics as float columns (one row per company), grouped by sector.
+
+    Ranks, percentiles and z-scores are computed within each row's group, so
+    peers from different industries are never compared against each other.
+    Non-positive values of POSITIVE_ONLY_METRICS count as missing for them.
+    """
+
+    def __init__(self, rows: Sequence[Tuple[str, Peer]]):
+        # rows: (group, peer); duplicates by ticker id within a group are dropped
+        seen = set()
+        unique = []
+        for group, peer in rows:
+            identity = (group, peer.ticker_id or peer.company_name)
+            if identity not in seen:
+                seen.add(identity)
+                unique.append((group, peer))
+
+        self.groups = np.array([group for group, _ in unique], dtype=object)
+        self.peers: List[Peer] = [peer for _, peer in unique]
+        self.names: List[str] = [peer.company_name for peer in self.peers]
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.array([np.nan if getattr(peer, name) is None else getattr(peer, name)
+                            for peer in self.peers], dtype=float)
+            for name, _, _ in PEER_METRICS
+        }
+        self._group_index = {group: np.flatnonzero(self.groups == group)
+                             for group in dict.fromkeys(self.groups.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.peers)
+
+    @property
+    def group_names(self) -> List[str]:
+        return list(self._group_index)
+
+    def rows(self, group: str) -> np.ndarray:
+        """Row indices of a group"""
+        return self._group_index.get(group, np.array([], dtype=int))
+
+    def comparable(self, metric: str) -> np.ndarray:
+        """A metric's column with values that cannot be compared (see POSITIVE_ONLY_METRICS) as NaN"""
+        column = self.columns[metric]
+        if metric in POSITIVE_ONLY_METRICS:
+            return np.where(column > 0, column, np.nan)
+        return column
+
+    def _per_group(self, column: np.ndarray, compute) -> np.ndarray:
+        result = np.full(column.shape, np.nan)
+        for index in self._group_index.values():
+            result[index] = compute(column[index])
+        return result
+
+    def ranks(self, metric: str) -> np.ndarray:
+        higher_is_better = next(better for name, _, better in PEER_METRICS if name == metric)
+        return self._per_group(self.comparable(metric), lambda values: _rank(values, higher_is_better))
+
+    def percentiles(self, metric: str) -> np.ndarray:
+        return self._per_group(self.ranks(metric), _percentile)
+
+    def zscores(self, metric: str) -> np.ndarray:
+        return self._per_group(self.comparable(metric), _zscore)
+
+    def medians(self, group: str) -> Dict[str, Optional[float]]:
+        """Median of every metric across a group's comparable values"""
+        index = self.rows(group)
+        medians = {}
+        for name, _, _ in PEER_METRICS:
+            values = self.comparable(name)[index]
+            values = values[~np.isnan(values)]
+            medians[name] = float(np.median(values)) if values.size else None
+        return medians
+
+    def find(self, company_name: str) -> Optional[int]:
+        """Row index of a company by name, ignoring case and a trailing "Ltd"/"Limited" """
+        wanted = _company_key(company_name)
+        for row, name in enumerate(self.names):
+            if _company_key(name) == wanted:
+                return row
+        return None
+
+    def order(self, group: str, metric: str) -> List[int]:
+        """Row indices of a group ordered best-first by metric, missing values last"""
+        index = self.rows(group)
+        ranks = self.ranks(metric)[index]
+        keyed = np.where(np.isnan(ranks), np.inf, ranks)
+        return index[np.argsort(keyed, kind="stable")].tolist()
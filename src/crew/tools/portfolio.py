@@ -0,0 +1,283 @@
+"""
+Portfolio analytics: positions valued from the shared stock cache and risk
+metrics computed from aligned daily return matrices.
+
+All symbols are fetched concurrently through the cached client, so a
+portfolio of thirty stocks costs at most thirty /stock and thirty history
+fetches, and none when they are warm.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.crew.tools.history import PriceSeries
+from src.crew.tools.models import StockDetails, parse_stock_details
+from src.crew.tools.nse_tools import fetch_parsed, history_store
+
+
+TRADING_DAYS = 252
+# Fewer aligned returns than this make correlations noise
+MIN_RETURNS = 20
+# History window the risk metrics are computed over
+RISK_WINDOW = "1yr"
+
+
+@dataclass(slots=True)
+class Holding:
+    symbol: str
+    quantity: float
+    avg_cost: Optional[float] = None
+    sector: Optional[str] = None  # /stock has no sector field; callers may supply one
+
+
+@dataclass(slots=True)
+class Position:
+    symbol: str
+    company_name: str
+    industry: str
+    sector: str
+    quantity: float
+    price: float
+    percent_change: Optional[float]
+    value: float
+    day_pnl: Optional[float]
+    avg_cost: Optional[float]
+    unrealized_pnl: Optional[float]
+    weight: float = 0.0
+
+
+def make_position(holding: Holding, details: StockDetails) -> Optional[Position]:
+    """Value one holding at its NSE price (BSE when NSE is missing); None without a price"""
+    quote = details.quote
+    price = quote.nse_price if quote.nse_price is not None else quote.bse_price
+    if price is None:
+        return None
+    value = holding.quantity * price
+    day_pnl = None
+    if quote.percent_change is not None and quote.percent_change > -100:
+        # percentChange is relative to the previous close
+        day_pnl = value - value / (1 + quote.percent_change / 100)
+    unrealized = holding.quantity * (price - holding.avg_cost) if holding.avg_cost is not None else None
+    return Position(
+        symbol=holding.symbol,
+        company_name=quote.company_name,
+        industry=quote.industry,
+        sector=holding.sector or quote.industry,
+        quantity=holding.quantity,
+        price=price,
+        percent_change=quote.percent_change,
+        value=value,
+        day_pnl=day_pnl,
+        avg_cost=holding.avg_cost,
+        unrealized_pnl=unrealized,
+    )
+
+
+def exposure(positions: Sequence[Position], group: Callable[[Position], str]) -> List[Dict[str, Any]]:
+    """Value and weight per group, largest first"""
+    totals: Dict[str, float] = {}
+    for position in positions:
+        totals[group(position)] = totals.get(group(position), 0.0) + position.value
+    grand = sum(totals.values()) or 1.0
+    return [{"name": name, "value": round(value, 2), "weight": round(value / grand * 100, 2)}
+            for name, value in sorted(totals.items(), key=lambda item: item[1], reverse=True)]
+
+
+def concentration(weights: np.ndarray) -> Dict[str, Any]:
+    """Herfindahl index, effective number of holdings and top weights (weights sum to 1)"""
+    if not weights.size:
+        return {}
+    ordered = np.sort(weights)[::-1]
+    hhi = float(np.sum(weights ** 2))
+    return {
+        "hhi": round(hhi, 4),
+        "effective_holdings": round(1 / hhi, 2) if hhi else None,
+        "top_weight": round(float(ordered[0]) * 100, 2),
+        "top5_weight": round(float(ordered[:5].sum()) * 100, 2),
+    }
+
+
+def return_matrix(series: Sequence[PriceSeries], metric: str = "Price") -> Tuple[List[str], np.ndarray]:
+    """
+    Daily simple returns on the dates every series shares.
+
+    Returns:
+        Tuple of (return dates, T x N array), one column per series.
+    """
+    if not series:
+        return [], np.empty((0, 0))
+    prices = [{day: value for day, value in zip(item.dates, item.column(metric)) if value} for item in series]
+    common = sorted(set.intersection(*(set(points) for points in prices)))
+    if len(common) < 2:
+        return [], np.empty((0, len(series)))
+    matrix = np.array([[points[day] for points in prices] for day in common], dtype=float)
+    return common[1:], matrix[1:] / matrix[:-1] - 1
+
+
+def risk_metrics(returns: np.ndarray, weights: np.ndarray, symbols: Sequence[str],
+                 top_pairs: int = 3) -> Dict[str, Any]:
+    """
+    Annualized volatility, correlation structure and diversification of a portfolio.
+
+    Args:
+        returns: T x N daily returns
+        weights: N portfolio weights summing to 1
+        symbols: Column names
+        top_pairs: Number of most-correlated pairs to report
+    """
+    observations, count = returns.shape
+    if observations < MIN_RETURNS or count == 0:
+        return {"observations": int(observations)}
+
+    covariance = np.atleast_2d(np.cov(returns, rowvar=False)) * TRADING_DAYS
+    volatilities = np.sqrt(np.diag(covariance))
+    portfolio_vol = float(np.sqrt(weights @ covariance @ weights))
+    metrics: Dict[str, Any] = {
+        "observations": int(observations),
+        "portfolio_volatility": round(portfolio_vol * 100, 2),
+        "volatility": {symbol: round(float(vol) * 100, 2) for symbol, vol in zip(symbols, volatilities)},
+    }
+    if count < 2:
+        return metrics
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlation = covariance / np.outer(volatilities, volatilities)
+    upper = np.triu_indices(count, k=1)
+    pairs = correlation[upper]
+    valid = ~np.isnan(pairs)
+    order = np.argsort(pairs[valid])[::-1][:top_pairs]
+    rows, cols = upper[0][valid][order], upper[1][valid][order]
+    metrics.update({
+        "average_correlation": round(float(np.mean(pairs[valid])), 3) if valid.any() else None,
+        "diversification_ratio": round(float(weights @ volatilities) / portfolio_vol, 3) if portfolio_vol else None,
+        "most_correlated": [{"pair": [symbols[i], symbols[j]], "correlation": round(float(correlation[i, j]), 3)}
+                            for i, j in zip(rows, cols)],
+        "correlation_matrix": {"symbols": list(symbols),
+                               "values": np.round(np.nan_to_num(correlation), 3).tolist()},
+    })
+    return metrics
+
+
+def fetch_details(symbol: str) -> Tuple[Optional[StockDetails], Optional[str]]:
+    return fetch_parsed("stock", {"name": symbol}, parse_stock_details)
+
+
+def fetch_history(symbol: str) -> Tuple[Optional[PriceSeries], Optional[str]]:
+    return history_store.window(symbol, RISK_WINDOW)
+
+
+def analyze_portfolio(holdings: Sequence[Holding],
+                      fetch_details: Callable[[str], Tuple[Optional[StockDetails], Optional[str]]] = fetch_details,
+                      fetch_history: Callable[[str], Tuple[Optional[PriceSeries], Optional[str]]] = fetch_history,
+                      max_workers: int = 8) -> Dict[str, Any]:
+    """
+    Value a portfolio and compute its exposure, concentration and correlation metrics.
+
+    Args:
+        holdings: Positions to analyze; repeated symbols are merged
+        fetch_details: symbol -> (StockDetails or None, error or None); cached /stock by default
+        fetch_history: symbol -> (PriceSeries or None, error or None); cached 1yr prices by default
+        max_workers: Concurrent fetches
+
+    Returns:
+        JSON-ready report with "positions", "totals", "exposure", "concentration",
+        "risk" and per-symbol "errors".
+    """
+    merged: Dict[str, Holding] = {}
+    for holding in holdings:
+        symbol = holding.symbol.strip().upper()
+        existing = merged.get(symbol)
+        if existing is None:
+            merged[symbol] = Holding(symbol, holding.quantity, holding.avg_cost, holding.sector)
+            continue
+        # Quantity-weighted average cost when both lots carry one
+        if existing.avg_cost is not None and holding.avg_cost is not None:
+            total = existing.quantity + holding.quantity
+            existing.avg_cost = ((existing.avg_cost * existing.quantity + holding.avg_cost * holding.quantity)
+                                 / total if total else None)
+        else:
+            existing.avg_cost = None
+        existing.quantity += holding.quantity
+        existing.sector = existing.sector or holding.sector
+
+    symbols = list(merged)
+    workers = max(1, min(max_workers, len(symbols) * 2))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        detail_futures = {symbol: executor.submit(fetch_details, symbol) for symbol in symbols}
+        history_futures = {symbol: executor.submit(fetch_history, symbol) for symbol in symbols}
+        details = {symbol: future.result() for symbol, future in detail_futures.items()}
+        histories = {symbol: future.result() for symbol, future in history_futures.items()}
+
+    errors: Dict[str, str] = {}
+    positions: List[Position] = []
+    for symbol in symbols:
+        result, error = details[symbol]
+        position = make_position(merged[symbol], result) if result is not None else None
+        if position is None:
+            errors[symbol] = error or "no price available"
+            continue
+        positions.append(position)
+
+    total_value = sum(position.value for position in positions)
+    weights = np.array([position.value for position in positions], dtype=float)
+    if total_value:
+        weights /= total_value
+    for position, weight in zip(positions, weights):
+        position.weight = float(weight)
+
+    day_pnls = [position.day_pnl for position in positions if position.day_pnl is not None]
+    day_pnl = sum(day_pnls)
+    unrealized = [position.unrealized_pnl for position in positions if position.unrealized_pnl is not None]
+    totals = {
+        "value": round(total_value, 2),
+        "day_pnl": round(day_pnl, 2),
+        "day_pnl_percent": round(day_pnl / (total_value - day_pnl) * 100, 2) if total_value - day_pnl else None,
+        "unrealized_pnl": round(sum(unrealized), 2) if unrealized else None,
+        "holdings": len(positions),
+    }
+
+    # Risk uses the positions that have a price history; weights are renormalized over them
+    with_history = [(index, histories[position.symbol][0]) for index, position in enumerate(positions)
+                    if histories[position.symbol][0] is not None]
+    risk: Dict[str, Any] = {}
+    if with_history:
+        indexes = [index for index, _ in with_history]
+        _, returns = return_matrix([series for _, series in with_history])
+        risk_weights = weights[indexes] / weights[indexes].sum() if weights[indexes].sum() else weights[indexes]
+        risk = risk_metrics(returns, risk_weights, [positions[index].symbol for index in indexes])
+    missing_history = [position.symbol for position in positions if histories[position.symbol][0] is None]
+    if missing_history:
+        risk["excluded"] = missing_history
+
+    sector_exposure = exposure(positions, lambda position: position.sector)
+    sector_concentration = concentration(np.array([group["weight"] / 100 for group in sector_exposure]))
+
+    return {
+        "positions": [
+            {
+                "symbol": position.symbol,
+                "company_name": position.company_name,
+                "industry": position.industry,
+                "sector": position.sector,
+                "quantity": position.quantity,
+                "price": position.price,
+                "percent_change": position.percent_change,
+                "value": round(position.value, 2),
+                "weight": round(position.weight * 100, 2),
+                "day_pnl": round(position.day_pnl, 2) if position.day_pnl is not None else None,
+                "unrealized_pnl": round(position.unrealized_pnl, 2) if position.unrealized_pnl is not None else None,
+            }
+            for position in sorted(positions, key=lambda item: item.value, reverse=True)
+        ],
+        "totals": totals,
+        "exposure": {
+            "sector": sector_exposure,
+            "industry": exposure(positions, lambda position: position.industry),
+        },
+        "concentration": dict(concentration(weights), sector_hhi=sector_concentration.get("hhi")),
+        "risk": risk,
+        "errors": errors,
+    }
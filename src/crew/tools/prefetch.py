@@ -0,0 +1,122 @@
+"""
+Question intake: guess which payloads a question needs and warm the cache
+while the agents are still thinking
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.crew.tools.cache import make_cache_key
+from src.crew.tools.history import DEFAULT_FILTER
+from src.crew.tools.nse_tools import history_store, make_indian_stock_request
+from src.crew.tools.symbols import find_known_symbols
+
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() not in ("0", "false", "no")
+
+# Keyword heuristics per intent; "quote" is always assumed for a named stock
+INTENT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "target": ("target", "analyst", "recommend", "upside", "rating", "buy", "sell"),
+    "history": ("history", "historical", "performance", "trend", "chart", "return",
+                "year", "month", "week", "1y", "6m"),
+    "overview": ("about", "analysis", "analyse", "analyze", "overview", "outlook", "should i"),
+}
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+
+
+def detect_intents(question: str) -> Set[str]:
+    """
+    Detect what kind of data a question asks for using keyword matching.
+
+    Args:
+        question: Free-text user question
+
+    Returns:
+        Set of intents out of "quote", "target", "history" and "overview".
+    """
+    text = question.lower()
+    intents = {"quote"}
+    for intent, keywords in INTENT_KEYWORDS.items():
+        if any(re.search(rf"\b{re.escape(keyword)}\b", text) for keyword in keywords):
+            intents.add(intent)
+    return intents
+
+
+def plan_prefetch(question: str) -> List[Tuple[str, Dict]]:
+    """
+    Build the (endpoint, params) requests the tools will most likely make.
+
+    Params must match what the tools send, otherwise the warmed entry is never hit.
+    """
+    intents = detect_intents(question)
+    plan = []
+    for symbol in find_known_symbols(question):
+        plan.append(("stock", {"name": symbol}))
+        if intents & {"target", "overview"}:
+            plan.append(("stock_target_price", {"stock_id": symbol}))
+        if "history" in intents:
+            plan.append(("historical_data", {"stock_name": symbol, "filter": DEFAULT_FILTER}))
+    return plan
+
+
+def plan_batch(questions: Iterable[str]) -> List[Tuple[str, Dict]]:
+    """Union of several questions' prefetch plans, each request listed once"""
+    seen = set()
+    plan = []
+    for question in questions:
+        for endpoint, params in plan_prefetch(question):
+            key = make_cache_key(endpoint, params)
+            if key not in seen:
+                seen.add(key)
+                plan.append((endpoint, params))
+    return plan
+
+
+def _submit(endpoint: str, params: Dict):
+    if endpoint == "historical_data":
+        # Every window is sliced from one per-symbol series, so warm that instead
+        return _executor.submit(history_store.sync, params["stock_name"], params["filter"])
+    return _executor.submit(make_indian_stock_request, endpoint, params, prefetched=True)
+
+
+def prefetch_batch(questions: Iterable[str], timeout: Optional[float] = None) -> List[Tuple[str, Dict]]:
+    """
+    Fetch the data a batch of questions needs, once, and wait for it.
+
+    Questions about the same stock share a single request per payload, so the
+    crews that follow start from a warm cache instead of racing each other.
+
+    Args:
+        questions: Free-text user questions
+        timeout: Seconds to wait for the fetches (None waits for all)
+
+    Returns:
+        The deduplicated (endpoint, params) requests.
+    """
+    if not PREFETCH_ENABLED:
+        return []
+    plan = plan_batch(questions)
+    wait([_submit(endpoint, params) for endpoint, params in plan], timeout=timeout)
+    return plan
+
+
+def prefetch_for_question(question: str) -> List[Tuple[str, Dict]]:
+    """
+    Warm the shared response cache in the background for a question.
+
+    Returns immediately; tool calls for the same payloads wait on the
+    in-flight fetch instead of issuing their own request.
+
+    Returns:
+        The planned (endpoint, params) requests.
+    """
+    if not PREFETCH_ENABLED:
+        return []
+    plan = plan_prefetch(question)
+    for endpoint, params in plan:
+        _submit(endpoint, params)
+    return plan
+
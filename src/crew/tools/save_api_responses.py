@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 """
 Script to save raw API responses from Indian Stock API to JSON files
+
+Refreshes the readable fixtures in api_responses/. For bulk or nightly
+collection use collector.py, which is concurrent, rate limited and resumable.
 """
 
 import http.client
@@ -140,16 +143,17 @@ def collect_all_api_responses():
     print("📉 COLLECTING HISTORICAL DATA")
     print("="*50)
     
+    # Periods the API accepts (see history.API_PERIODS); "filter" is required
     historical_tests = [
-        ("RELIANCE", "1Y"),
-        ("TCS", "6M"),
-        ("INFY", "3M"),
-        ("HDFC", "1M")
+        ("RELIANCE", "1yr"),
+        ("TCS", "6m"),
+        ("INFY", "max"),
+        ("HDFC", "1m")
     ]
     
     for symbol, period in historical_tests:
         print(f"\n🔍 Getting historical data for: {symbol} ({period})")
-        params = {"stock_name": symbol, "period": period}
+        params = {"stock_name": symbol, "period": period, "filter": "price"}
         data = make_indian_stock_request("historical_data", params)
         save_api_response("historical_data", data, {"symbol": symbol, "period": period})
         time.sleep(1)
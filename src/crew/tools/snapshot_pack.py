@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Compact binary snapshot packs for recorded API payloads.
+
+A pack is a single file of individually compressed records followed by an
+offset index, so a reader memory-maps it and decompresses only the records it
+looks up by (endpoint, params, date). Historical series can additionally be
+stored as columnar sections (one compressed float64 array per metric) that
+load straight into numpy without parsing JSON.
+
+Layout:
+    header   MAGIC, version, codec, index offset, index length
+    records  compressed canonical JSON payloads and column arrays
+    index    compressed JSON list of record entries (key, date, offsets)
+
+Records are zstd-compressed when the zstandard package is installed and
+zlib-compressed otherwise; the codec is recorded in the header.
+
+Usage:
+    python -m src.crew.tools.snapshot_pack build --snapshots snapshots/ --out universe.snap
+    python -m src.crew.tools.snapshot_pack info universe.snap
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from bisect import bisect_right
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.crew.tools.collector import SnapshotStore, job_key
+from src.crew.tools.history import parse_historical_data
+
+# Try to use zstd, fallback to zlib if not available
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+MAGIC = b"NSESNAP1"
+VERSION = 1
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_NAMES = {CODEC_ZLIB: "zlib", CODEC_ZSTD: "zstd"}
+
+# magic, version, codec, index offset, index length
+_HEADER = struct.Struct("<8sHHQQ")
+
+# Endpoints whose payloads also get columnar sections
+COLUMNAR_ENDPOINTS = ("historical_data",)
+_DATES_COLUMN = "__dates__"
+
+
+def default_codec() -> int:
+    return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+
+def _compressor(codec: int):
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("This snapshot pack is zstd-compressed; install the zstandard package to read it")
+        compressor = zstandard.ZstdCompressor(level=10)
+        return compressor.compress
+    return lambda data: zlib.compress(data, 6)
+
+
+def _decompressor(codec: int):
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("This snapshot pack is zstd-compressed; install the zstandard package to read it")
+        # Readers are shared across threads but a ZstdDecompressor is not thread-safe: one per thread
+        local = threading.local()
+
+        def decompress(data: bytes) -> bytes:
+            if not hasattr(local, "decompressor"):
+                local.decompressor = zstandard.ZstdDecompressor()
+            return local.decompressor.decompress(data)
+
+        return decompress
+    return zlib.decompress
+
+
+def _canonical(payload: Any) -> bytes:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class SnapshotPackWriter:
+    """
+    Streams records into a pack file; the index is written on close().
+
+    Usage:
+        with SnapshotPackWriter("day.snap") as pack:
+            pack.add("stock", {"name": "TCS"}, payload, "2025-07-18")
+    """
+
+    def __init__(self, path: str, codec: Optional[int] = None):
+        self.path = path
+        self.codec = codec or default_codec()
+        self._compress = _compressor(self.codec)
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, self.codec, 0, 0))
+        self._entries: List[Dict] = []
+
+    def _write(self, data: bytes) -> Tuple[int, int]:
+        offset = self._file.tell()
+        compressed = self._compress(data)
+        self._file.write(compressed)
+        return offset, len(compressed)
+
+    def add(self, endpoint: str, params: Dict, payload: Any, day: str, columnar: bool = True) -> None:
+        """
+        Append one payload.
+
+        Args:
+            endpoint: API endpoint name
+            params: Query parameters the payload was fetched with
+            payload: Decoded JSON payload
+            day: Snapshot date (YYYY-MM-DD)
+            columnar: Also store numeric series as column sections where supported
+        """
+        raw = _canonical(payload)
+        offset, length = self._write(raw)
+        entry = {"key": job_key(endpoint, params), "endpoint": endpoint, "params": params, "date": day,
+                 "offset": offset, "length": length, "raw_length": len(raw)}
+
+        if columnar and endpoint in COLUMNAR_ENDPOINTS:
+            series = parse_historical_data(payload, params.get("stock_name", ""), params.get("filter", ""))
+            if series.dates:
+                columns = {}
+                ordinals = np.array([date.fromisoformat(day_).toordinal() for day_ in series.dates], dtype="<i4")
+                columns[_DATES_COLUMN] = self._write(ordinals.tobytes())
+                for metric, values in series.metrics.items():
+                    array = np.array([np.nan if value is None else value for value in values], dtype="<f8")
+                    columns[metric] = self._write(array.tobytes())
+                entry["columns"] = columns
+                entry["rows"] = len(series.dates)
+
+        self._entries.append(entry)
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        index_offset, index_length = self._write(_canonical(self._entries))
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, VERSION, self.codec, index_offset, index_length))
+        self._file.close()
+
+    def __enter__(self) -> "SnapshotPackWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class SnapshotPack:
+    """
+    Read-only, memory-mapped view of a pack.
+
+    Opening a pack reads only the header and the index; records are
+    decompressed from the mapping on demand.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, codec, index_offset, index_length = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a snapshot pack")
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot pack version {version}")
+        self.codec = codec
+        self._decompress = _decompressor(codec)
+        self.entries: List[Dict] = json.loads(self._read(index_offset, index_length))
+        # (key, date) -> entry, plus key -> dates ascending for "latest" lookups
+        self._by_key_date: Dict[Tuple[str, str], Dict] = {}
+        self._dates: Dict[str, List[str]] = {}
+        for entry in self.entries:
+            self._by_key_date[(entry["key"], entry["date"])] = entry
+            self._dates.setdefault(entry["key"], []).append(entry["date"])
+        for dates in self._dates.values():
+            dates.sort()
+
+    def _read(self, offset: int, length: int) -> bytes:
+        return self._decompress(self._map[offset:offset + length])
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def dates(self, endpoint: str, params: Optional[Dict] = None) -> List[str]:
+        return list(self._dates.get(job_key(endpoint, params or {}), []))
+
+    def find(self, endpoint: str, params: Optional[Dict] = None, day: Optional[str] = None) -> Optional[Dict]:
+        """Index entry for a payload on a date, or the latest one on or before it"""
+        key = job_key(endpoint, params or {})
+        if day is not None and (key, day) in self._by_key_date:
+            return self._by_key_date[(key, day)]
+        dates = self._dates.get(key, [])
+        position = len(dates) if day is None else bisect_right(dates, day)
+        return self._by_key_date[(key, dates[position - 1])] if position else None
+
+    def get(self, endpoint: str, params: Optional[Dict] = None, day: Optional[str] = None) -> Optional[Any]:
+        """Decoded payload for (endpoint, params, date); None if the pack has no such record"""
+        entry = self.find(endpoint, params, day)
+        if entry is None:
+            return None
+        return json.loads(self._read(entry["offset"], entry["length"]))
+
+    def columns(self, endpoint: str, params: Optional[Dict] = None, day: Optional[str] = None,
+                metrics: Optional[List[str]] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Columnar sections of a record as numpy arrays, reading only the requested metrics.
+
+        Returns:
+            {"dates": datetime64[D] array, metric: float64 array, ...}, or None
+            if the record has no columnar sections.
+        """
+        entry = self.find(endpoint, params, day)
+        if entry is None or "columns" not in entry:
+            return None
+        sections = entry["columns"]
+        ordinals = np.frombuffer(self._read(*sections[_DATES_COLUMN]), dtype="<i4")
+        # Proleptic ordinal 719163 is 1970-01-01
+        result = {"dates": (ordinals - 719163).astype("datetime64[D]")}
+        for metric in metrics or [name for name in sections if name != _DATES_COLUMN]:
+            if metric in sections:
+                result[metric] = np.frombuffer(self._read(*sections[metric]), dtype="<f8")
+        return result
+
+    def iter_records(self) -> Iterator[Tuple[Dict, Any]]:
+        for entry in self.entries:
+            yield entry, json.loads(self._read(entry["offset"], entry["length"]))
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "SnapshotPack":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def replay_fetch(pack: SnapshotPack, day: Optional[str] = None):
+    """
+    Fetch function serving payloads from a pack as of a date, with the same
+    signature and error shape as the live API fetch (for replay and backtests).
+    """
+    def fetch(endpoint: str, params: Dict) -> Any:
+        payload = pack.get(endpoint, params, day)
+        if payload is None:
+            return {"error": f"No snapshot for {job_key(endpoint, params)} on or before {day or 'latest'}"}
+        return payload
+    return fetch
+
+
+def build_from_store(snapshot_dir: str, out_path: str, run: Optional[str] = None,
+                     codec: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Pack collector snapshots (see collector.py) into one file.
+
+    Every successful index entry becomes a record dated by its fetch time; a
+    payload fetched more than once on the same day keeps the latest copy.
+    """
+    store = SnapshotStore(snapshot_dir)
+    latest: Dict[Tuple[str, str], Dict] = {}
+    for entry in store.entries(run):
+        if entry.get("status") == "ok":
+            latest[(entry["key"], entry["fetched_at"][:10])] = entry
+
+    raw_bytes = 0
+    with SnapshotPackWriter(out_path, codec) as pack:
+        for (_, day), entry in sorted(latest.items()):
+            payload = store.get(entry["sha256"])
+            raw_bytes += len(_canonical(payload))
+            pack.add(entry["endpoint"], entry["params"], payload, day)
+    return {"records": len(latest), "raw_bytes": raw_bytes, "pack_bytes": os.path.getsize(out_path),
+            "codec": CODEC_NAMES[codec or default_codec()]}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build and inspect snapshot packs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Pack a collector snapshot directory")
+    build.add_argument("--snapshots", required=True, help="Collector output directory")
+    build.add_argument("--out", required=True, help="Pack file to write")
+    build.add_argument("--run", help="Only pack one collector run")
+    build.add_argument("--codec", choices=["zstd", "zlib"], help="Defaults to zstd when available")
+    info = commands.add_parser("info", help="Summarize a pack")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        codec = {"zstd": CODEC_ZSTD, "zlib": CODEC_ZLIB}.get(args.codec)
+        summary = build_from_store(args.snapshots, args.out, args.run, codec)
+        print(f"📦 Packed {summary['records']} records into {args.out}")
+        print(f"  {summary['raw_bytes']} bytes of JSON -> {summary['pack_bytes']} bytes ({summary['codec']})")
+        return 0
+
+    with SnapshotPack(args.path) as pack:
+        endpoints: Dict[str, int] = {}
+        for entry in pack.entries:
+            endpoints[entry["endpoint"]] = endpoints.get(entry["endpoint"], 0) + 1
+        print(f"📦 {args.path}: {len(pack)} records, codec {CODEC_NAMES.get(pack.codec, pack.codec)}")
+        for endpoint, count in sorted(endpoints.items()):
+            print(f"  {endpoint}: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
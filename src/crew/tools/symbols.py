@@ -0,0 +1,125 @@
+"""
+Cheap symbol resolution for user questions (no LLM, no network)
+"""
+
+import re
+from typing import Dict, List, Optional
+
+
+# Company names / common aliases -> symbol accepted by the Indian Stock API
+KNOWN_SYMBOLS: Dict[str, str] = {
+    "reliance": "RELIANCE",
+    "reliance industries": "RELIANCE",
+    "ril": "RELIANCE",
+    "tcs": "TCS",
+    "tata consultancy": "TCS",
+    "tata consultancy services": "TCS",
+    "infosys": "INFY",
+    "infy": "INFY",
+    "hdfc": "HDFC",
+    "hdfc bank": "HDFCBANK",
+    "hdfcbank": "HDFCBANK",
+    "itc": "ITC",
+    "icici bank": "ICICIBANK",
+    "icicibank": "ICICIBANK",
+    "sbi": "SBIN",
+    "state bank of india": "SBIN",
+    "sbin": "SBIN",
+    "axis bank": "AXISBANK",
+    "axisbank": "AXISBANK",
+    "kotak": "KOTAKBANK",
+    "kotak mahindra bank": "KOTAKBANK",
+    "kotakbank": "KOTAKBANK",
+    "wipro": "WIPRO",
+    "hcl tech": "HCLTECH",
+    "hcl technologies": "HCLTECH",
+    "hcltech": "HCLTECH",
+    "tech mahindra": "TECHM",
+    "techm": "TECHM",
+    "lic": "LICI",
+    "life insurance corporation": "LICI",
+    "lici": "LICI",
+    "larsen": "LT",
+    "larsen & toubro": "LT",
+    "l&t": "LT",
+    "bharti airtel": "BHARTIARTL",
+    "airtel": "BHARTIARTL",
+    "bhartiartl": "BHARTIARTL",
+    "hindustan unilever": "HINDUNILVR",
+    "hul": "HINDUNILVR",
+    "hindunilvr": "HINDUNILVR",
+    "asian paints": "ASIANPAINT",
+    "asianpaint": "ASIANPAINT",
+    "maruti": "MARUTI",
+    "maruti suzuki": "MARUTI",
+    "tata motors": "TATAMOTORS",
+    "tatamotors": "TATAMOTORS",
+    "tata steel": "TATASTEEL",
+    "tatasteel": "TATASTEEL",
+    "sun pharma": "SUNPHARMA",
+    "sunpharma": "SUNPHARMA",
+    "bajaj finance": "BAJFINANCE",
+    "bajfinance": "BAJFINANCE",
+    "adani enterprises": "ADANIENT",
+    "adanient": "ADANIENT",
+    "adani ports": "ADANIPORTS",
+    "adaniports": "ADANIPORTS",
+    "ntpc": "NTPC",
+    "ongc": "ONGC",
+    "power grid": "POWERGRID",
+    "powergrid": "POWERGRID",
+    "coal india": "COALINDIA",
+    "coalindia": "COALINDIA",
+    "titan": "TITAN",
+    "nestle": "NESTLEIND",
+    "nestleind": "NESTLEIND",
+    "ultratech": "ULTRACEMCO",
+    "ultracemco": "ULTRACEMCO",
+    "jsw steel": "JSWSTEEL",
+    "jswsteel": "JSWSTEEL",
+    "m&m": "M&M",
+    "mahindra": "M&M",
+    "zomato": "ZOMATO",
+    "paytm": "PAYTM",
+}
+
+# Longest aliases first so "hdfc bank" wins over "hdfc"
+_ALIAS_PATTERN = re.compile(
+    r"(?<![\w&])("
+    + "|".join(re.escape(alias) for alias in sorted(KNOWN_SYMBOLS, key=len, reverse=True))
+    + r")(?![\w&])"
+)
+
+
+def find_known_symbols(question: str) -> List[str]:
+    """
+    Find every known stock symbol named in a question.
+
+    Args:
+        question: Free-text user question
+
+    Returns:
+        Symbols in order of first mention, without duplicates.
+    """
+    symbols: List[str] = []
+    for match in _ALIAS_PATTERN.finditer(question.lower()):
+        symbol = KNOWN_SYMBOLS[match.group(1)]
+        if symbol not in symbols:
+            symbols.append(symbol)
+    return symbols
+
+
+def find_known_symbol(question: str) -> Optional[str]:
+    """
+    Find the single known stock symbol a question is about.
+
+    Args:
+        question: Free-text user question
+
+    Returns:
+        The symbol if exactly one known company is named, otherwise None.
+    """
+    symbols = find_known_symbols(question)
+    if len(symbols) == 1:
+        return symbols[0]
+    return None
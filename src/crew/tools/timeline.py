@@ -0,0 +1,337 @@
+"""
+Day-by-day history of fetched payloads for time-travel questions.
+
+Every fresh upstream payload for the recorded endpoints is stored in a local
+SQLite database together with the facts extracted from it (analyst targets,
+recommendation means, shareholding, prices) and market-list memberships
+(gainers, losers, 52-week highs and lows), indexed by symbol and date. Like
+facts and memberships, payloads keep one row per request and day: the latest
+fetch of the day replaces the earlier ones, so intraday refreshes (e.g. the
+cache warmer) do not grow the database. The analyst can then ask what a value
+was as of a date, how it moved over a range, or which stocks entered a list,
+none of which the API serves historically.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.crew.tools.cache import job_key
+from src.crew.tools.models import parse_52_week_high_low, parse_trending, to_float
+
+
+# IST has no daylight saving, so a fixed offset avoids depending on tzdata
+IST = timezone(timedelta(hours=5, minutes=30), "IST")
+
+TIMELINE_ENABLED = os.getenv("TIMELINE_ENABLED", "true").lower() not in ("0", "false", "no")
+TIMELINE_DB = os.getenv("TIMELINE_DB", str(Path(__file__).resolve().parent / "timeline.db"))
+
+# Endpoints whose payloads are recorded
+RECORDED_ENDPOINTS = ("stock", "stock_target_price", "trending", "fetch_52_week_high_low_data")
+
+# Ages used by priceTargetSnapshots / recommendationSnapshots, in days
+SNAPSHOT_AGES = {"OneWeekAgo": 7, "ThirtyDaysAgo": 30, "SixtyDaysAgo": 60, "NinetyDaysAgo": 90}
+
+# Market lists recorded from trending and 52-week payloads
+MARKET_LISTS = ("gainers", "losers", "52w_high:NSE", "52w_low:NSE", "52w_high:BSE", "52w_low:BSE")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payloads (
+    id INTEGER PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    key TEXT NOT NULL,
+    symbol TEXT,
+    observed_at TEXT NOT NULL,
+    day TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS payloads_key_time ON payloads (key, observed_at);
+CREATE INDEX IF NOT EXISTS payloads_symbol_day ON payloads (symbol, day);
+CREATE INDEX IF NOT EXISTS payloads_key_day ON payloads (key, day);
+
+-- source: "observed" for values read at observed_at, "snapshot" for values the
+-- API reported for an earlier date (e.g. the target price thirty days ago)
+CREATE TABLE IF NOT EXISTS facts (
+    symbol TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    day TEXT NOT NULL,
+    source TEXT NOT NULL,
+    value REAL,
+    observed_at TEXT NOT NULL,
+    PRIMARY KEY (symbol, metric, day, source)
+);
+CREATE INDEX IF NOT EXISTS facts_day ON facts (day, metric);
+
+CREATE TABLE IF NOT EXISTS memberships (
+    list TEXT NOT NULL,
+    day TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    name TEXT,
+    value REAL,
+    observed_at TEXT NOT NULL,
+    PRIMARY KEY (list, day, symbol)
+);
+"""
+
+
+def payload_symbol(endpoint: str, params: Dict) -> Optional[str]:
+    """Symbol a payload belongs to (None for market-wide endpoints)"""
+    value = params.get("name") or params.get("stock_id") or params.get("stock_name")
+    return str(value).upper() if value else None
+
+
+def _canonical(payload: Any) -> bytes:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def extract_facts(endpoint: str, payload: Any, day: str) -> List[Tuple[str, str, str, Optional[float]]]:
+    """
+    Facts carried by a payload as (metric, day, source, value).
+
+    Snapshot ages in target-price payloads are turned into dated "snapshot"
+    facts, so a single observation already covers the last ninety days.
+    """
+    data = payload if isinstance(payload, dict) else {}
+    facts: List[Tuple[str, str, str, Optional[float]]] = []
+    observed_day = date.fromisoformat(day)
+
+    def dated(age: str) -> Optional[str]:
+        days = SNAPSHOT_AGES.get(age)
+        return (observed_day - timedelta(days=days)).isoformat() if days else None
+
+    if endpoint == "stock_target_price":
+        target = data.get("priceTarget") or {}
+        for field, metric in (("Mean", "target_mean"), ("High", "target_high"), ("Low", "target_low"),
+                              ("Median", "target_median"), ("NumberOfEstimates", "target_estimates")):
+            facts.append((metric, day, "observed", to_float(target.get(field))))
+        for snapshot in (data.get("priceTargetSnapshots") or {}).get("PriceTargetSnapshot") or []:
+            snapshot_day = dated(snapshot.get("Age", ""))
+            if snapshot_day:
+                facts.append(("target_mean", snapshot_day, "snapshot", to_float(snapshot.get("Mean"))))
+                facts.append(("target_high", snapshot_day, "snapshot", to_float(snapshot.get("High"))))
+                facts.append(("target_low", snapshot_day, "snapshot", to_float(snapshot.get("Low"))))
+        recommendation = data.get("recommendation") or {}
+        facts.append(("reco_mean", day, "observed", to_float(recommendation.get("Mean"))))
+        facts.append(("reco_count", day, "observed", to_float(recommendation.get("NumberOfRecommendations"))))
+        for snapshot in (data.get("recommendationSnapshots") or {}).get("RecommendationSnapshot") or []:
+            snapshot_day = dated(snapshot.get("Age", ""))
+            if snapshot_day:
+                facts.append(("reco_mean", snapshot_day, "snapshot", to_float(snapshot.get("Mean"))))
+
+    elif endpoint == "stock":
+        facts.append(("price", day, "observed", to_float((data.get("currentPrice") or {}).get("NSE"))))
+        facts.append(("percent_change", day, "observed", to_float(data.get("percentChange"))))
+        recos = data.get("recosBar") or {}
+        facts.append(("analyst_rating_mean", day, "observed", to_float(recos.get("meanValue"))))
+        facts.append(("analyst_count", day, "observed", to_float(recos.get("noOfRecommendations"))))
+        for holder in data.get("shareholding") or []:
+            metric = "holding_" + str(holder.get("displayName") or holder.get("categoryName") or "other").lower()
+            for point in holder.get("categories") or []:
+                if point.get("holdingDate"):
+                    facts.append((metric, str(point["holdingDate"])[:10], "snapshot", to_float(point.get("percentage"))))
+
+    return [fact for fact in facts if fact[3] is not None]
+
+
+def extract_memberships(endpoint: str, payload: Any) -> List[Tuple[str, str, str, Optional[float]]]:
+    """Market-list memberships as (list, symbol, name, value)"""
+    if endpoint == "trending":
+        return [("gainers" if entry.direction == "gainer" else "losers", entry.ric or entry.ticker_id,
+                 entry.company_name, entry.percent_change) for entry in parse_trending(payload)]
+    if endpoint == "fetch_52_week_high_low_data":
+        return [(f"52w_{entry.kind}:{entry.exchange}", entry.ticker, entry.company, entry.price)
+                for entry in parse_52_week_high_low(payload)]
+    return []
+
+
+def covered_lists(endpoint: str, payload: Any) -> List[str]:
+    """
+    Market lists a payload reports in full, even when they are empty.
+
+    Their members for the day are replaced by the payload's, so stocks that
+    dropped off a list intraday do not linger.
+    """
+    data = payload if isinstance(payload, dict) else {}
+    if endpoint == "trending" and isinstance(data.get("trending_stocks"), dict):
+        return ["gainers", "losers"]
+    if endpoint == "fetch_52_week_high_low_data":
+        return [f"52w_{kind}:{exchange}" for exchange in ("NSE", "BSE")
+                if isinstance(data.get(f"{exchange}_52WeekHighLow"), dict) for kind in ("high", "low")]
+    return []
+
+
+class TimelineStore:
+    """
+    SQLite-backed payload history (one payload per request and day) with fact
+    and membership indexes.
+
+    Writes go through one background thread so tool calls never wait on disk.
+    """
+
+    def __init__(self, path: str = TIMELINE_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="timeline")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Caller holds the lock
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def record(self, endpoint: str, params: Dict, payload: Any,
+               observed_at: Optional[datetime] = None) -> bool:
+        """
+        Store a payload as the day's copy for its request and index its facts.
+
+        Returns:
+            False when the endpoint is not recorded or the payload is identical
+            to the latest one stored for the same request on the same day.
+        """
+        if endpoint not in RECORDED_ENDPOINTS or (isinstance(payload, dict) and "error" in payload):
+            return False
+        key = job_key(endpoint, params)
+        observed = (observed_at or datetime.now(IST)).astimezone(IST)
+        observed_iso = observed.isoformat(timespec="seconds")
+        day = observed.date().isoformat()
+        body = _canonical(payload)
+        digest = hashlib.sha256(body).hexdigest()
+        symbol = payload_symbol(endpoint, params)
+
+        with self._lock:
+            conn = self._connection()
+            latest = conn.execute(
+                "SELECT sha256, day FROM payloads WHERE key = ? ORDER BY observed_at DESC LIMIT 1", (key,)
+            ).fetchone()
+            if latest is not None and latest == (digest, day):
+                return False
+            with conn:
+                # The day's latest payload replaces any earlier one from that day
+                conn.execute("DELETE FROM payloads WHERE key = ? AND day = ?", (key, day))
+                conn.execute(
+                    "INSERT INTO payloads (endpoint, key, symbol, observed_at, day, sha256, body) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (endpoint, key, symbol, observed_iso, day, digest, zlib.compress(body, 6)),
+                )
+                if symbol:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO facts (symbol, metric, day, source, value, observed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(symbol, metric, fact_day, source, value, observed_iso)
+                         for metric, fact_day, source, value in extract_facts(endpoint, payload, day)],
+                    )
+                conn.executemany("DELETE FROM memberships WHERE list = ? AND day = ?",
+                                 [(list_name, day) for list_name in covered_lists(endpoint, payload)])
+                conn.executemany(
+                    "INSERT OR REPLACE INTO memberships (list, day, symbol, name, value, observed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(list_name, day, member, name, value, observed_iso)
+                     for list_name, member, name, value in extract_memberships(endpoint, payload)],
+                )
+        return True
+
+    def record_async(self, endpoint: str, params: Dict, payload: Any) -> None:
+        """Queue a record() on the writer thread, stamped with the current time"""
+        observed_at = datetime.now(IST)
+        self._writer.submit(self._record_quietly, endpoint, params, payload, observed_at)
+
+    def _record_quietly(self, *args) -> None:
+        try:
+            self.record(*args)
+        except Exception as e:
+            # History is best-effort; a failed write must never surface in a tool call
+            print(f"Timeline write failed: {e}")
+
+    def flush(self) -> None:
+        """Wait until queued writes are on disk"""
+        self._writer.submit(lambda: None).result()
+
+    # Queries
+    def as_of(self, symbol: str, metric: str, day: str) -> Optional[Tuple[str, float]]:
+        """Latest (day, value) of a metric on or before a date; observed values win ties"""
+        with self._lock:
+            return self._connection().execute(
+                "SELECT day, value FROM facts WHERE symbol = ? AND metric = ? AND day <= ? "
+                "ORDER BY day DESC, source ASC LIMIT 1",
+                (symbol.upper(), metric, day),
+            ).fetchone()
+
+    def series(self, symbol: str, metric: str, start: str, end: str) -> List[Tuple[str, float, str]]:
+        """(day, value, source) per day in [start, end], preferring observed values"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT day, value, source FROM facts WHERE symbol = ? AND metric = ? AND day BETWEEN ? AND ? "
+                "ORDER BY day ASC, source DESC",
+                (symbol.upper(), metric, start, end),
+            ).fetchall()
+        # source DESC puts "observed" last per day, so it overwrites "snapshot"
+        by_day = {day: (day, value, source) for day, value, source in rows}
+        return list(by_day.values())
+
+    def metrics(self, symbol: str) -> List[str]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT DISTINCT metric FROM facts WHERE symbol = ? ORDER BY metric", (symbol.upper(),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def members(self, list_name: str, day: str) -> List[Tuple[str, str, Optional[float]]]:
+        """(symbol, name, value) on a list as of its latest recorded day on or before day"""
+        with self._lock:
+            conn = self._connection()
+            latest = conn.execute(
+                "SELECT MAX(day) FROM memberships WHERE list = ? AND day <= ?", (list_name, day)
+            ).fetchone()[0]
+            if latest is None:
+                return []
+            return conn.execute(
+                "SELECT symbol, name, value FROM memberships WHERE list = ? AND day = ? ORDER BY symbol",
+                (list_name, latest),
+            ).fetchall()
+
+    def entered(self, list_name: str, start: str, end: str) -> List[Tuple[str, str, str, Optional[float]]]:
+        """
+        Stocks that joined a list between start and end: (first day, symbol, name, value)
+        for members not on the list's last recorded day before start.
+        """
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(
+                "SELECT MIN(m.day), m.symbol, m.name, m.value FROM memberships m "
+                "WHERE m.list = ? AND m.day BETWEEN ? AND ? AND m.symbol NOT IN ("
+                "  SELECT symbol FROM memberships WHERE list = ? AND day = ("
+                "    SELECT MAX(day) FROM memberships WHERE list = ? AND day < ?)"
+                ") GROUP BY m.symbol ORDER BY MIN(m.day), m.symbol",
+                (list_name, start, end, list_name, list_name, start),
+            ).fetchall()
+        return rows
+
+    def payload_as_of(self, endpoint: str, params: Dict, day: str) -> Optional[Any]:
+        """Latest recorded payload for a request on or before a date"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT body FROM payloads WHERE key = ? AND day <= ? ORDER BY observed_at DESC LIMIT 1",
+                (job_key(endpoint, params), day),
+            ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connection()
+            payloads, first, last = conn.execute("SELECT COUNT(*), MIN(day), MAX(day) FROM payloads").fetchone()
+            facts = conn.execute("SELECT COUNT(*) FROM facts").fetchone()[0]
+        return {"enabled": TIMELINE_ENABLED, "payloads": payloads, "facts": facts,
+                "first_day": first, "last_day": last}
+
+
+timeline_store = TimelineStore()
@@ -0,0 +1,113 @@
+"""
+Per-kickoff memo of tool outputs.
+
+Agents often repeat a tool call within one run (the analyst fetches TCS, then
+fetches " tcs" again after rephrasing). Inside a run_memo() scope, tools
+decorated with memoize_per_run return the first output for the same
+normalized arguments instead of fetching and formatting again. Outside a
+scope (direct calls, scripts) they run as before.
+"""
+
+import functools
+import inspect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+
+# Arguments naming stocks; compared case-insensitively ("symbols" is a comma list)
+SYMBOL_ARGS = {"symbol", "symbols", "stock_id"}
+
+# Outputs that may change within a run (a failed fetch, history not yet recorded)
+_UNCACHED_PREFIXES = ("Error", "No ")
+
+
+def normalize_arg(name: str, value: Any) -> Any:
+    """Canonical form of one tool argument: trimmed, single-spaced, symbols upper-cased"""
+    if not isinstance(value, str):
+        return value
+    value = " ".join(value.split())
+    if name in SYMBOL_ARGS:
+        return ",".join(part.strip().upper() for part in value.split(",") if part.strip())
+    return value
+
+
+class RunMemo:
+    """Tool outputs of one kickoff, keyed by tool name and normalized arguments"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._outputs: Dict[Tuple, str] = {}
+        self.calls: Dict[str, int] = {}
+        self.avoided: Dict[str, int] = {}
+
+    def get(self, key: Tuple) -> Optional[str]:
+        with self._lock:
+            self.calls[key[0]] = self.calls.get(key[0], 0) + 1
+            output = self._outputs.get(key)
+            if output is not None:
+                self.avoided[key[0]] = self.avoided.get(key[0], 0) + 1
+            return output
+
+    def put(self, key: Tuple, output: str) -> None:
+        with self._lock:
+            self._outputs.setdefault(key, output)
+
+    def stats(self) -> Dict[str, Any]:
+        """Tool calls and duplicate calls avoided in this run, in total and per tool"""
+        with self._lock:
+            return {
+                "tool_calls": sum(self.calls.values()),
+                "duplicates_avoided": sum(self.avoided.values()),
+                "by_tool": {name: {"calls": calls, "duplicates_avoided": self.avoided.get(name, 0)}
+                            for name, calls in sorted(self.calls.items())},
+            }
+
+
+# Memo of the running kickoff; crewAI copies the context into async task
+# threads, so parallel tasks of one run share the same RunMemo
+_run_memo: ContextVar[Optional[RunMemo]] = ContextVar("tool_run_memo", default=None)
+
+
+@contextmanager
+def run_memo() -> Iterator[RunMemo]:
+    """Scope a fresh memo to the enclosed kickoff"""
+    memo = RunMemo()
+    token = _run_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _run_memo.reset(token)
+
+
+def memoize_per_run(func: Callable[..., str]) -> Callable[..., str]:
+    """
+    Decorator (below @tool) returning the run's earlier output for repeated arguments.
+
+    Arguments are bound to the signature first, so defaults and keyword or
+    positional spelling do not make two identical calls look different.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs) -> str:
+        memo = _run_memo.get()
+        if memo is None:
+            return func(*args, **kwargs)
+        try:
+            bound = signature.bind(*args, **kwargs)
+        except TypeError:
+            return func(*args, **kwargs)
+        bound.apply_defaults()
+        key = (func.__name__,) + tuple(
+            (name, normalize_arg(name, value)) for name, value in bound.arguments.items())
+        output = memo.get(key)
+        if output is not None:
+            return output
+        output = func(*args, **kwargs)
+        if isinstance(output, str) and not output.startswith(_UNCACHED_PREFIXES):
+            memo.put(key, output)
+        return output
+
+    return wrapper
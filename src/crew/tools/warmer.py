@@ -0,0 +1,195 @@
+"""
+Background warmer that keeps market-wide payloads and popular symbols in the
+shared response cache, refreshing faster while NSE is trading.
+
+Every web or crew worker process may start the warmer, but only the one
+holding the host-wide CACHE_WARMER_LOCK file lock refreshes; the others stand
+by and take over if that process exits. Warming once per host keeps upstream
+quota use and timeline writes the same however many processes are running.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, time as dtime
+from typing import Dict, List, Optional, Tuple
+
+from src.crew.tools.cache import response_cache, make_cache_key, params_from_key
+from src.crew.tools.market import MARKET_TABLE_BUILDERS
+from src.crew.tools.nse_tools import make_indian_stock_request
+from src.crew.tools.timeline import IST
+
+# POSIX file locks elect the warming process; without them every process warms
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# NSE equity session: pre-open from 09:00, continuous trading 09:15-15:30
+PRE_OPEN = dtime(9, 0)
+MARKET_OPEN = dtime(9, 15)
+MARKET_CLOSE = dtime(15, 30)
+
+# Refresh interval in seconds per market phase
+REFRESH_INTERVALS: Dict[str, int] = {
+    "open": 60,
+    "pre_open": 120,
+    "post_close": 600,
+    "closed": 1800,
+}
+
+# Market-wide endpoints refreshed on every cycle
+MARKET_WIDE_ENDPOINTS: Tuple[str, ...] = ("trending", "fetch_52_week_high_low_data")
+
+# Lock file held by the one process per host that warms
+CACHE_WARMER_LOCK = os.getenv("CACHE_WARMER_LOCK", os.path.join(tempfile.gettempdir(), "nse-cache-warmer.lock"))
+
+
+def market_phase(now: Optional[datetime] = None) -> str:
+    """
+    Work out the NSE trading phase for a moment in time.
+
+    Args:
+        now: Timezone-aware datetime (defaults to the current time)
+
+    Returns:
+        One of "pre_open", "open", "post_close" or "closed". Exchange holidays
+        are not modelled and are treated as regular weekdays.
+    """
+    now = (now or datetime.now(IST)).astimezone(IST)
+    if now.weekday() >= 5:
+        return "closed"
+    current = now.time()
+    if PRE_OPEN <= current < MARKET_OPEN:
+        return "pre_open"
+    if MARKET_OPEN <= current < MARKET_CLOSE:
+        return "open"
+    if MARKET_CLOSE <= current < dtime(17, 0):
+        return "post_close"
+    return "closed"
+
+
+def refresh_interval(now: Optional[datetime] = None) -> int:
+    """Seconds to wait before the next refresh cycle"""
+    return REFRESH_INTERVALS[market_phase(now)]
+
+
+class CacheWarmer:
+    """
+    Periodically refreshes market-wide endpoints and the most requested symbols.
+
+    Refreshed entries are cached for twice the current interval so they never
+    expire between cycles and user requests always hit a warm cache. Lookup
+    counts decay every cycle, so the symbols refreshed are the recently popular ones.
+    """
+
+    def __init__(self, top_n: int = 10, lock_path: Optional[str] = CACHE_WARMER_LOCK):
+        self.top_n = top_n
+        self.lock_path = lock_path
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.cycles = 0
+        self.failures = 0
+        self.crashed_cycles = 0
+        self.last_error: Optional[str] = None
+        self.last_refresh: Optional[float] = None
+
+    def targets(self) -> List[Tuple[str, Dict]]:
+        """Endpoints and params refreshed in the next cycle"""
+        targets = [(endpoint, {}) for endpoint in MARKET_WIDE_ENDPOINTS]
+        for key in response_cache.most_requested("stock", self.top_n):
+            targets.append(("stock", params_from_key(key)))
+        return targets
+
+    def refresh_once(self) -> int:
+        """Refresh every target once and return the number of failures"""
+        ttl = refresh_interval() * 2
+        failures = 0
+        targets = self.targets()
+        response_cache.decay_access_counts()
+        for endpoint, params in targets:
+            data = make_indian_stock_request(endpoint, params, use_cache=False, ttl=ttl)
+            if isinstance(data, dict) and "error" in data:
+                failures += 1
+            elif endpoint in MARKET_TABLE_BUILDERS:
+                # Index the fresh snapshot now so questions never pay for the parse
+                build = MARKET_TABLE_BUILDERS[endpoint]
+                response_cache.derive(make_cache_key(endpoint, params), build.__name__, data, build)
+        self.cycles += 1
+        self.failures += failures
+        self.last_refresh = time.time()
+        return failures
+
+    def _acquire(self) -> bool:
+        """Take the host-wide warmer lock if it is free; True while this process holds it"""
+        if self._lock_file is not None or fcntl is None or not self.lock_path:
+            return True
+        lock_file = open(self.lock_path, "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # Held until this process exits, which releases it for a standby warmer
+        self._lock_file = lock_file
+        return True
+
+    def _release(self) -> None:
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    @property
+    def active(self) -> bool:
+        return self._lock_file is not None or fcntl is None or not self.lock_path
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not self._acquire():
+                # Another process warms this host; check again next interval
+                self._stop.wait(refresh_interval())
+                continue
+            try:
+                self.refresh_once()
+            except Exception as e:
+                # A bad payload or index build must not leave the cache cold for good
+                self.crashed_cycles += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Cache warmer cycle failed: {self.last_error}")
+            self._stop.wait(refresh_interval())
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._release()
+
+    def stats(self) -> Dict:
+        running = self._thread is not None and self._thread.is_alive()
+        return {
+            "running": running,
+            # "active" warms this host; "standby" waits for the lock
+            "role": ("active" if self.active else "standby") if running else "stopped",
+            "phase": market_phase(),
+            "interval": refresh_interval(),
+            "cycles": self.cycles,
+            "failures": self.failures,
+            "crashed_cycles": self.crashed_cycles,
+            "last_error": self.last_error,
+            "last_refresh": self.last_refresh,
+        }
+
+
+WARMER_ENABLED = os.getenv("CACHE_WARMER_ENABLED", "true").lower() not in ("0", "false", "no")
+
+cache_warmer = CacheWarmer(top_n=int(os.getenv("CACHE_WARMER_TOP_N", "10")))
@@ -2,9 +2,13 @@ import streamlit as st
 import sys
 import os
 from conversation_crew import ConversationCrew
+from src.crew.schemas import StockAnswer, partial_insights, to_answer
+from src.crew.tools.deadline import REQUEST_DEADLINE, Deadline
 import time
-import json
-import re
+import html
+import queue
+import hashlib
+import threading
 from datetime import datetime
 
 # Page configuration
@@ -15,313 +19,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "chat.css")
+
+@st.cache_resource
+def load_chat_css():
+    """Read the chat stylesheet once per process instead of on every rerun"""
+    with open(CSS_PATH, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
 # Custom CSS for chat-like interface
-st.markdown("""
-<style>
-    /* Hide Streamlit default elements */
-    .stDeployButton {display: none;}
-    .stDecoration {display: none;}
-    #MainMenu {visibility: hidden;}
-    .stAppHeader {display: none;}
-    
-    /* Chat container styling */
-    .chat-container {
-        max-width: 100%;
-        margin: 0 auto;
-        padding: 20px;
-        background: #ffffff;
-        border-radius: 16px;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-    }
-    
-    /* Header styling */
-    .chat-header {
-        text-align: center;
-        padding: 20px 0;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border-radius: 16px;
-        margin-bottom: 30px;
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.3);
-    }
-    
-    .chat-header h1 {
-        margin: 0;
-        font-size: 2.5rem;
-        font-weight: 700;
-    }
-    
-    .chat-header p {
-        margin: 10px 0 0 0;
-        font-size: 1.1rem;
-        opacity: 0.9;
-    }
-    
-    /* Message styling */
-    .message {
-        display: flex;
-        margin-bottom: 20px;
-        animation: slideIn 0.3s ease-out;
-    }
-    
-    .user-message {
-        justify-content: flex-end;
-    }
-    
-    .assistant-message {
-        justify-content: flex-start;
-    }
-    
-    .message-content {
-        max-width: 70%;
-        padding: 16px 20px;
-        border-radius: 20px;
-        font-size: 16px;
-        line-height: 1.5;
-        word-wrap: break-word;
-    }
-    
-    .user-message .message-content {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border-bottom-right-radius: 6px;
-    }
-    
-    .assistant-message .message-content {
-        background: #f7f7f8;
-        color: #1a1a1a;
-        border: 1px solid #e5e5e5;
-        border-bottom-left-radius: 6px;
-    }
-    
-    .message-avatar {
-        width: 40px;
-        height: 40px;
-        border-radius: 50%;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        margin: 0 12px;
-        font-size: 20px;
-        font-weight: bold;
-        flex-shrink: 0;
-    }
-    
-    .user-avatar {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        order: 1;
-    }
-    
-    .assistant-avatar {
-        background: #f0f0f0;
-        color: #666;
-        order: 0;
-    }
-    
-    /* Suggestions styling */
-    .suggestions {
-        display: flex;
-        flex-wrap: wrap;
-        gap: 8px;
-        margin: 20px 0;
-        justify-content: center;
-    }
-    
-    .suggestion-chip {
-        background: #f7f7f8;
-        border: 1px solid #e5e5e5;
-        border-radius: 20px;
-        padding: 8px 16px;
-        font-size: 14px;
-        cursor: pointer;
-        transition: all 0.3s ease;
-    }
-    
-    .suggestion-chip:hover {
-        background: #667eea;
-        color: white;
-        transform: translateY(-2px);
-    }
-    
-    /* Typing indicator */
-    .typing-indicator {
-        display: flex;
-        align-items: center;
-        gap: 8px;
-        margin: 20px 0;
-    }
-    
-    .typing-dot {
-        width: 8px;
-        height: 8px;
-        border-radius: 50%;
-        background: #667eea;
-        animation: typing 1.4s infinite;
-    }
-    
-    .typing-dot:nth-child(2) { animation-delay: 0.2s; }
-    .typing-dot:nth-child(3) { animation-delay: 0.4s; }
-    
-    @keyframes typing {
-        0%, 60%, 100% { transform: translateY(0); }
-        30% { transform: translateY(-20px); }
-    }
-    
-    @keyframes slideIn {
-        from { opacity: 0; transform: translateY(20px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    
-    /* Stock data styling */
-    .stock-data {
-        background: #f8fafc;
-        border: 1px solid #e2e8f0;
-        border-radius: 12px;
-        padding: 16px;
-        margin: 12px 0;
-    }
-    
-    .stock-metric {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        padding: 8px 0;
-        border-bottom: 1px solid #e2e8f0;
-    }
-    
-    .stock-metric:last-child {
-        border-bottom: none;
-    }
-    
-    .metric-label {
-        font-weight: 600;
-        color: #4a5568;
-    }
-    
-    .metric-value {
-        font-weight: 700;
-        color: #1a202c;
-    }
-    
-    .metric-positive {
-        color: #22c55e;
-    }
-    
-    .metric-negative {
-        color: #ef4444;
-    }
-    
-    /* Chat messages area */
-    .chat-messages {
-        min-height: 60vh;
-        max-height: 70vh;
-        overflow-y: auto;
-        padding-bottom: 20px;
-    }
-    
-    /* Scrollbar styling */
-    .chat-messages::-webkit-scrollbar {
-        width: 6px;
-    }
-    
-    .chat-messages::-webkit-scrollbar-track {
-        background: #f1f1f1;
-        border-radius: 3px;
-    }
-    
-    .chat-messages::-webkit-scrollbar-thumb {
-        background: #c1c1c1;
-        border-radius: 3px;
-    }
-    
-    .chat-messages::-webkit-scrollbar-thumb:hover {
-        background: #a8a8a8;
-    }
-    
-    /* Sidebar styling */
-    .sidebar-content {
-        padding: 1rem;
-    }
-    
-    .api-status {
-        padding: 0.75rem;
-        border-radius: 8px;
-        margin-bottom: 1rem;
-        text-align: center;
-        font-weight: 600;
-    }
-    
-    .api-status.connected {
-        background: #dcfce7;
-        color: #166534;
-        border: 1px solid #bbf7d0;
-    }
-    
-    .api-status.disconnected {
-        background: #fef2f2;
-        color: #dc2626;
-        border: 1px solid #fecaca;
-    }
-    
-    .api-key-section {
-        margin-bottom: 1.5rem;
-        padding: 1rem;
-        background: #f8fafc;
-        border-radius: 8px;
-        border: 1px solid #e2e8f0;
-    }
-    
-    .api-key-label {
-        font-weight: 600;
-        color: #374151;
-        margin-bottom: 0.5rem;
-        display: block;
-    }
-    
-    .api-key-preview {
-        font-size: 0.8rem;
-        color: #6b7280;
-        margin-bottom: 0.5rem;
-        font-family: monospace;
-        background: #f3f4f6;
-        padding: 0.25rem 0.5rem;
-        border-radius: 4px;
-    }
-    
-    .welcome-message {
-        text-align: center;
-        padding: 2rem;
-        background: #f8fafc;
-        border-radius: 12px;
-        margin-bottom: 2rem;
-    }
-    
-    .welcome-message h3 {
-        margin-bottom: 1rem;
-        color: #1a202c;
-    }
-    
-    .welcome-message p {
-        color: #4a5568;
-        line-height: 1.6;
-    }
-    
-    /* Input area styling */
-    .stTextInput > div > div > input {
-        border-radius: 25px;
-        border: 2px solid #e5e5e5;
-        padding: 12px 20px;
-        font-size: 16px;
-        transition: all 0.3s ease;
-    }
-    
-    .stTextInput > div > div > input:focus {
-        border-color: #667eea;
-        box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(load_chat_css(), unsafe_allow_html=True)
 
 # Initialize session state
 if 'messages' not in st.session_state:
@@ -367,97 +74,82 @@ def update_api_keys(gemini_key, serper_key, indian_key):
         updated = True
     
     if updated:
-        # Reset crew to use new API keys
+        # Switch to the shared crew for the new key set on next use
         st.session_state.crew = None
         st.session_state.api_keys_set = True
         return True
     return False
 
+def api_key_fingerprint():
+    """Short hash identifying the active set of API keys (never the keys themselves)"""
+    digest = hashlib.sha256()
+    for key in DEFAULT_API_KEYS:
+        digest.update(os.environ.get(key, '').encode())
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+@st.cache_resource(max_entries=8)
+def get_shared_crew(fingerprint, _gemini_key, _serper_key):
+    """One crew per distinct set of API keys, shared by every browser session"""
+    return ConversationCrew(gemini_api_key=_gemini_key, serper_api_key=_serper_key)
+
 def initialize_crew():
-    """Initialize the conversation crew"""
+    """Attach the shared conversation crew for the current API keys"""
     try:
         # Ensure API keys are set
         set_api_keys()
         
         if st.session_state.crew is None:
-            st.session_state.crew = ConversationCrew()
+            st.session_state.crew = get_shared_crew(
+                api_key_fingerprint(),
+                os.environ.get('GEMINI_API_KEY'),
+                os.environ.get('SERPER_API_KEY')
+            )
         return True
     except Exception as e:
         st.error(f"Failed to initialize system: {str(e)}")
         return False
 
-def parse_json_response(response_text):
-    """Parse JSON from response and format it nicely"""
-    try:
-        # Look for JSON content within ```json blocks
-        json_pattern = r'```json\s*({.*?})\s*```'
-        match = re.search(json_pattern, response_text, re.DOTALL)
-        
-        if match:
-            json_str = match.group(1)
-            data = json.loads(json_str)
-            
-            # Format the insights nicely
-            formatted_response = ""
-            
-            if 'insights' in data:
-                formatted_response += data['insights']
-            
-            # Add additional structured data if available
-            if 'additional_info' in data:
-                additional_info = data['additional_info']
-                
-                # Add market data
-                if 'market_data' in additional_info:
-                    market_data = additional_info['market_data']
-                    formatted_response += "\n\n📊 **Market Data:**"
-                    
-                    stock_html = '<div class="stock-data">'
-                    
-                    if 'current_price_nse' in market_data:
-                        stock_html += f'<div class="stock-metric"><span class="metric-label">NSE Price</span><span class="metric-value">₹{market_data["current_price_nse"]}</span></div>'
-                    
-                    if 'current_price_bse' in market_data:
-                        stock_html += f'<div class="stock-metric"><span class="metric-label">BSE Price</span><span class="metric-value">₹{market_data["current_price_bse"]}</span></div>'
-                    
-                    if 'daily_change' in market_data:
-                        change = market_data['daily_change']
-                        change_class = 'metric-positive' if not change.startswith('-') else 'metric-negative'
-                        stock_html += f'<div class="stock-metric"><span class="metric-label">Daily Change</span><span class="metric-value {change_class}">{change}</span></div>'
-                    
-                    if '52_week_high' in market_data:
-                        stock_html += f'<div class="stock-metric"><span class="metric-label">52W High</span><span class="metric-value">₹{market_data["52_week_high"]}</span></div>'
-                    
-                    if '52_week_low' in market_data:
-                        stock_html += f'<div class="stock-metric"><span class="metric-label">52W Low</span><span class="metric-value">₹{market_data["52_week_low"]}</span></div>'
-                    
-                    stock_html += '</div>'
-                    
-                    return formatted_response, stock_html
-            
-            return formatted_response, None
-        
-        # If no JSON found, return original response
-        return response_text, None
-    
-    except Exception as e:
-        return response_text, None
+def render_answer(answer):
+    """Split a StockAnswer into the chat text and the stock metric cards (HTML or None)"""
+    formatted_response = answer.insights
+    if answer.sources:
+        formatted_response += "\n\n📚 **Sources:** " + ", ".join(answer.sources)
+    
+    cards = []
+    for data in answer.market_data:
+        metrics = []
+        if data.current_price_nse is not None:
+            metrics.append(("NSE Price", f"₹{data.current_price_nse:,.2f}", ""))
+        if data.current_price_bse is not None:
+            metrics.append(("BSE Price", f"₹{data.current_price_bse:,.2f}", ""))
+        if data.change_percent is not None:
+            change_class = 'metric-positive' if data.change_percent >= 0 else 'metric-negative'
+            metrics.append(("Daily Change", f"{data.change_percent:+.2f}%", change_class))
+        if data.week_52_high is not None:
+            metrics.append(("52W High", f"₹{data.week_52_high:,.2f}", ""))
+        if data.week_52_low is not None:
+            metrics.append(("52W Low", f"₹{data.week_52_low:,.2f}", ""))
+        if data.target_price is not None:
+            metrics.append(("Target Price", f"₹{data.target_price:,.2f}", ""))
+        if not metrics:
+            continue
+        stock_html = f'<div class="stock-data"><div class="stock-metric"><span class="metric-label">{html.escape(data.name or data.symbol)}</span><span class="metric-value">{html.escape(data.symbol)}</span></div>'
+        for label, value, value_class in metrics:
+            stock_html += f'<div class="stock-metric"><span class="metric-label">{label}</span><span class="metric-value {value_class}">{value}</span></div>'
+        cards.append(stock_html + '</div>')
+    
+    if cards:
+        formatted_response += "\n\n📊 **Market Data:**"
+    return formatted_response, "".join(cards) or None
 
-def display_message(message, is_user=True):
-    """Display a chat message"""
+def render_message_html(message_content, is_user=True):
+    """Build the chat bubble HTML for a message"""
     message_class = "user-message" if is_user else "assistant-message"
     avatar_class = "user-avatar" if is_user else "assistant-avatar"
     avatar_icon = "👤" if is_user else "🤖"
     
-    # Parse message if it's from assistant
-    if not is_user and isinstance(message, str):
-        formatted_text, stock_html = parse_json_response(message)
-        message_content = formatted_text
-    else:
-        message_content = message
-        stock_html = None
-    
-    st.markdown(f"""
+    return f"""
     <div class="message {message_class}">
         <div class="message-avatar {avatar_class}">
             {avatar_icon}
@@ -466,46 +158,92 @@ def display_message(message, is_user=True):
             {message_content}
         </div>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+def display_message(message, is_user=True):
+    """Display a chat message"""
+    # Assistant answers arrive structured; errors are plain text
+    if not is_user and isinstance(message, StockAnswer):
+        message_content, stock_html = render_answer(message)
+    else:
+        message_content = message
+        stock_html = None
+    
+    st.markdown(render_message_html(message_content, is_user), unsafe_allow_html=True)
     
     # Display stock data if available
     if stock_html:
         st.markdown(stock_html, unsafe_allow_html=True)
 
-def display_typing_indicator():
+def display_typing_indicator(container=st):
     """Display typing indicator"""
-    st.markdown("""
-    <div class="message assistant-message">
-        <div class="message-avatar assistant-avatar">
-            🤖
-        </div>
-        <div class="message-content">
+    container.markdown(render_message_html("""
             <div class="typing-indicator">
                 <div class="typing-dot"></div>
                 <div class="typing-dot"></div>
                 <div class="typing-dot"></div>
                 <span style="margin-left: 8px;">AI is analyzing...</span>
             </div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    """, is_user=False), unsafe_allow_html=True)
 
-def get_ai_response(question):
-    """Get response from AI crew"""
-    try:
-        if not st.session_state.crew:
-            initialize_crew()
-        
-        result = st.session_state.crew.crew().kickoff(inputs={'user_question': question})
-        
-        # Extract response text
-        if hasattr(result, 'raw'):
-            return result.raw
-        else:
-            return str(result)
+def stream_ai_response(question):
+    """Run the crew in a worker thread and render its progress as it happens
+    
+    Agent steps and tool results are listed in a status box, and the final
+    answer is streamed into the chat bubble token by token. Only the worker
+    thread touches the crew; all Streamlit calls stay on the script thread.
+    If the script is stopped (the user reruns or leaves), the run is cancelled.
+    """
+    if not st.session_state.crew:
+        initialize_crew()
+    crew = st.session_state.crew
+    
+    events = queue.Queue()
+    outcome = {}
+    deadline = Deadline(REQUEST_DEADLINE)
+    
+    def run():
+        try:
+            result = crew.kickoff(question, on_event=events.put, deadline=deadline)
+            outcome['response'] = to_answer(result)
+        except Exception as e:
+            outcome['response'] = f"I apologize, but I encountered an error while processing your request: {str(e)}"
+        finally:
+            events.put(None)
+    
+    threading.Thread(target=run, daemon=True).start()
+    
+    status = st.status("🤖 AI is analyzing...", expanded=True)
+    answer = st.empty()
+    display_typing_indicator(answer)
+    tokens = []
     
-    except Exception as e:
-        return f"I apologize, but I encountered an error while processing your request: {str(e)}"
+    try:
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            if event['type'] == 'tool':
+                status.write(f"🔧 `{event['tool']}` ← {event['tool_input']}")
+                if event['result']:
+                    status.caption(event['result'][:300])
+            elif event['type'] == 'task':
+                status.write(f"✅ **{str(event['agent']).strip()}** finished")
+                status.update(label=f"🤖 {str(event['agent']).strip()} done, continuing...")
+            elif event['type'] == 'memo' and event['duplicates_avoided']:
+                status.write(f"♻️ {event['duplicates_avoided']} repeated tool call(s) answered from this run's memo")
+            elif event['type'] == 'token':
+                tokens.append(event['text'])
+                # The coordinator streams StockAnswer JSON; show its insights as they arrive
+                answer.markdown(render_message_html(partial_insights("".join(tokens)), is_user=False), unsafe_allow_html=True)
+    finally:
+        if 'response' not in outcome:
+            # Streamlit stopped this script (rerun or the user left); don't finish the run for nobody
+            deadline.cancel("client disconnected")
+    
+    status.update(label="✅ Analysis complete", state="complete", expanded=False)
+    answer.empty()
+    return outcome['response']
 
 def render_sidebar():
     """Render the sidebar with API settings"""
@@ -700,6 +438,8 @@ def main():
         # Chat messages container
         st.markdown('<div class="chat-messages">', unsafe_allow_html=True)
         
+        question = None
+        
         # Display welcome message if no messages
         if not st.session_state.messages:
             st.markdown("""
@@ -727,58 +467,30 @@ def main():
                     if st.button(suggestion, key=f"suggestion_{i}", 
                                help="Click to ask this question",
                                use_container_width=True):
-                        st.session_state.messages.append(("user", suggestion))
-                        st.session_state.is_typing = True
-                        st.rerun()
+                        question = suggestion
         
         # Display chat messages
         for role, message in st.session_state.messages:
             display_message(message, is_user=(role == "user"))
         
-        # Display typing indicator
-        if st.session_state.is_typing:
-            display_typing_indicator()
-        
         st.markdown('</div>', unsafe_allow_html=True)
         
-        # Input area
-        st.markdown("---")
-        
-        # Text input
-        col1, col2 = st.columns([5, 1])
-        
-        with col1:
-            user_input = st.text_input(
-                "Ask about any Indian stock, IPO, or market data...",
-                key=f"user_input_{len(st.session_state.messages)}",
-                placeholder="Type your question here...",
-                label_visibility="collapsed"
-            )
-        
-        with col2:
-            send_button = st.button("🚀 Send", key="send_button", 
-                                  use_container_width=True,
-                                  disabled=st.session_state.is_typing)
+        # Input area (submitting triggers a single run; no manual reruns needed)
+        user_input = st.chat_input("Ask about any Indian stock, IPO, or market data...")
+        if user_input and user_input.strip():
+            question = user_input.strip()
         
-        # Handle input
-        if (send_button or user_input) and user_input.strip() and not st.session_state.is_typing:
-            # Add user message
-            st.session_state.messages.append(("user", user_input))
+        # Answer within this run, streaming progress as it arrives
+        if question:
+            st.session_state.messages.append(("user", question))
+            display_message(question, is_user=True)
+            
             st.session_state.is_typing = True
-            st.rerun()
-        
-        # Process AI response
-        if st.session_state.is_typing and st.session_state.messages:
-            last_message = st.session_state.messages[-1]
-            if last_message[0] == "user":
-                # Get AI response
-                response = get_ai_response(last_message[1])
-                
-                # Add AI response
-                st.session_state.messages.append(("assistant", response))
-                st.session_state.is_typing = False
-                
-                st.rerun()
+            response = stream_ai_response(question)
+            st.session_state.is_typing = False
+            
+            st.session_state.messages.append(("assistant", response))
+            display_message(response, is_user=False)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
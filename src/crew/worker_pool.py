@@ -0,0 +1,374 @@
+"""
+Out-of-process crew workers fed from the local job queue (jobs.py).
+
+Each of CREW_WORKER_PROCESSES slots owns one worker process that keeps a warm
+ConversationCrew, with its pooled HTTP connections and response cache, across
+jobs. A slot claims a job, hands it to its process and waits up to the job's
+timeout. A timed-out or crashed worker is killed and replaced, and the job is
+retried while attempts remain. Workers retire after CREW_WORKER_MAX_JOBS jobs
+so memory growth stays bounded. A crew run that hangs or exhausts memory takes
+down one worker process, not the HTTP worker.
+
+Each worker process starts a cache warmer, since the crews read that
+process's response cache; the host-wide warmer lock lets only one of them
+refresh at a time. Workers send their cache, warmer, history, context and
+model-tier statistics back with every reply so /metrics can report them.
+
+A job's deadline travels with it into the worker's kickoff. When the
+submitter cancels a running job, the worker's run is cancelled and stops at
+its next check. A worker that has not stopped after CANCEL_GRACE seconds is
+replaced.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from src.crew.executor import CrewExecutorBusy
+from src.crew.jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobQueue, JobQueueFull, make_job_queue
+from src.crew.perf.probe import rss_bytes
+from src.crew.tools.deadline import Deadline, RunAborted, abandoned_work
+
+
+CREW_WORKER_PROCESSES = int(os.getenv("CREW_WORKER_PROCESSES", "2"))
+# Jobs a worker process runs before it is replaced by a fresh one (0 = never)
+CREW_WORKER_MAX_JOBS = int(os.getenv("CREW_WORKER_MAX_JOBS", "50"))
+CREW_JOB_TIMEOUT = float(os.getenv("CREW_JOB_TIMEOUT", "300"))
+CREW_JOB_RETRIES = int(os.getenv("CREW_JOB_RETRIES", "1"))
+# Queued jobs allowed before submissions are refused with 503
+CREW_JOB_QUEUE_LIMIT = int(os.getenv("CREW_JOB_QUEUE_LIMIT", "32"))
+# Seconds a new worker process may take to import and build its crew
+WORKER_STARTUP_TIMEOUT = float(os.getenv("CREW_WORKER_STARTUP_TIMEOUT", "120"))
+# Seconds a cancelled or expired run may take to stop before its worker is killed
+CANCEL_GRACE = float(os.getenv("CREW_CANCEL_GRACE", "5"))
+
+# Spawned, not forked: the API process has running threads (warmer, pools)
+_mp = multiprocessing.get_context("spawn")
+
+
+def _worker_main(conn, max_jobs: int) -> None:
+    """
+    Worker process: build the crew once, then answer jobs until told to stop.
+
+    Jobs run on a separate thread so the main thread keeps reading the pipe
+    for {"cancel": reason} messages. The parent stops a retiring worker.
+    Every message to the parent ends with this process's statistics.
+    """
+    from src.crew.context_compaction import context_stats
+    from src.crew.conversation_crew import ConversationCrew
+    from src.crew.model_policy import model_policy
+    from src.crew.schemas import to_answer
+    from src.crew.tools.cache import response_cache
+    from src.crew.tools.nse_tools import history_store
+    from src.crew.tools.warmer import WARMER_ENABLED, cache_warmer
+
+    crew = ConversationCrew()
+    # The crews read this process's cache; only the lock holder actually refreshes
+    if WARMER_ENABLED:
+        cache_warmer.start()
+
+    def stats() -> Dict[str, Any]:
+        return {"cache": response_cache.stats(), "warmer": cache_warmer.stats(), "history": history_store.stats(),
+                "context": context_stats.stats(), "models": model_policy.stats(), "reported_at": time.time()}
+
+    conn.send(("ready", os.getpid(), stats()))
+
+    def run(question: str, deadline: Deadline, retire: bool) -> None:
+        try:
+            answer = to_answer(crew.kickoff(question, deadline=deadline))
+            conn.send(("ok", answer.model_dump(), retire, stats()))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}", retire, stats()))
+
+    done = 0
+    deadline: Optional[Deadline] = None
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        if "cancel" in message:
+            if deadline is not None:
+                deadline.cancel(message["cancel"])
+            continue
+        done += 1
+        deadline = Deadline(expires_at=message.get("deadline"))
+        threading.Thread(target=run, args=(message["question"], deadline, bool(max_jobs) and done >= max_jobs),
+                         daemon=True).start()
+
+
+class _Worker:
+    """A worker process and the parent's end of its pipe"""
+
+    def __init__(self, max_jobs: int):
+        self.conn, child = _mp.Pipe()
+        self.process = _mp.Process(target=_worker_main, args=(child, max_jobs), daemon=True)
+        self.process.start()
+        child.close()
+        if not self.conn.poll(WORKER_STARTUP_TIMEOUT):
+            self.kill()
+            raise RuntimeError(f"Worker process did not start within {WORKER_STARTUP_TIMEOUT:.0f}s")
+        _, self.pid, self.stats = self.conn.recv()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.kill()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+
+class CrewWorkerPool:
+    """
+    Job queue plus the worker processes consuming it.
+
+    Processes start with start() or on the first submit(); run() submits a
+    question and awaits its answer without holding a thread.
+    """
+
+    def __init__(self, queue: Optional[JobQueue] = None, processes: int = CREW_WORKER_PROCESSES,
+                 max_jobs: int = CREW_WORKER_MAX_JOBS, job_timeout: float = CREW_JOB_TIMEOUT,
+                 retries: int = CREW_JOB_RETRIES, queue_limit: int = CREW_JOB_QUEUE_LIMIT):
+        self.queue = queue or make_job_queue()
+        self.processes = processes
+        self.max_jobs = max_jobs
+        self.job_timeout = job_timeout
+        self.retries = retries
+        self.queue_limit = queue_limit
+        self.draining = False
+        self._lock = threading.Lock()
+        self._started = False
+        self._stopping = threading.Event()
+        self._slots: List[threading.Thread] = []
+        self._busy = 0
+        self._pending: Set[str] = set()
+        # Live worker per slot, for their reported statistics
+        self._workers: Dict[str, _Worker] = {}
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "retried": 0,
+                       "cancelled": 0, "timeouts": 0, "crashes": 0, "recycled": 0, "worker_starts": 0}
+
+    def _count(self, **deltas) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                self._stats[name] += delta
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for index in range(self.processes):
+            thread = threading.Thread(target=self._slot, args=(f"{os.getpid()}-{index}",),
+                                      name=f"crew-worker-{index}", daemon=True)
+            thread.start()
+            self._slots.append(thread)
+
+    def _slot(self, name: str) -> None:
+        """Feeds one worker process from the queue, replacing it when it dies, hangs or retires"""
+        worker: Optional[_Worker] = None
+        while not self._stopping.is_set():
+            with self._lock:
+                if worker is None:
+                    self._workers.pop(name, None)
+                else:
+                    self._workers[name] = worker
+            if worker is None:
+                # Start the replacement before claiming, so jobs find a warm crew
+                try:
+                    worker = _Worker(self.max_jobs)
+                    self._count(worker_starts=1)
+                except Exception:
+                    self._count(crashes=1)
+                    self._stopping.wait(5.0)
+                    continue
+            job = self.queue.claim(name)
+            if job is None:
+                self.queue.wait(0.5)
+                continue
+            with self._lock:
+                self._busy += 1
+            try:
+                worker.conn.send({"id": job.id, "question": job.question, "deadline": job.deadline})
+                reply, failure = self._await_reply(worker, job)
+                if reply is None:
+                    worker.kill()
+                    worker = None
+                    reply = ("error", failure, False, None)
+                status, payload, retire, stats = reply
+                if stats is not None:
+                    worker.stats = stats
+                if self.queue.get(job.id).status == CANCELLED:
+                    self._count(cancelled=1)
+                elif status == "ok":
+                    self.queue.finish(job.id, payload)
+                    self._count(completed=1)
+                else:
+                    # A run that outlived its deadline would only time out again
+                    expired = job.deadline is not None and time.time() >= job.deadline
+                    failed = self.queue.fail(job.id, payload, retry=not expired)
+                    self._count(retried=int(failed.status != FAILED), failed=int(failed.status == FAILED))
+                if retire and worker is not None:
+                    worker.stop()
+                    worker = None
+                    self._count(recycled=1)
+            except Exception as e:
+                # Lost the pipe to the worker: give the job back and start a fresh process
+                failed = self.queue.fail(job.id, f"worker unavailable: {e}")
+                self._count(retried=int(failed.status != FAILED), failed=int(failed.status == FAILED))
+                if worker is not None:
+                    worker.kill()
+                    worker = None
+                self._stopping.wait(1.0)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+        with self._lock:
+            self._workers.pop(name, None)
+        if worker is not None:
+            worker.stop()
+
+    def _await_reply(self, worker: _Worker, job) -> tuple:
+        """
+        The worker's reply to job, or (None, why) if it hung, died or ignored a cancellation.
+
+        Polls in short steps so a cancelled job or a passed deadline reaches the
+        worker promptly; the hard per-job timeout still applies.
+        """
+        started = time.monotonic()
+        stop_sent_at: Optional[float] = None
+        while True:
+            if worker.conn.poll(0.25):
+                try:
+                    return worker.conn.recv(), None
+                except EOFError:
+                    pass
+            if not worker.process.is_alive():
+                self._count(crashes=1)
+                return None, "worker process exited"
+            if time.monotonic() - started >= job.timeout:
+                self._count(timeouts=1)
+                return None, f"timed out after {job.timeout:.0f}s"
+            if stop_sent_at is None:
+                current = self.queue.get(job.id)
+                if current is not None and current.status == CANCELLED:
+                    reason = current.error or "cancelled"
+                elif job.deadline is not None and time.time() >= job.deadline:
+                    reason = "deadline exceeded"
+                else:
+                    continue
+                worker.conn.send({"cancel": reason})
+                stop_sent_at = time.monotonic()
+            elif time.monotonic() - stop_sent_at >= CANCEL_GRACE:
+                return None, f"did not stop within {CANCEL_GRACE:.0f}s of cancellation"
+
+    def submit(self, question: str, deadline: Optional[Deadline] = None) -> str:
+        """
+        Queues a question and returns its job id.
+
+        Raises:
+            CrewExecutorBusy: If the pool is draining or the queue is full
+        """
+        if self.draining:
+            self._count(rejected=1)
+            raise CrewExecutorBusy("draining", retry_after=1)
+        self.start()
+        try:
+            job = self.queue.put(question, max_attempts=1 + self.retries, timeout=self.job_timeout,
+                                 limit=self.queue_limit, deadline=deadline.expires_at if deadline else None)
+        except JobQueueFull:
+            self._count(rejected=1)
+            raise CrewExecutorBusy("queue full")
+        with self._lock:
+            self._pending.add(job.id)
+        self._count(submitted=1)
+        return job.id
+
+    async def result(self, job_id: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """
+        Waits for a job's answer (a StockAnswer as a dict).
+
+        Raises:
+            RuntimeError: If the job failed on its last attempt
+            RunAborted: If deadline was cancelled or passed first; the job is cancelled
+        """
+        delay = 0.05
+        try:
+            while True:
+                job = self.queue.get(job_id)
+                if job is None:
+                    raise RuntimeError("job expired from the queue")
+                if job.status == DONE:
+                    return job.result
+                if job.status in (FAILED, CANCELLED):
+                    raise RuntimeError(job.error or "job failed")
+                reason = deadline.aborted() if deadline is not None else None
+                if reason:
+                    before = self.queue.cancel(job_id, reason)
+                    if before is not None and before.status == QUEUED:
+                        abandoned_work.record("job", reason)
+                    elif before is not None and before.status == RUNNING:
+                        abandoned_work.record("run", reason, time.time() - (before.started_at or time.time()))
+                    raise RunAborted(reason)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.5)
+        finally:
+            with self._lock:
+                self._pending.discard(job_id)
+
+    async def run(self, question: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        return await self.result(self.submit(question, deadline), deadline)
+
+    def drain(self, timeout: float) -> bool:
+        """
+        Refuses new jobs, lets the workers finish the jobs this process accepted, then stops them.
+
+        Returns:
+            True if every accepted job finished in time.
+        """
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._pending and not self._busy:
+                    break
+            time.sleep(0.1)
+        with self._lock:
+            finished = not self._pending and not self._busy
+        self._stopping.set()
+        for thread in self._slots:
+            thread.join(max(0.0, deadline - time.monotonic()) + 5)
+        return finished
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Worker count and state, job counters, the queue's jobs per status and,
+        per live worker process, its RSS and the statistics from its last reply.
+        """
+        with self._lock:
+            stats = dict(self._stats, processes=self.processes, busy=self._busy, max_jobs=self.max_jobs,
+                         job_timeout=self.job_timeout, queue_limit=self.queue_limit, draining=self.draining)
+            workers = list(self._workers.values())
+        stats["queue"] = {"backend": type(self.queue).__name__, **self.queue.counts()}
+        crew_processes = {}
+        for worker in workers:
+            rss = rss_bytes(worker.pid)
+            crew_processes[str(worker.pid)] = {"rss_mb": round(rss / 2 ** 20, 1) if rss is not None else None,
+                                               **worker.stats}
+        stats["crew_processes"] = crew_processes
+        return stats
+
+
+# Serves /analyze-stock when CREW_EXECUTOR=process
+crew_pool = CrewWorkerPool()
@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from src.crew.jobs import (
+    CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobQueue, JobQueueFull, MemoryJobQueue, SQLiteJobQueue,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def queue(request, tmp_path):
+    return MemoryJobQueue() if request.param == "memory" else SQLiteJobQueue(str(tmp_path / "jobs.db"))
+
+
+def test_incomplete_backend_fails_on_creation():
+    class PartialQueue(JobQueue):
+        def put(self, question, max_attempts=2, timeout=300.0, limit=None, deadline=None):
+            raise AssertionError
+
+    with pytest.raises(TypeError):
+        PartialQueue()
+
+
+def test_claim_and_finish(queue):
+    job = queue.put("Tell me about TCS")
+    claimed = queue.claim("worker-0")
+
+    assert claimed.id == job.id and claimed.status == RUNNING and claimed.attempts == 1
+    assert queue.claim("worker-1") is None
+    queue.finish(job.id, {"insights": "ok"})
+    assert queue.get(job.id).status == DONE and queue.get(job.id).result == {"insights": "ok"}
+
+
+def test_put_refuses_beyond_limit(queue):
+    queue.put("first", limit=1)
+    with pytest.raises(JobQueueFull):
+        queue.put("second", limit=1)
+
+
+def test_failed_attempt_is_retried_until_attempts_run_out(queue):
+    job = queue.put("Tell me about TCS", max_attempts=2)
+    queue.claim("worker-0")
+    assert queue.fail(job.id, "crashed").status == QUEUED
+    queue.claim("worker-0")
+    assert queue.fail(job.id, "crashed again").status == FAILED
+
+
+def test_expired_job_is_never_started(queue):
+    job = queue.put("Tell me about TCS", deadline=time.time() - 1)
+
+    assert queue.claim("worker-0") is None
+    assert queue.get(job.id).status == FAILED
+
+
+def test_cancelled_job_ignores_late_result(queue):
+    job = queue.put("Tell me about TCS")
+    queue.claim("worker-0")
+
+    assert queue.cancel(job.id, "client disconnected").status == RUNNING
+    queue.finish(job.id, {"insights": "too late"})
+    assert queue.get(job.id).status == CANCELLED and queue.get(job.id).error == "client disconnected"
+    assert queue.counts()[CANCELLED] == 1
@@ -0,0 +1,171 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from src.crew.tools.models import Peer
+from src.crew.tools.peers import PeerFrame
+from src.crew.tools.snapshot_pack import CODEC_ZSTD, SnapshotPack, SnapshotPackWriter, zstandard
+from src.crew.tools import warmer
+from src.crew.tools.cache import ResponseCache, make_cache_key
+from src.crew.tools.history import HistoryStore
+from src.crew.tools.timeline import IST, TimelineStore
+
+
+def _trending(gainers, losers=()):
+    stock = lambda ric, change: {"ric": ric, "company_name": ric.title(), "percent_change": str(change)}
+    return {"trending_stocks": {"top_gainers": [stock(ric, 3.0) for ric in gainers],
+                                "top_losers": [stock(ric, -3.0) for ric in losers]}}
+
+
+# Timeline
+def test_timeline_intraday_payload_replaces_list_members(tmp_path):
+    store = TimelineStore(str(tmp_path / "timeline.db"))
+    store.record("trending", {}, _trending(["TCS", "INFY", "ITC"], ["WIPRO"]), datetime(2026, 10, 19, 10, 0, tzinfo=IST))
+    store.record("trending", {}, _trending(["HDFC"]), datetime(2026, 10, 19, 15, 0, tzinfo=IST))
+
+    assert [row[0] for row in store.members("gainers", "2026-10-19")] == ["HDFC"]
+    assert store.members("losers", "2026-10-19") == []
+    assert [row[1] for row in store.entered("gainers", "2026-10-19", "2026-10-19")] == ["HDFC"]
+
+
+def test_timeline_keeps_one_payload_per_day(tmp_path):
+    store = TimelineStore(str(tmp_path / "timeline.db"))
+    for minute, price in enumerate((100, 101, 102)):
+        store.record("stock", {"name": "TCS"}, {"currentPrice": {"NSE": price}},
+                     datetime(2026, 10, 19, 10, minute, tzinfo=IST))
+    store.record("stock", {"name": "TCS"}, {"currentPrice": {"NSE": 110}}, datetime(2026, 10, 20, 10, 0, tzinfo=IST))
+
+    assert store.stats()["payloads"] == 2
+    assert store.payload_as_of("stock", {"name": "TCS"}, "2026-10-19") == {"currentPrice": {"NSE": 102}}
+    assert store.as_of("TCS", "price", "2026-10-20") == ("2026-10-20", 110.0)
+
+
+# Peers
+def _peer(name, pe_ratio):
+    return Peer(ticker_id=name, company_name=name, local_name=name, price=None, percent_change=None,
+                market_cap=None, pe_ratio=pe_ratio, pb_ratio=None, roe_ttm=None, net_margin_ttm=None,
+                dividend_yield=None, year_high=None, year_low=None, rating="")
+
+
+def test_peers_do_not_rank_negative_pe_as_cheapest():
+    frame = PeerFrame([("IT", _peer(name, pe)) for name, pe in (("A", 30.0), ("LOSS", -12.0), ("B", 15.0), ("C", 22.0))])
+    ranks, percentiles = frame.ranks("pe_ratio"), frame.percentiles("pe_ratio")
+
+    assert ranks.tolist()[0] == 3 and np.isnan(ranks[1]) and ranks.tolist()[2:] == [1, 2]
+    assert np.isnan(percentiles[1])
+    # Percentiles follow the rank: best is P100, worst P0
+    assert [percentiles[row] for row in (2, 3, 0)] == [100.0, 50.0, 0.0]
+    assert frame.order("IT", "pe_ratio") == [2, 3, 0, 1]
+    assert frame.medians("IT")["pe_ratio"] == 22.0
+
+
+# Cache warmer
+def test_warmer_survives_a_failed_cycle(monkeypatch):
+    calls = []
+
+    def refresh_once():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ValueError("bad payload")
+        cache_warmer._stop.set()
+        return 0
+
+    cache_warmer = warmer.CacheWarmer(lock_path=None)
+    monkeypatch.setattr(cache_warmer, "refresh_once", refresh_once)
+    monkeypatch.setattr(warmer, "refresh_interval", lambda now=None: 0)
+    cache_warmer._run()
+
+    assert len(calls) == 2
+    assert cache_warmer.stats()["crashed_cycles"] == 1
+    assert cache_warmer.stats()["last_error"] == "ValueError: bad payload"
+
+
+def test_one_warmer_per_host_holds_the_lock(tmp_path):
+    lock_path = str(tmp_path / "warmer.lock")
+    first, second = warmer.CacheWarmer(lock_path=lock_path), warmer.CacheWarmer(lock_path=lock_path)
+
+    assert first._acquire() and first.active
+    assert not second._acquire() and not second.active
+    first.stop()
+    assert second._acquire() and second.active
+    second.stop()
+
+
+# Response cache
+def test_cache_evicts_least_recently_used_beyond_max_entries():
+    cache = ResponseCache(max_entries=2)
+    tcs, infy, itc = (make_cache_key("stock", {"name": name}) for name in ("TCS", "INFY", "ITC"))
+    cache.set(tcs, {"name": "TCS"})
+    cache.set(infy, {"name": "INFY"})
+    assert cache.get(tcs) == {"name": "TCS"}
+    cache.set(itc, {"name": "ITC"})
+
+    assert cache.peek(infy) is None
+    assert cache.peek(tcs) is not None and cache.peek(itc) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_purges_expired_entries_on_set():
+    cache = ResponseCache()
+    for name in ("TCS", "INFY", "ITC"):
+        cache.set(make_cache_key("stock", {"name": name}), {"name": name}, ttl=0)
+    cache.set(make_cache_key("trending"), {"trending_stocks": {}})
+
+    assert len(cache._entries) == 1
+
+
+# Historical series
+def _historical(points):
+    return {"datasets": [{"metric": "Price", "values": [[day, str(price)] for day, price in points]}]}
+
+
+def test_history_keeps_at_most_max_series():
+    calls = []
+
+    def fetch(endpoint, params):
+        calls.append(params["stock_name"])
+        return _historical([("2026-10-16", 100), ("2026-10-19", 101)])
+
+    store = HistoryStore(fetch, max_series=2)
+    for symbol in ("TCS", "INFY", "TCS", "ITC"):
+        assert store.sync(symbol)[0] is not None
+
+    # INFY was least recently used when ITC arrived; TCS stayed cached
+    assert calls == ["TCS", "INFY", "ITC"]
+    assert store.stats()["series"] == 2 and store.stats()["evictions"] == 1
+    store.sync("INFY")
+    assert calls[-1] == "INFY"
+
+
+def test_history_backs_off_after_a_failed_top_up():
+    responses = [_historical([("2026-10-16", 100)]), {"error": "upstream down"}]
+    calls = []
+
+    def fetch(endpoint, params):
+        calls.append(params["period"])
+        return responses[min(len(calls), len(responses)) - 1]
+
+    store = HistoryStore(fetch, ttl=0)
+    for _ in range(4):
+        series, error = store.sync("TCS")
+        assert series is not None and error is None
+    assert len(calls) == 2
+
+
+# Snapshot packs
+@pytest.mark.skipif(zstandard is None, reason="zstandard not installed")
+def test_zstd_pack_reads_from_many_threads(tmp_path):
+    path = str(tmp_path / "day.snap")
+    payloads = {symbol: {"name": symbol, "prices": list(range(2000))} for symbol in ("TCS", "INFY", "ITC", "HDFC")}
+    with SnapshotPackWriter(path, codec=CODEC_ZSTD) as writer:
+        for symbol, payload in payloads.items():
+            writer.add("stock", {"name": symbol}, payload, "2026-10-19")
+
+    with SnapshotPack(path) as pack:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            symbols = list(payloads) * 200
+            results = list(executor.map(lambda symbol: pack.get("stock", {"name": symbol}), symbols))
+
+    assert results == [payloads[symbol] for symbol in symbols]